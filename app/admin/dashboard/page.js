@@ -18,13 +18,15 @@ import {
 import { useRouter } from 'next/navigation';
 import Link from 'next/link';
 import SpotlightBackground from '@/components/SpotlightBackground';
+import CoverImage from '@/components/CoverImage';
 
 export default function AdminDashboard() {
   const router = useRouter();
   const [stats, setStats] = useState({ totalBooks: 0, totalCategories: 0, totalAuthors: 0 });
   const [books, setBooks] = useState([]);
-  const [filteredBooks, setFilteredBooks] = useState([]);
+  const [categories, setCategories] = useState([]);
   const [loading, setLoading] = useState(true);
+  const [loadingBooks, setLoadingBooks] = useState(false);
   const [showDialog, setShowDialog] = useState(false);
   const [editingBook, setEditingBook] = useState(null);
   const [uploading, setUploading] = useState({ cover: false, pdf: false, audio: false });
@@ -39,18 +41,21 @@ export default function AdminDashboard() {
     audioUrl: ''
   });
   
-  // États pour la pagination
+  // États pour la pagination (côté serveur)
   const [currentPage, setCurrentPage] = useState(1);
   const [booksPerPage] = useState(10);
   const [totalPages, setTotalPages] = useState(1);
+  const [totalFound, setTotalFound] = useState(0);
   
-  // État pour la recherche
+  // État pour la recherche et le tri
   const [searchQuery, setSearchQuery] = useState('');
+  const [debouncedSearch, setDebouncedSearch] = useState('');
   const [searchCategory, setSearchCategory] = useState('');
+  const [sortOption, setSortOption] = useState('createdAt:desc');
 
   useEffect(() => {
     const admin = localStorage.getItem('admin');
-    if (!admin) {
+    if (!admin || !localStorage.getItem('adminToken')) {
       router.push('/admin');
       return;
     }
@@ -58,34 +63,32 @@ export default function AdminDashboard() {
   }, []);
 
   useEffect(() => {
-    // Filtrer les livres lorsque la recherche change
-    filterBooks();
-  }, [searchQuery, searchCategory, books]);
+    // Attendre la fin de la saisie avant d'interroger l'API
+    const timeout = setTimeout(() => {
+      if (searchQuery.trim() !== debouncedSearch) {
+        setDebouncedSearch(searchQuery.trim());
+        setCurrentPage(1);
+      }
+    }, 300);
+    return () => clearTimeout(timeout);
+  }, [searchQuery]);
 
   useEffect(() => {
-    // Mettre à jour le nombre total de pages lorsque les livres filtrés changent
-    const newTotalPages = Math.ceil(filteredBooks.length / booksPerPage);
-    setTotalPages(newTotalPages);
-    
-    // Si la page actuelle dépasse le nombre total de pages, revenir à la première page
-    if (currentPage > newTotalPages && newTotalPages > 0) {
-      setCurrentPage(1);
-    }
-  }, [filteredBooks, booksPerPage]);
+    fetchBooks();
+  }, [currentPage, debouncedSearch, searchCategory, sortOption]);
 
   const fetchData = async () => {
     try {
-      const [statsRes, booksRes] = await Promise.all([
+      const [statsRes, categoriesRes] = await Promise.all([
         fetch('/api/admin/stats'),
-        fetch('/api/books?limit=1000')
+        fetch('/api/categories')
       ]);
 
       const statsData = await statsRes.json();
-      const booksData = await booksRes.json();
+      const categoriesData = await categoriesRes.json();
 
       setStats(statsData.stats || { totalBooks: 0, totalCategories: 0, totalAuthors: 0 });
-      setBooks(booksData.books || []);
-      setFilteredBooks(booksData.books || []);
+      setCategories(categoriesData.categories || []);
     } catch (error) {
       console.error('Erreur:', error);
     } finally {
@@ -93,36 +96,81 @@ export default function AdminDashboard() {
     }
   };
 
-  const filterBooks = () => {
-    let filtered = [...books];
-
-    // Filtrer par recherche textuelle
-    if (searchQuery) {
-      const query = searchQuery.toLowerCase();
-      filtered = filtered.filter(book =>
-        book.title.toLowerCase().includes(query) ||
-        book.author.toLowerCase().includes(query) ||
-        book.description?.toLowerCase().includes(query)
-      );
-    }
+  // Une page de la table, en vue compacte, filtrée et triée par l'API
+  const fetchBooks = async () => {
+    setLoadingBooks(true);
+    try {
+      const [sort, order] = sortOption.split(':');
+      const params = new URLSearchParams({
+        page: currentPage.toString(),
+        limit: booksPerPage.toString(),
+        fields: 'summary',
+        sort,
+        order,
+      });
+      if (debouncedSearch) params.append('search', debouncedSearch);
+      if (searchCategory) params.append('category', searchCategory);
 
-    // Filtrer par catégorie
-    if (searchCategory) {
-      filtered = filtered.filter(book =>
-        book.category.toLowerCase() === searchCategory.toLowerCase()
-      );
+      const res = await fetch(`/api/books?${params.toString()}`);
+      const data = await res.json();
+
+      setBooks(data.books || []);
+      setTotalFound(data.pagination?.total || 0);
+      setTotalPages(data.pagination?.totalPages || 1);
+    } catch (error) {
+      console.error('Erreur:', error);
+    } finally {
+      setLoadingBooks(false);
     }
+  };
 
-    setFilteredBooks(filtered);
+  const refresh = () => {
+    fetchData();
+    fetchBooks();
   };
 
-  const handleLogout = () => {
+  // Jeton de session (émis par /api/admin/login) pour les écritures
+  const authHeaders = (headers = {}) => ({
+    ...headers,
+    Authorization: `Bearer ${localStorage.getItem('adminToken')}`
+  });
+
+  const endSession = () => {
     localStorage.removeItem('admin');
+    localStorage.removeItem('adminToken');
     router.push('/admin');
   };
 
-  const handleOpenDialog = (book = null) => {
-    if (book) {
+  // Session expirée ou révoquée : retour à la connexion
+  const checkSession = (res) => {
+    if (res.status === 401) {
+      endSession();
+      return false;
+    }
+    return true;
+  };
+
+  const handleLogout = async () => {
+    try {
+      await fetch('/api/admin/logout', { method: 'POST', headers: authHeaders() });
+    } catch (error) {
+      console.error('Erreur:', error);
+    }
+    endSession();
+  };
+
+  const handleOpenDialog = async (summary = null) => {
+    if (summary) {
+      // La table ne charge que la vue compacte : récupérer le livre complet
+      let book = summary;
+      try {
+        const res = await fetch(`/api/books/${summary.id}`);
+        const data = await res.json();
+        if (data.book) book = data.book;
+      } catch (error) {
+        console.error('Erreur:', error);
+      }
+
       setEditingBook(book);
       setFormData({
         title: book.title,
@@ -156,14 +204,17 @@ export default function AdminDashboard() {
     setUploading({ ...uploading, [type]: true });
 
     try {
+      // Le type est connu avant le fichier : l'API valide l'upload en flux
       const formDataUpload = new FormData();
-      formDataUpload.append('file', file);
       formDataUpload.append('type', type);
+      formDataUpload.append('file', file);
 
-      const res = await fetch('/api/upload', {
+      const res = await fetch(`/api/upload?type=${type}`, {
         method: 'POST',
+        headers: authHeaders(),
         body: formDataUpload
       });
+      if (!checkSession(res)) return;
 
       if (res.ok) {
         const data = await res.json();
@@ -196,16 +247,17 @@ export default function AdminDashboard() {
 
       const res = await fetch(url, {
         method,
-        headers: { 'Content-Type': 'application/json' },
+        headers: authHeaders({ 'Content-Type': 'application/json' }),
         body: JSON.stringify({
           ...formData,
           year: formData.year ? parseInt(formData.year) : null
         })
       });
 
+      if (!checkSession(res)) return;
       if (res.ok) {
         setShowDialog(false);
-        fetchData();
+        refresh();
       }
     } catch (error) {
       console.error('Erreur:', error);
@@ -216,17 +268,17 @@ export default function AdminDashboard() {
     if (!confirm('Etes-vous sur de vouloir supprimer ce livre ?')) return;
 
     try {
-      await fetch(`/api/books/${id}`, { method: 'DELETE' });
-      fetchData();
+      const res = await fetch(`/api/books/${id}`, { method: 'DELETE', headers: authHeaders() });
+      if (!checkSession(res)) return;
+      refresh();
     } catch (error) {
       console.error('Erreur:', error);
     }
   };
 
-  // Calculer les livres à afficher pour la page actuelle
-  const indexOfLastBook = currentPage * booksPerPage;
-  const indexOfFirstBook = indexOfLastBook - booksPerPage;
-  const currentBooks = filteredBooks.slice(indexOfFirstBook, indexOfLastBook);
+  // Position de la page actuelle dans les résultats
+  const indexOfFirstBook = (currentPage - 1) * booksPerPage;
+  const indexOfLastBook = indexOfFirstBook + books.length;
 
   const handleNextPage = () => {
     if (currentPage < totalPages) {
@@ -244,12 +296,10 @@ export default function AdminDashboard() {
     setCurrentPage(pageNumber);
   };
 
-  // Obtenir toutes les catégories uniques pour le filtre
-  const allCategories = [...new Set(books.map(book => book.category))].sort();
-
   const resetFilters = () => {
     setSearchQuery('');
     setSearchCategory('');
+    setSortOption('createdAt:desc');
     setCurrentPage(1);
   };
 
@@ -368,32 +418,48 @@ export default function AdminDashboard() {
                     <select
                       className="w-full px-3 py-2 rounded-md border border-input bg-background text-sm"
                       value={searchCategory}
-                      onChange={(e) => setSearchCategory(e.target.value)}
+                      onChange={(e) => { setSearchCategory(e.target.value); setCurrentPage(1); }}
                     >
                       <option value="">Toutes les catégories</option>
-                      {allCategories.map((category) => (
+                      {categories.map((category) => (
                         <option key={category} value={category}>
                           {category}
                         </option>
                       ))}
                     </select>
                   </div>
-                  {(searchQuery || searchCategory) && (
+                  <div className="w-full md:w-56">
+                    <select
+                      className="w-full px-3 py-2 rounded-md border border-input bg-background text-sm"
+                      value={sortOption}
+                      onChange={(e) => { setSortOption(e.target.value); setCurrentPage(1); }}
+                    >
+                      <option value="createdAt:desc">Plus récents</option>
+                      <option value="createdAt:asc">Plus anciens</option>
+                      <option value="title:asc">Titre (A-Z)</option>
+                      <option value="title:desc">Titre (Z-A)</option>
+                      <option value="author:asc">Auteur (A-Z)</option>
+                      <option value="author:desc">Auteur (Z-A)</option>
+                      <option value="category:asc">Catégorie (A-Z)</option>
+                    </select>
+                  </div>
+                  {(searchQuery || searchCategory || sortOption !== 'createdAt:desc') && (
                     <Button variant="outline" onClick={resetFilters}>
                       Réinitialiser
                     </Button>
                   )}
                 </div>
                 
-                <div className="text-sm text-muted-foreground">
-                  {filteredBooks.length} livre{filteredBooks.length !== 1 ? 's' : ''} trouvé{filteredBooks.length !== 1 ? 's' : ''}
+                <div className="text-sm text-muted-foreground flex items-center gap-2">
+                  {totalFound} livre{totalFound !== 1 ? 's' : ''} trouvé{totalFound !== 1 ? 's' : ''}
+                  {loadingBooks && <Loader2 className="w-4 h-4 animate-spin" />}
                 </div>
               </div>
 
               {/* Liste des livres */}
               <div className="space-y-4">
-                {currentBooks.length > 0 ? (
-                  currentBooks.map((book) => (
+                {books.length > 0 ? (
+                  books.map((book) => (
                     <motion.div
                       key={book.id}
                       initial={{ opacity: 0 }}
@@ -402,7 +468,7 @@ export default function AdminDashboard() {
                     >
                       <div className="w-16 h-20 bg-gradient-to-br from-primary/20 to-secondary/20 rounded flex-shrink-0 overflow-hidden">
                         {book.coverImage ? (
-                          <img src={book.coverImage} alt={book.title} className="w-full h-full object-cover" />
+                          <CoverImage book={book} sizes="64px" loading="lazy" className="w-full h-full object-cover" />
                         ) : (
                           <div className="w-full h-full flex items-center justify-center">
                             <BookOpen className="w-6 h-6 text-muted-foreground" />
@@ -429,16 +495,16 @@ export default function AdminDashboard() {
                   ))
                 ) : (
                   <div className="text-center py-8 text-muted-foreground">
-                    {books.length === 0 ? 'Aucun livre dans la bibliothèque' : 'Aucun livre correspondant à votre recherche'}
+                    {stats.totalBooks === 0 ? 'Aucun livre dans la bibliothèque' : 'Aucun livre correspondant à votre recherche'}
                   </div>
                 )}
               </div>
 
               {/* Pagination */}
-              {filteredBooks.length > booksPerPage && (
+              {totalFound > booksPerPage && (
                 <div className="mt-6 flex flex-col sm:flex-row items-center justify-between gap-4">
                   <div className="text-sm text-muted-foreground">
-                    Affichage {indexOfFirstBook + 1}-{Math.min(indexOfLastBook, filteredBooks.length)} sur {filteredBooks.length} livre{filteredBooks.length !== 1 ? 's' : ''}
+                    Affichage {indexOfFirstBook + 1}-{indexOfLastBook} sur {totalFound} livre{totalFound !== 1 ? 's' : ''}
                   </div>
                   
                   <div className="flex items-center gap-2">
@@ -32,6 +32,7 @@ export default function AdminLoginPage() {
 
       if (data.success) {
         localStorage.setItem('admin', JSON.stringify(data.user));
+        localStorage.setItem('adminToken', data.token);
         router.push('/admin/dashboard');
       } else {
         setError(data.error || 'Identifiants invalides');
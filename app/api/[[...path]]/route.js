@@ -1,62 +1,69 @@
-import { MongoClient } from 'mongodb';
 import { NextResponse } from 'next/server';
 import { v4 as uuidv4 } from 'uuid';
-import bcrypt from 'bcryptjs';
-import { streamText } from 'ai';
-import { openai } from '@ai-sdk/openai';
-import { put } from '@vercel/blob';
+import { getDbConnection, connectionStats } from '@/lib/mongodb';
+import { timed, withTiming } from '@/lib/timing';
+import { withAdmission } from '@/lib/rateLimit';
+import { explainQueryShapes } from '@/lib/queryShapes';
+import { getFacets } from '@/lib/facets';
+import { rebuildRelatedNow } from '@/lib/related';
+import {
+  getCatalogVersion,
+  catalogCachePolicy,
+  catalogValidators,
+  cacheHeaders,
+  isNotModified,
+} from '@/lib/httpCache';
+import { getBoundary, iterateMultipart } from '@/lib/multipart';
+import {
+  sizeLimits,
+  defaultExtensions,
+  UploadError,
+  uploadErrorBody,
+  checkDeclaredFile,
+  tooLargeError,
+  validatedChunks,
+} from '@/lib/upload';
+import { storageBackend, storeUpload } from '@/lib/storage';
+import {
+  createUploadSession,
+  getUploadSession,
+  storeUploadPart,
+  completeUploadSession,
+  abortUploadSession,
+} from '@/lib/chunkedUpload';
+import { deriveCover, keepChunks } from '@/lib/covers';
+import { serveStoredFile } from '@/lib/files';
+import { linearizedPdf } from '@/lib/pdf';
+import { retrievePassages, withBookPassages } from '@/lib/bookText';
+import {
+  chatCacheKey,
+  getCachedAnswer,
+  recordAnswer,
+  replayAnswer,
+  eventStream,
+  streamChatText,
+  isStubModel,
+} from '@/lib/chat';
+import { corsHeaders, preflight } from '@/lib/cors';
+import { withCompression } from '@/lib/compression';
+import { issueSession, verifySession, bearerToken, revokeSession, adminAuthError } from '@/lib/session';
 
-// Headers CORS
-const corsHeaders = {
-  'Access-Control-Allow-Origin': process.env.CORS_ORIGINS || '*',
-  'Access-Control-Allow-Methods': 'GET, POST, PUT, DELETE, OPTIONS, PATCH',
-  'Access-Control-Allow-Headers': 'Content-Type, Authorization, X-Requested-With',
-  'Access-Control-Allow-Credentials': 'true',
-  'Access-Control-Max-Age': '86400',
-};
+// bcrypt n'est chargé que par les routes d'authentification (le SDK IA par
+// lib/chat.js, le client Blob par lib/storage.js) : un démarrage à froid qui
+// sert une lecture ne paie pas leur chargement
+const loadBcrypt = () => import('bcryptjs').then((module) => module.default);
 
-// Handler OPTIONS pour CORS
-export async function OPTIONS() {
-  return NextResponse.json({}, { headers: corsHeaders });
-}
-
-// Fonction de connexion MongoDB optimisée pour Vercel
-async function getDbConnection() {
-  const mongoUri = process.env.MONGODB_URI;
-  
-  if (!mongoUri) {
-    console.error('❌ ERREUR: MONGODB_URI non configuré');
-    throw new Error('Configuration de base de données manquante');
-  }
-  
-  try {
-    const client = new MongoClient(mongoUri, {
-      maxPoolSize: 5,
-      serverSelectionTimeoutMS: 10000,
-      connectTimeoutMS: 10000,
-      socketTimeoutMS: 30000,
-    });
-    
-    await client.connect();
-    console.log('✅ Connexion MongoDB établie');
-    
-    const dbName = mongoUri.split('/').pop().split('?')[0] || 'immersive_library';
-    const db = client.db(dbName);
-    
-    return { client, db };
-  } catch (error) {
-    console.error('❌ Erreur MongoDB:', error);
-    throw new Error(`Échec connexion base de données: ${error.message}`);
-  }
-}
+// Le catalogue (/books, /books/:id, /books/batch, /books/import,
+// /books/export, /categories, /authors) est servi par les routes dédiées de
+// app/api : Next.js ne route jamais ces chemins ici.
 
 // Handler GET
-export async function GET(request) {
-  console.log(`🌐 GET ${request.url}`);
-  
+async function handleGet(request) {
   const { pathname, searchParams } = new URL(request.url);
   const path = pathname.replace('/api', '') || '/';
   
+  console.log(`🌐 GET ${request.url}`);
+  
   // Route de test
   if (path === '/test' || path === '/health') {
     try {
@@ -76,7 +83,7 @@ export async function GET(request) {
       
       if (process.env.MONGODB_URI) {
         try {
-          const { client, db } = await getDbConnection();
+          const { db } = await timed('db', getDbConnection);
           await db.command({ ping: 1 });
           dbConnected = true;
           
@@ -85,10 +92,13 @@ export async function GET(request) {
           dbInfo = {
             collections: collections.map(c => c.name),
             booksCount: await db.collection('books').countDocuments().catch(() => 0),
-            adminsCount: await db.collection('admins').countDocuments().catch(() => 0)
+            adminsCount: await db.collection('admins').countDocuments().catch(() => 0),
+            // Connexions vues par le serveur MongoDB (tous clients confondus) ;
+            // null si le rôle ne permet pas serverStatus (clusters partagés Atlas)
+            serverConnections: await db.admin().command({ serverStatus: 1, repl: 0, metrics: 0, locks: 0, wiredTiger: 0 })
+              .then(status => status.connections)
+              .catch(() => null)
           };
-          
-          await client.close();
         } catch (dbError) {
           console.error('❌ Test MongoDB échoué:', dbError);
           dbConnected = false;
@@ -96,18 +106,36 @@ export async function GET(request) {
         }
       }
       
+      const memory = process.memoryUsage();
+      
+      // Ressources actives par type (sockets TCP entrantes et sortantes, timers...)
+      const activeResources = {};
+      for (const resource of process.getActiveResourcesInfo?.() || []) {
+        activeResources[resource] = (activeResources[resource] || 0) + 1;
+      }
+      
       return NextResponse.json({
         success: true,
         message: 'API Bibliothèque Immersive',
         timestamp: new Date().toISOString(),
         environment: envInfo,
+        process: {
+          pid: process.pid,
+          uptime_s: Math.round(process.uptime()),
+          rss_mb: +(memory.rss / (1024 * 1024)).toFixed(1),
+          heap_used_mb: +(memory.heapUsed / (1024 * 1024)).toFixed(1),
+          max_rss_mb: +(process.resourceUsage().maxRSS / 1024).toFixed(1),
+          active_resources: activeResources
+        },
         database: {
           connected: dbConnected,
+          pool: connectionStats(),
           ...dbInfo
         },
         upload: {
           endpoints: {
-            upload: 'POST /api/upload (avec Vercel Blob)',
+            upload: 'POST /api/upload?type=cover|book|audio (flux, Vercel Blob ou disque local)',
+            upload_chunked: 'POST /api/uploads, PUT /api/uploads/:id/parts/:index, POST /api/uploads/:id/complete',
             upload_test: 'POST /api/upload-test (simulé)',
             upload_url: 'POST /api/upload-url (URL externe)'
           },
@@ -139,57 +167,53 @@ export async function GET(request) {
   // Initialiser un admin (développement seulement)
   if (path === '/init-admin' && process.env.NODE_ENV !== 'production') {
     try {
-      const { client, db } = await getDbConnection();
+      const { db } = await timed('db', getDbConnection);
       
-      try {
-        // Vérifier/créer la collection admins
-        const collExists = await db.listCollections({ name: 'admins' }).hasNext();
-        
-        if (!collExists) {
-          await db.createCollection('admins');
-        }
-        
-        // Vérifier si admin existe déjà
-        const existingAdmin = await db.collection('admins').findOne({ email: 'admin@example.com' });
-        
-        if (existingAdmin) {
-          return NextResponse.json({
-            success: true,
-            message: 'Admin existe déjà',
-            admin: {
-              email: existingAdmin.email,
-              name: existingAdmin.name
-            }
-          }, { headers: corsHeaders });
-        }
-        
-        // Créer admin par défaut
-        const hashedPassword = await bcrypt.hash('admin123', 10);
-        const admin = {
-          id: uuidv4(),
-          name: 'Administrateur',
-          email: 'admin@example.com',
-          password: hashedPassword,
-          role: 'superadmin',
-          createdAt: new Date(),
-          updatedAt: new Date()
-        };
-        
-        await db.collection('admins').insertOne(admin);
-        
+      // Vérifier/créer la collection admins
+      const collExists = await db.listCollections({ name: 'admins' }).hasNext();
+      
+      if (!collExists) {
+        await db.createCollection('admins');
+      }
+      
+      // Vérifier si admin existe déjà
+      const existingAdmin = await db.collection('admins').findOne({ email: 'admin@example.com' });
+      
+      if (existingAdmin) {
         return NextResponse.json({
           success: true,
-          message: '✅ Admin créé avec succès',
-          credentials: {
-            email: 'admin@example.com',
-            password: 'admin123',
-            note: 'Changez le mot de passe après la première connexion'
+          message: 'Admin existe déjà',
+          admin: {
+            email: existingAdmin.email,
+            name: existingAdmin.name
           }
         }, { headers: corsHeaders });
-        
-      } finally {
-        await client.close();
       }
+      
+      // Créer admin par défaut
+      const bcrypt = await loadBcrypt();
+      const hashedPassword = await bcrypt.hash('admin123', 10);
+      const admin = {
+        id: uuidv4(),
+        name: 'Administrateur',
+        email: 'admin@example.com',
+        password: hashedPassword,
+        role: 'superadmin',
+        createdAt: new Date(),
+        updatedAt: new Date()
+      };
+      
+      await db.collection('admins').insertOne(admin);
+      
+      return NextResponse.json({
+        success: true,
+        message: '✅ Admin créé avec succès',
+        credentials: {
+          email: 'admin@example.com',
+          password: 'admin123',
+          note: 'Changez le mot de passe après la première connexion'
+        }
+      }, { headers: corsHeaders });
     } catch (error) {
       console.error('❌ Erreur init-admin:', error);
       return NextResponse.json({
@@ -199,103 +223,90 @@ export async function GET(request) {
     }
   }
   
-  // Routes principales GET
-  let client;
-  try {
-    const { client: dbClient, db } = await getDbConnection();
-    client = dbClient;
+  // Fichiers stockés localement (/uploads/... réécrit ici), requêtes partielles acceptées
+  if (path.startsWith('/files/')) {
+    const [, , folder, name] = path.split('/');
+    const response = await serveStoredFile(request, folder, decodeURIComponent(name || ''), {
+      ...corsHeaders,
+      'Access-Control-Allow-Headers': 'Range, If-Range, ' + corsHeaders['Access-Control-Allow-Headers'],
+      'Access-Control-Expose-Headers': 'Accept-Ranges, Content-Range, Content-Length, ETag'
+    });
     
-    // Get all books with pagination
-    if (path === '/books') {
-      const category = searchParams.get('category');
-      const author = searchParams.get('author');
-      const search = searchParams.get('search');
-      const page = parseInt(searchParams.get('page')) || 1;
-      const limit = parseInt(searchParams.get('limit')) || 12;
-      const skip = (page - 1) * limit;
-      
-      let query = {};
-      if (category && category !== 'all') query.category = category;
-      if (author && author !== 'all') query.author = author;
-      if (search) {
-        query.$or = [
-          { title: { $regex: search, $options: 'i' } },
-          { author: { $regex: search, $options: 'i' } },
-          { description: { $regex: search, $options: 'i' } }
-        ];
-      }
-      
-      const total = await db.collection('books').countDocuments(query);
-      const books = await db.collection('books')
-        .find(query)
-        .sort({ createdAt: -1 })
-        .skip(skip)
-        .limit(limit)
-        .toArray();
-      
-      await client.close();
+    return response || NextResponse.json(
+      { success: false, error: 'Fichier non trouvé' },
+      { status: 404, headers: corsHeaders }
+    );
+  }
+  
+  // Plans d'exécution des requêtes de l'API (développement / CI seulement)
+  if (path === '/admin/explain' && (process.env.NODE_ENV !== 'production' || process.env.EXPLAIN_ENABLED === 'true')) {
+    try {
+      const { db } = await timed('db', getDbConnection);
+      const plans = await explainQueryShapes(db);
       
       return NextResponse.json({
         success: true,
-        books,
-        pagination: {
-          page,
-          limit,
-          total,
-          totalPages: Math.ceil(total / limit),
-          hasNext: page < Math.ceil(total / limit),
-          hasPrev: page > 1
-        }
+        collscans: plans.filter(plan => plan.collscan && !plan.allowCollscan).map(plan => plan.name),
+        plans
       }, { headers: corsHeaders });
+    } catch (error) {
+      console.error('❌ Erreur explain:', error);
+      return NextResponse.json({
+        success: false,
+        error: error.message
+      }, { status: 500, headers: corsHeaders });
     }
+  }
+  
+  // Routes principales GET
+  try {
+    const { db } = await timed('db', getDbConnection);
     
-    // Get single book
-    if (path.startsWith('/books/')) {
-      const id = path.split('/')[2];
-      const book = await db.collection('books').findOne({ id });
-      
-      await client.close();
-      
-      if (!book) {
-        return NextResponse.json(
-          { success: false, error: 'Livre non trouvé' },
-          { status: 404, headers: corsHeaders }
-        );
+    // Validateurs HTTP (ETag / Last-Modified) pour les lectures du catalogue
+    const cachePolicy = catalogCachePolicy(path, searchParams);
+    let responseHeaders = corsHeaders;
+    if (cachePolicy) {
+      const validators = catalogValidators(path, searchParams, await timed('version', () => getCatalogVersion(db)));
+      responseHeaders = { ...corsHeaders, ...cacheHeaders(cachePolicy, validators) };
+      
+      if (isNotModified(request, validators)) {
+        return new NextResponse(null, { status: 304, headers: responseHeaders });
       }
-      
-      return NextResponse.json({ 
-        success: true, 
-        book 
-      }, { headers: corsHeaders });
     }
     
-    // Get categories
-    if (path === '/categories') {
-      const categories = await db.collection('books').distinct('category');
-      await client.close();
-      return NextResponse.json({ 
-        success: true, 
-        categories: categories.filter(c => c) // Filtrer les valeurs null
-      }, { headers: corsHeaders });
+    // État d'un upload multi-parties (reprise)
+    if (path.startsWith('/uploads/')) {
+      try {
+        const session = await getUploadSession(db, path.split('/')[2]);
+        return NextResponse.json({ success: true, ...session }, { headers: corsHeaders });
+      } catch (error) {
+        if (error instanceof UploadError) {
+          return NextResponse.json(uploadErrorBody(error), { status: error.status, headers: corsHeaders });
+        }
+        throw error;
+      }
     }
     
-    // Get authors
-    if (path === '/authors') {
-      const authors = await db.collection('books').distinct('author');
-      await client.close();
-      return NextResponse.json({ 
-        success: true, 
-        authors: authors.filter(a => a)
+    // Session admin portée par le jeton (vérification sans bcrypt)
+    if (path === '/admin/session') {
+      const session = await timed('auth', () => verifySession(db, bearerToken(request)));
+      if (!session) {
+        return NextResponse.json({
+          success: false,
+          error: 'Session invalide ou expirée'
+        }, { status: 401, headers: corsHeaders });
+      }
+      
+      return NextResponse.json({
+        success: true,
+        user: { id: session.sub, name: session.name, email: session.email, role: session.role },
+        expiresAt: new Date(session.exp * 1000).toISOString()
       }, { headers: corsHeaders });
     }
     
     // Get stats for admin
     if (path === '/admin/stats') {
-      const totalBooks = await db.collection('books').countDocuments();
-      const categories = await db.collection('books').distinct('category');
-      const authors = await db.collection('books').distinct('author');
-      
-      await client.close();
+      const { totalBooks, categories, authors } = await timed('facets', () => getFacets(db, { fresh: searchParams.get('fresh') === 'true' }));
       
       return NextResponse.json({
         success: true,
@@ -304,11 +315,10 @@ export async function GET(request) {
           totalCategories: categories.length,
           totalAuthors: authors.length,
         }
-      }, { headers: corsHeaders });
+      }, { headers: responseHeaders });
     }
     
     // Route par défaut
-    await client.close();
     return NextResponse.json({
       success: true,
       message: 'Bienvenue sur l\'API Bibliothèque Immersive',
@@ -316,9 +326,14 @@ export async function GET(request) {
       documentation: {
         test: 'GET /api/test',
         books: 'GET /api/books',
+        books_by_ids: 'GET /api/books?ids=a,b,c ou POST /api/books/batch { ids }',
+        books_import: 'POST /api/books/import (NDJSON)',
+        books_export: 'GET /api/books/export (NDJSON)',
         categories: 'GET /api/categories',
         authors: 'GET /api/authors',
         admin_login: 'POST /api/admin/login',
+        admin_session: 'GET /api/admin/session (Authorization: Bearer)',
+        admin_logout: 'POST /api/admin/logout',
         upload: 'POST /api/upload',
         chat: 'POST /api/chat'
       }
@@ -326,13 +341,6 @@ export async function GET(request) {
     
   } catch (error) {
     console.error(`❌ Erreur GET ${path}:`, error);
-    if (client) {
-      try {
-        await client.close();
-      } catch (closeError) {
-        console.error('Erreur fermeture client:', closeError);
-      }
-    }
     return NextResponse.json(
       { 
         success: false, 
@@ -345,153 +353,132 @@ export async function GET(request) {
 }
 
 // Handler POST
-export async function POST(request) {
+async function handlePost(request) {
   console.log(`📨 POST ${request.url}`);
   
-  const { pathname } = new URL(request.url);
+  const { pathname, searchParams } = new URL(request.url);
   const path = pathname.replace('/api', '') || '/';
   
+  const authError = await adminAuthError(request, 'POST', path);
+  if (authError) return authError;
+  
   // ========== UPLOAD DE FICHIERS ==========
+  // Le corps multipart est lu en flux : le fichier est validé (type, signature,
+  // taille) au fil de l'eau et transmis directement au stockage.
   if (path === '/upload') {
     try {
       console.log('📤 Upload de fichier');
       
-      // Obtenir le formData
-      const formData = await request.formData();
-      const file = formData.get('file');
-      const type = formData.get('type') || 'cover';
-      
-      // Validation de base
-      if (!file) {
+      const boundary = getBoundary(request.headers.get('content-type'));
+      if (!boundary || !request.body) {
         return NextResponse.json({
           success: false,
           error: 'Aucun fichier fourni'
         }, { status: 400, headers: corsHeaders });
       }
       
-      console.log('📄 Fichier reçu:', {
-        name: file.name,
-        type: file.type,
-        size: `${(file.size / (1024 * 1024)).toFixed(2)}MB`,
-        upload_type: type
-      });
-      
-      // Types de fichiers acceptés
-      const validTypes = {
-        book: [
-          'application/pdf',
-          'application/x-pdf',
-          'application/octet-stream'
-        ],
-        cover: [
-          'image/jpeg', 
-          'image/jpg', 
-          'image/png', 
-          'image/webp'
-        ],
-        audio: [
-          'audio/mpeg', 
-          'audio/mp3', 
-          'audio/wav', 
-          'audio/ogg'
-        ]
-      };
+      // Le type peut venir de l'URL ou d'un champ placé avant le fichier
+      let type = searchParams.get('type');
       
-      // Vérification du type
-      const allowedTypes = validTypes[type];
-      if (!allowedTypes) {
-        return NextResponse.json({
-          success: false,
-          error: `Type "${type}" invalide`,
-          valid_types: Object.keys(validTypes)
-        }, { status: 400, headers: corsHeaders });
+      // Refus immédiat si le corps annoncé dépasse déjà la limite
+      const contentLength = parseInt(request.headers.get('content-length')) || 0;
+      if (type && sizeLimits[type] && contentLength > sizeLimits[type] + 64 * 1024) {
+        throw tooLargeError(type, contentLength);
       }
       
-      // Accepter les PDF par extension même si le type MIME est différent
-      const fileName = file.name.toLowerCase();
-      const isPdfFile = fileName.endsWith('.pdf');
-      
-      if (!allowedTypes.includes(file.type) && !(type === 'book' && isPdfFile)) {
-        return NextResponse.json({
-          success: false,
-          error: 'Type de fichier non supporté',
-          received_type: file.type,
-          allowed_types: allowedTypes,
-          suggestion: type === 'book' ? 'Le fichier doit être un PDF (.pdf)' : 'Vérifiez le format du fichier'
-        }, { status: 400, headers: corsHeaders });
+      let uploaded = null;
+      for await (const part of iterateMultipart(request.body, boundary)) {
+        if (!part.filename) {
+          if (part.name === 'type') type = type || (await part.text()).trim();
+          continue;
+        }
+        if (part.name !== 'file' || uploaded) continue;
+        
+        type = type || 'cover';
+        checkDeclaredFile(type, part);
+        
+        console.log('📄 Fichier reçu:', {
+          name: part.filename,
+          type: part.contentType,
+          upload_type: type
+        });
+        
+        // Générer un nom de fichier unique
+        const extension = part.filename.includes('.')
+          ? part.filename.split('.').pop().toLowerCase()
+          : defaultExtensions[type] || 'bin';
+        const filename = `${type}-${uuidv4()}.${extension}`;
+        
+        // Couverture : copie gardée pour générer les dérivés WebP / AVIF
+        // (sauf stockage simulé, sans dérivés) ; livre PDF : linéarisé pour un
+        // affichage de la page 1 par requêtes partielles, son texte est indexé
+        // en relisant le fichier stocké (aucune copie en mémoire)
+        const stats = {};
+        const pdf = {};
+        const coverChunks = type === 'cover' && storageBackend() !== 'simulated' ? [] : null;
+        const isPdf = type === 'book' && extension === 'pdf';
+        let chunks = validatedChunks(type, part.body, stats);
+        if (coverChunks) chunks = keepChunks(chunks, coverChunks);
+        if (isPdf) chunks = linearizedPdf(chunks, pdf);
+        
+        const stored = await storeUpload({
+          type,
+          filename,
+          originalName: part.filename,
+          contentType: part.contentType,
+          chunks
+        });
+        
+        uploaded = {
+          ...stored,
+          filename,
+          originalName: part.filename,
+          size: stats.size,
+          contentType: part.contentType,
+          linearized: pdf.linearized
+        };
+        
+        if (coverChunks && !stored.simulated) {
+          try {
+            const { db } = await timed('db', getDbConnection);
+            uploaded.coverSet = await timed('covers', () => deriveCover(db, { url: stored.url, data: Buffer.concat(coverChunks) }));
+          } catch (error) {
+            console.error('❌ Dérivés de couverture échoués:', error);
+            uploaded.coverSet = null;
+          }
+        }
+
       }
       
-      // Limites de taille
-      const sizeLimits = {
-        book: 50 * 1024 * 1024,    // 50MB
-        cover: 20 * 1024 * 1024,   // 20MB
-        audio: 30 * 1024 * 1024    // 30MB
-      };
-      
-      const maxSize = sizeLimits[type] || 50 * 1024 * 1024;
-      if (file.size > maxSize) {
+      if (!uploaded) {
         return NextResponse.json({
           success: false,
-          error: 'Fichier trop volumineux',
-          max_size_mb: maxSize / (1024 * 1024),
-          file_size_mb: (file.size / (1024 * 1024)).toFixed(2)
+          error: 'Aucun fichier fourni'
         }, { status: 400, headers: corsHeaders });
       }
       
-      // Vérifier Vercel Blob
-      if (!process.env.BLOB_READ_WRITE_TOKEN) {
-        console.log('⚠️ Vercel Blob non configuré, utilisation de fallback');
-        
-        // Fallback: retourner une URL simulée
-        const simulatedUrl = `https://storage.bibliorhema.vercel.app/simulated/${type}/${uuidv4()}/${file.name}`;
-        
-        return NextResponse.json({
-          success: true,
-          url: simulatedUrl,
-          filename: file.name,
-          size: file.size,
-          type: file.type,
-          uploaded_type: type,
-          simulated: true,
-          message: 'Upload simulé - Configurez BLOB_READ_WRITE_TOKEN pour l\'upload réel'
-        }, { headers: corsHeaders });
-      }
-      
-      // Préparer l'upload vers Vercel Blob
-      const bytes = await file.arrayBuffer();
-      const buffer = Buffer.from(bytes);
-      
-      // Générer un nom de fichier unique
-      const extension = file.name.split('.').pop() || 
-        (type === 'book' ? 'pdf' : 
-         type === 'cover' ? 'jpg' : 
-         type === 'audio' ? 'mp3' : 'bin');
-      
-      const filename = `${type}-${uuidv4()}.${extension}`;
-      
-      console.log('📤 Upload vers Vercel Blob...');
-      
-      // Upload vers Vercel Blob
-      const blob = await put(filename, buffer, {
-        access: 'public',
-        contentType: file.type || 'application/octet-stream'
-      });
-      
-      console.log('✅ Upload réussi:', blob.url);
+      console.log(`✅ Upload réussi (${uploaded.storage}):`, uploaded.url);
       
       return NextResponse.json({
         success: true,
-        url: blob.url,
-        downloadUrl: blob.downloadUrl,
-        pathname: blob.pathname,
-        filename: filename,
-        originalName: file.name,
-        size: file.size,
-        type: file.type,
-        uploaded_type: type
+        url: uploaded.url,
+        downloadUrl: uploaded.downloadUrl,
+        pathname: uploaded.pathname,
+        filename: uploaded.filename,
+        originalName: uploaded.originalName,
+        size: uploaded.size,
+        type: uploaded.contentType,
+        uploaded_type: type,
+        coverSet: uploaded.coverSet,
+        linearized: uploaded.linearized,
+        simulated: uploaded.simulated,
+        message: uploaded.simulated ? 'Upload simulé - Configurez BLOB_READ_WRITE_TOKEN pour l\'upload réel' : undefined
       }, { headers: corsHeaders });
       
     } catch (error) {
+      if (error instanceof UploadError) {
+        return NextResponse.json(uploadErrorBody(error), { status: error.status, headers: corsHeaders });
+      }
       console.error('❌ Erreur upload:', error);
       return NextResponse.json({
         success: false,
@@ -577,6 +564,43 @@ export async function POST(request) {
     }
   }
   
+  // ========== UPLOAD EN PLUSIEURS PARTIES (reprenable) ==========
+  if (path === '/uploads' || /^\/uploads\/[^/]+\/complete$/.test(path)) {
+    try {
+      const { db } = await timed('db', getDbConnection);
+      
+      if (path === '/uploads') {
+        const body = await request.json();
+        const session = await createUploadSession(db, {
+          type: body.type || 'cover',
+          filename: body.filename,
+          contentType: body.contentType || 'application/octet-stream',
+          size: body.size,
+          chunkSize: body.chunkSize,
+          sha256: body.sha256
+        });
+        
+        return NextResponse.json({ success: true, ...session }, { status: 201, headers: corsHeaders });
+      }
+      
+      const uploadId = path.split('/')[2];
+      const result = await completeUploadSession(db, uploadId);
+      console.log('✅ Upload multi-parties terminé:', result.url);
+      
+      return NextResponse.json({ success: true, ...result }, { headers: corsHeaders });
+      
+    } catch (error) {
+      if (error instanceof UploadError) {
+        return NextResponse.json(uploadErrorBody(error), { status: error.status, headers: corsHeaders });
+      }
+      console.error('❌ Erreur upload multi-parties:', error);
+      return NextResponse.json({
+        success: false,
+        error: 'Échec de l\'upload'
+      }, { status: 500, headers: corsHeaders });
+    }
+  }
+  
   // ========== ADMIN LOGIN ==========
   if (path === '/admin/login') {
     try {
@@ -592,69 +616,69 @@ export async function POST(request) {
         }, { status: 400, headers: corsHeaders });
       }
       
-      const { client, db } = await getDbConnection();
+      const { db } = await timed('db', getDbConnection);
+      const bcrypt = await loadBcrypt();
       
-      try {
-        // Vérifier si la collection admins existe
-        const collExists = await db.listCollections({ name: 'admins' }).hasNext();
-        
-        if (!collExists) {
-          // Créer admin par défaut
-          const hashedPassword = await bcrypt.hash('admin123', 10);
-          const defaultAdmin = {
-            id: uuidv4(),
-            name: 'Administrateur',
-            email: 'admin@example.com',
-            password: hashedPassword,
-            role: 'superadmin',
-            createdAt: new Date()
-          };
-          
-          await db.createCollection('admins');
-          await db.collection('admins').insertOne(defaultAdmin);
-          
-          console.log('✅ Collection admins créée avec utilisateur par défaut');
-        }
-        
-        // Chercher l'utilisateur
-        const admin = await db.collection('admins').findOne({ email });
-        
-        if (!admin) {
-          return NextResponse.json({
-            success: false,
-            error: 'Identifiants incorrects',
-            suggestion: process.env.NODE_ENV === 'development' ? 
-              'Essayez avec admin@example.com / admin123' : undefined
-          }, { status: 401, headers: corsHeaders });
-        }
-        
-        // Vérifier le mot de passe
-        const isValidPassword = await bcrypt.compare(password, admin.password);
+      // Chercher l'utilisateur
+      let admin = await db.collection('admins').findOne({ email });
+      
+      // Aucun admin (base neuve) : créer l'admin par défaut. Vérifié seulement
+      // quand l'email est inconnu, une connexion normale ne coûte qu'un findOne.
+      if (!admin && await db.collection('admins').estimatedDocumentCount() === 0) {
+        const hashedPassword = await bcrypt.hash('admin123', 10);
+        const defaultAdmin = {
+          id: uuidv4(),
+          name: 'Administrateur',
+          email: 'admin@example.com',
+          password: hashedPassword,
+          role: 'superadmin',
+          createdAt: new Date()
+        };
         
-        if (!isValidPassword) {
-          return NextResponse.json({
-            success: false,
-            error: 'Identifiants incorrects'
-          }, { status: 401, headers: corsHeaders });
-        }
+        await db.collection('admins').insertOne(defaultAdmin).catch((error) => {
+          // Créé entre-temps par une connexion concurrente
+          if (error.code !== 11000) throw error;
+        });
         
-        // Connexion réussie
+        console.log('✅ Collection admins créée avec utilisateur par défaut');
+        admin = await db.collection('admins').findOne({ email });
+      }
+      
+      if (!admin) {
         return NextResponse.json({
-          success: true,
-          user: {
-            id: admin.id || admin._id.toString(),
-            name: admin.name,
-            email: admin.email,
-            role: admin.role || 'admin'
-          },
-          token: uuidv4(), // Token temporaire
-          message: 'Connexion réussie'
-        }, { headers: corsHeaders });
-        
-      } finally {
-        await client.close();
+          success: false,
+          error: 'Identifiants incorrects',
+          suggestion: process.env.NODE_ENV === 'development' ? 
+            'Essayez avec admin@example.com / admin123' : undefined
+        }, { status: 401, headers: corsHeaders });
       }
       
+      // Vérifier le mot de passe (seul appel bcrypt de la session)
+      const isValidPassword = await timed('bcrypt', () => bcrypt.compare(password, admin.password));
+      
+      if (!isValidPassword) {
+        return NextResponse.json({
+          success: false,
+          error: 'Identifiants incorrects'
+        }, { status: 401, headers: corsHeaders });
+      }
+      
+      // Connexion réussie : jeton signé pour les requêtes suivantes
+      const { token, expiresAt } = await timed('session', () => issueSession(db, admin));
+      
+      return NextResponse.json({
+        success: true,
+        user: {
+          id: admin.id || admin._id.toString(),
+          name: admin.name,
+          email: admin.email,
+          role: admin.role || 'admin'
+        },
+        token,
+        expiresAt,
+        message: 'Connexion réussie'
+      }, { headers: corsHeaders });
+      
     } catch (error) {
       console.error('❌ Erreur login:', error);
       return NextResponse.json({
@@ -664,63 +688,88 @@ export async function POST(request) {
     }
   }
   
-  // ========== CRÉATION DE LIVRE ==========
-  if (path === '/books') {
+  // ========== ADMIN LOGOUT ==========
+  // Révoque le jeton jusqu'à son expiration (liste relue par les autres instances)
+  if (path === '/admin/logout') {
     try {
-      const body = await request.json();
-      const { client, db } = await getDbConnection();
+      const { db } = await timed('db', getDbConnection);
+      const session = await timed('auth', () => verifySession(db, bearerToken(request)));
       
-      try {
-        const book = {
-          id: uuidv4(),
-          ...body,
-          createdAt: new Date(),
-          updatedAt: new Date()
-        };
-        
-        // Validation minimale
-        if (!book.title || !book.author) {
-          return NextResponse.json({
-            success: false,
-            error: 'Titre et auteur requis'
-          }, { status: 400, headers: corsHeaders });
-        }
-        
-        await db.collection('books').insertOne(book);
-        
+      if (!session) {
         return NextResponse.json({
-          success: true,
-          book,
-          message: 'Livre créé avec succès'
-        }, { status: 201, headers: corsHeaders });
-        
-      } finally {
-        await client.close();
+          success: false,
+          error: 'Session invalide ou expirée'
+        }, { status: 401, headers: corsHeaders });
       }
       
+      await revokeSession(db, session);
+      console.log(`🔒 Session révoquée: ${session.email}`);
+      
+      return NextResponse.json({
+        success: true,
+        message: 'Déconnexion réussie'
+      }, { headers: corsHeaders });
     } catch (error) {
-      console.error('❌ Erreur création livre:', error);
+      console.error('❌ Erreur logout:', error);
       return NextResponse.json({
         success: false,
-        error: 'Erreur création livre'
+        error: 'Erreur de déconnexion'
       }, { status: 500, headers: corsHeaders });
     }
   }
   
+  // ========== RECALCUL DES LIVRES SIMILAIRES ==========
+  // Pour un cron (avec RELATED_AUTO_REBUILD=false) : répond à la fin du calcul,
+  // le travail lancé après la réponse n'étant pas garanti sur une plateforme serverless
+  if (path === '/admin/related/rebuild') {
+    try {
+      const { db } = await timed('db', getDbConnection);
+      const report = await timed('related', () => rebuildRelatedNow(db));
+
+      return NextResponse.json({
+        success: true,
+        ...report,
+        message: 'Livres similaires recalculés'
+      }, { headers: corsHeaders });
+    } catch (error) {
+      console.error('❌ Erreur recalcul livres similaires:', error);
+      return NextResponse.json({
+        success: false,
+        error: 'Erreur recalcul livres similaires'
+      }, { status: 500, headers: corsHeaders });
+    }
+  }
+
   // ========== CHAT AI ==========
   if (path === '/chat') {
     try {
       const body = await request.json();
       const { messages } = body;
       
-      if (!messages || !Array.isArray(messages)) {
+      if (!messages || !Array.isArray(messages) || messages.length === 0) {
         return NextResponse.json({
           success: false,
           error: 'Messages requis'
         }, { status: 400, headers: corsHeaders });
       }
       
-      if (!process.env.OPENAI_API_KEY) {
+      const chatHeaders = {
+        'Content-Type': 'text/event-stream',
+        'Cache-Control': 'no-cache',
+        'Connection': 'keep-alive',
+        ...corsHeaders
+      };
+      
+      // Même question sur le même livre : réponse rejouée depuis le cache
+      const cacheKey = chatCacheKey(messages, { bookId: body.bookId });
+      const cachedAnswer = getCachedAnswer(cacheKey);
+      if (cachedAnswer) {
+        return new Response(eventStream(replayAnswer(cachedAnswer)), {
+          headers: { ...chatHeaders, 'X-Chat-Cache': 'HIT' }
+        });
+      }
+      
+      if (!isStubModel() && !process.env.OPENAI_API_KEY) {
         return NextResponse.json({
           success: false,
           error: 'Service AI non configuré',
@@ -728,21 +777,25 @@ export async function POST(request) {
         }, { status: 500, headers: corsHeaders });
       }
       
-      const result = await streamText({
-        model: openai('gpt-3.5-turbo'),
-        messages: messages,
-        temperature: 0.7,
-        maxTokens: 500
-      });
+      // Livre en cours de lecture : seuls les passages pertinents pour la
+      // dernière question sont ajoutés au prompt, quelle que soit la taille du livre
+      let prompt = { messages, pages: [] };
+      if (body.bookId) {
+        const question = [...messages].reverse().find((message) => message.role === 'user')?.content;
+        const { db } = await timed('db', getDbConnection);
+        const passages = await timed('retrieval', () => retrievePassages(db, body.bookId, question));
+        prompt = withBookPassages(messages, passages);
+      }
+      const promptChars = prompt.messages.reduce((sum, message) => sum + String(message.content || '').length, 0);
       
-      const stream = result.toTextStreamResponse();
+      const textStream = await streamChatText(prompt.messages, { temperature: 0.7, maxTokens: 500 });
       
-      return new Response(stream.body, {
+      return new Response(eventStream(recordAnswer(cacheKey, textStream)), {
         headers: {
-          'Content-Type': 'text/event-stream',
-          'Cache-Control': 'no-cache',
-          'Connection': 'keep-alive',
-          ...corsHeaders
+          ...chatHeaders,
+          'X-Chat-Cache': 'MISS',
+          'X-Chat-Context': `passages=${prompt.pages.length}; pages=${prompt.pages.join(',')}`,
+          'X-Chat-Prompt-Chars': String(promptChars)
         }
       });
       
@@ -779,46 +832,42 @@ export async function POST(request) {
         }, { status: 400, headers: corsHeaders });
       }
       
-      const { client, db } = await getDbConnection();
+      const { db } = await timed('db', getDbConnection);
       
-      try {
-        // Vérifier si l'email existe déjà
-        const existingAdmin = await db.collection('admins').findOne({ email });
-        if (existingAdmin) {
-          return NextResponse.json({
-            success: false,
-            error: 'Un admin avec cet email existe déjà'
-          }, { status: 400, headers: corsHeaders });
-        }
-        
-        const hashedPassword = await bcrypt.hash(password, 10);
-        const admin = {
-          id: uuidv4(),
-          name,
-          email,
-          password: hashedPassword,
-          role: 'admin',
-          createdAt: new Date(),
-          updatedAt: new Date()
-        };
-        
-        await db.collection('admins').insertOne(admin);
-        
+      // Vérifier si l'email existe déjà
+      const existingAdmin = await db.collection('admins').findOne({ email });
+      if (existingAdmin) {
         return NextResponse.json({
-          success: true,
-          message: 'Admin créé avec succès',
-          admin: {
-            id: admin.id,
-            name: admin.name,
-            email: admin.email,
-            role: admin.role
-          }
-        }, { headers: corsHeaders });
-        
-      } finally {
-        await client.close();
+          success: false,
+          error: 'Un admin avec cet email existe déjà'
+        }, { status: 400, headers: corsHeaders });
       }
       
+      const bcrypt = await loadBcrypt();
+      const hashedPassword = await bcrypt.hash(password, 10);
+      const admin = {
+        id: uuidv4(),
+        name,
+        email,
+        password: hashedPassword,
+        role: 'admin',
+        createdAt: new Date(),
+        updatedAt: new Date()
+      };
+      
+      await db.collection('admins').insertOne(admin);
+      
+      return NextResponse.json({
+        success: true,
+        message: 'Admin créé avec succès',
+        admin: {
+          id: admin.id,
+          name: admin.name,
+          email: admin.email,
+          role: admin.role
+        }
+      }, { headers: corsHeaders });
+      
     } catch (error) {
       console.error('❌ Erreur création admin:', error);
       return NextResponse.json({
@@ -836,118 +885,74 @@ export async function POST(request) {
 }
 
 // Handler PUT
-export async function PUT(request) {
+async function handlePut(request) {
   console.log(`✏️ PUT ${request.url}`);
   
   const { pathname } = new URL(request.url);
   const path = pathname.replace('/api', '') || '/';
   
-  try {
-    const body = await request.json();
-    const { client, db } = await getDbConnection();
-    
+  const authError = await adminAuthError(request, 'PUT', path);
+  if (authError) return authError;
+  
+  // Partie d'un upload multi-parties : corps binaire, pas de JSON
+  const partMatch = /^\/uploads\/([^/]+)\/parts\/(\d+)$/.exec(path);
+  if (partMatch) {
     try {
-      // Update book
-      if (path.startsWith('/books/')) {
-        const id = path.split('/')[2];
-        
-        // Vérifier existence
-        const existingBook = await db.collection('books').findOne({ id });
-        if (!existingBook) {
-          return NextResponse.json({
-            success: false,
-            error: 'Livre non trouvé'
-          }, { status: 404, headers: corsHeaders });
-        }
-        
-        const updateData = {
-          ...body,
-          updatedAt: new Date()
-        };
-        
-        // Ne pas modifier certaines propriétés
-        delete updateData.id;
-        delete updateData._id;
-        delete updateData.createdAt;
-        
-        const result = await db.collection('books').updateOne(
-          { id },
-          { $set: updateData }
-        );
-        
-        if (result.modifiedCount === 0) {
-          return NextResponse.json({
-            success: false,
-            error: 'Aucune modification'
-          }, { status: 400, headers: corsHeaders });
-        }
-        
-        const updatedBook = await db.collection('books').findOne({ id });
-        
-        return NextResponse.json({
-          success: true,
-          book: updatedBook,
-          message: 'Livre mis à jour'
-        }, { headers: corsHeaders });
-      }
+      const { db } = await timed('db', getDbConnection);
+      const data = Buffer.from(await request.arrayBuffer());
+      const part = await storeUploadPart(db, partMatch[1], parseInt(partMatch[2]), data, request.headers.get('x-part-sha256'));
       
+      return NextResponse.json({ success: true, ...part }, { headers: corsHeaders });
+      
+    } catch (error) {
+      if (error instanceof UploadError) {
+        return NextResponse.json(uploadErrorBody(error), { status: error.status, headers: corsHeaders });
+      }
+      console.error(`❌ PUT Error ${path}:`, error);
       return NextResponse.json({
         success: false,
-        error: 'Route non trouvée'
-      }, { status: 404, headers: corsHeaders });
-      
-    } finally {
-      await client.close();
+        error: 'Erreur serveur'
+      }, { status: 500, headers: corsHeaders });
     }
-    
-  } catch (error) {
-    console.error(`❌ PUT Error ${path}:`, error);
-    return NextResponse.json({
-      success: false,
-      error: 'Erreur serveur'
-    }, { status: 500, headers: corsHeaders });
   }
+  
+  return NextResponse.json({
+    success: false,
+    error: 'Route non trouvée'
+  }, { status: 404, headers: corsHeaders });
 }
 
 // Handler DELETE
-export async function DELETE(request) {
+async function handleDelete(request) {
   console.log(`🗑️ DELETE ${request.url}`);
   
   const { pathname } = new URL(request.url);
   const path = pathname.replace('/api', '') || '/';
   
+  const authError = await adminAuthError(request, 'DELETE', path);
+  if (authError) return authError;
+  
   try {
-    const { client, db } = await getDbConnection();
+    const { db } = await timed('db', getDbConnection);
     
-    try {
-      // Delete book
-      if (path.startsWith('/books/')) {
-        const id = path.split('/')[2];
-        
-        const result = await db.collection('books').deleteOne({ id });
-        
-        if (result.deletedCount === 1) {
-          return NextResponse.json({
-            success: true,
-            message: 'Livre supprimé'
-          }, { headers: corsHeaders });
-        } else {
-          return NextResponse.json({
-            success: false,
-            error: 'Livre non trouvé'
-          }, { status: 404, headers: corsHeaders });
+    // Abandon d'un upload multi-parties
+    if (path.startsWith('/uploads/')) {
+      try {
+        await abortUploadSession(db, path.split('/')[2]);
+        return NextResponse.json({ success: true, message: 'Upload annulé' }, { headers: corsHeaders });
+      } catch (error) {
+        if (error instanceof UploadError) {
+          return NextResponse.json(uploadErrorBody(error), { status: error.status, headers: corsHeaders });
         }
+        throw error;
       }
-      
-      return NextResponse.json({
-        success: false,
-        error: 'Route non trouvée'
-      }, { status: 404, headers: corsHeaders });
-      
-    } finally {
-      await client.close();
     }
     
+    return NextResponse.json({
+      success: false,
+      error: 'Route non trouvée'
+    }, { status: 404, headers: corsHeaders });
+    
   } catch (error) {
     console.error(`❌ DELETE Error ${path}:`, error);
     return NextResponse.json({
@@ -956,3 +961,9 @@ export async function DELETE(request) {
     }, { status: 500, headers: corsHeaders });
   }
 }
+
+export const OPTIONS = withTiming('OPTIONS', preflight);
+export const GET = withTiming('GET', withCompression(withAdmission(handleGet)));
+export const POST = withTiming('POST', withCompression(withAdmission(handlePost)));
+export const PUT = withTiming('PUT', withAdmission(handlePut));
+export const DELETE = withTiming('DELETE', handleDelete);
@@ -0,0 +1,38 @@
+import { NextResponse } from 'next/server';
+import { withTiming } from '@/lib/timing';
+import { withAdmission } from '@/lib/rateLimit';
+import { withCompression } from '@/lib/compression';
+import { corsHeaders, preflight } from '@/lib/cors';
+import { withAdminAuth } from '@/lib/session';
+import { handleCatalogGet, handleCatalogBatch } from '@/lib/catalog';
+import {
+  handleBookExport,
+  handleBookImport,
+  handleBookUpdate,
+  handleBookDelete,
+} from '@/lib/bookWrites';
+
+// GET /api/books/:id, POST /api/books/batch, export / import NDJSON,
+// modification et suppression dans leur propre fonction (voir
+// app/api/books/route.js).
+const catalogGet = withTiming('GET', withCompression(handleCatalogGet));
+const bookExport = withTiming('GET', withAdmission(handleBookExport));
+const catalogBatch = withTiming('POST', withCompression(handleCatalogBatch));
+const bookImport = withTiming('POST', withCompression(withAdmission(withAdminAuth(handleBookImport))));
+
+const notFound = () => NextResponse.json({
+  success: false,
+  error: 'Route non trouvée'
+}, { status: 404, headers: corsHeaders });
+
+export const OPTIONS = withTiming('OPTIONS', preflight);
+export const GET = async (request, context) => (
+  context.params.id === 'export' ? bookExport(request) : catalogGet(request)
+);
+export const POST = async (request, context) => {
+  if (context.params.id === 'batch') return catalogBatch(request);
+  if (context.params.id === 'import') return bookImport(request);
+  return notFound();
+};
+export const PUT = withTiming('PUT', withAdminAuth(handleBookUpdate));
+export const DELETE = withTiming('DELETE', withAdminAuth(handleBookDelete));
@@ -0,0 +1,15 @@
+import { withTiming } from '@/lib/timing';
+import { withAdmission } from '@/lib/rateLimit';
+import { withCompression } from '@/lib/compression';
+import { preflight } from '@/lib/cors';
+import { withAdminAuth } from '@/lib/session';
+import { handleCatalogGet } from '@/lib/catalog';
+import { handleBookCreate } from '@/lib/bookWrites';
+
+// GET /api/books et la création (POST) dans leur propre fonction : le bundle
+// ne contient que le catalogue (lib/catalog.js, lib/bookWrites.js), pas la
+// route générique.
+
+export const OPTIONS = withTiming('OPTIONS', preflight);
+export const GET = withTiming('GET', withCompression(withAdmission(handleCatalogGet)));
+export const POST = withTiming('POST', withCompression(withAdminAuth(handleBookCreate)));
@@ -0,0 +1,8 @@
+import { withTiming } from '@/lib/timing';
+import { withCompression } from '@/lib/compression';
+import { preflight } from '@/lib/cors';
+import { handleCatalogGet } from '@/lib/catalog';
+
+// GET /api/categories dans sa propre fonction (voir app/api/books/route.js)
+export const OPTIONS = withTiming('OPTIONS', preflight);
+export const GET = withTiming('GET', withCompression(handleCatalogGet));
@@ -12,6 +12,7 @@ import { Tabs, TabsContent, TabsList, TabsTrigger } from '@/components/ui/tabs';
 import Link from 'next/link';
 import ReactMarkdown from 'react-markdown';
 import AudioPlayer from '@/components/AudioPlayer';
+import CoverImage from '@/components/CoverImage';
 
 // Import React PDF Viewer
 import { Viewer, Worker, SpecialZoomLevel } from '@react-pdf-viewer/core';
@@ -33,7 +34,6 @@ export default function BookPage({ params }) {
   const [book, setBook] = useState(null);
   const [loading, setLoading] = useState(true);
   const [relatedBooks, setRelatedBooks] = useState([]);
-  const [loadingRelated, setLoadingRelated] = useState(false);
   const [messages, setMessages] = useState([]);
   const [input, setInput] = useState('');
   const [isLoadingChat, setIsLoadingChat] = useState(false);
@@ -101,12 +101,6 @@ export default function BookPage({ params }) {
     return () => window.removeEventListener('resize', calculateHeight);
   }, [params.id]);
 
-  useEffect(() => {
-    if (book && book.category) {
-      fetchRelatedBooks();
-    }
-  }, [book]);
-
   useEffect(() => {
     const calculateHeight = () => {
       const headerHeight = 64;
@@ -120,10 +114,12 @@ export default function BookPage({ params }) {
 
   const fetchBook = async () => {
     try {
-      const res = await fetch(`/api/books/${params.id}`);
+      // Livres similaires précalculés, dans la même réponse
+      const res = await fetch(`/api/books/${params.id}?include=related`);
       const data = await res.json();
       if (data.book) {
         setBook(data.book);
+        setRelatedBooks(data.related || []);
       }
     } catch (error) {
       console.error('Erreur:', error);
@@ -132,26 +128,6 @@ export default function BookPage({ params }) {
     }
   };
 
-  const fetchRelatedBooks = async () => {
-    if (!book?.category) return;
-    
-    setLoadingRelated(true);
-    try {
-      const params = new URLSearchParams({
-        category: book.category,
-        exclude: book.id,
-        limit: '10'
-      });
-
-      const res = await fetch(`/api/books?${params.toString()}`);
-      const data = await res.json();
-      setRelatedBooks(data.books || []);
-    } catch (error) {
-      console.error('Erreur lors du chargement des livres similaires:', error);
-    } finally {
-      setLoadingRelated(false);
-    }
-  };
 
   const sendMessage = async (e) => {
     e.preventDefault();
@@ -168,6 +144,7 @@ export default function BookPage({ params }) {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({
+          bookId: book?.id,
           messages: [
             {
               role: 'system',
@@ -805,117 +782,112 @@ export default function BookPage({ params }) {
       </Link>
     </div>
 
-    {loadingRelated ? (
-      <div className="flex justify-center py-8">
-        <Loader2 className="w-6 h-6 animate-spin text-primary" />
-      </div>
-    ) : (
-      <div className="relative">
-        {/* Navigation buttons */}
-        {relatedBooks.length > 6 && (
-          <>
-            <Button
-              variant="outline"
-              size="icon"
-              className="absolute left-0 top-1/2 -translate-y-1/2 -translate-x-4 z-10 bg-background/80 backdrop-blur-sm"
-              onClick={prevSlide}
-              disabled={currentSlide === 0}
-            >
-              <ChevronLeft className="w-4 h-4" />
-            </Button>
-            
-            <Button
-              variant="outline"
-              size="icon"
-              className="absolute right-0 top-1/2 -translate-y-1/2 translate-x-4 z-10 bg-background/80 backdrop-blur-sm"
-              onClick={nextSlide}
-              disabled={currentSlide >= Math.ceil(relatedBooks.length / 6) - 1}
-            >
-              <ChevronRight className="w-4 h-4" />
-            </Button>
-          </>
-        )}
-
-        {/* Books grid */}
-        <div className="overflow-hidden">
-          <motion.div
-            key={currentSlide}
-            initial={{ opacity: 0, x: 20 }}
-            animate={{ opacity: 1, x: 0 }}
-            exit={{ opacity: 0, x: -20 }}
-            className="grid grid-cols-2 md:grid-cols-3 lg:grid-cols-6 gap-4"
+    <div className="relative">
+      {/* Navigation buttons */}
+      {relatedBooks.length > 6 && (
+        <>
+          <Button
+            variant="outline"
+            size="icon"
+            className="absolute left-0 top-1/2 -translate-y-1/2 -translate-x-4 z-10 bg-background/80 backdrop-blur-sm"
+            onClick={prevSlide}
+            disabled={currentSlide === 0}
           >
-            {getCurrentSlideBooks().map((relatedBook) => (
-              <Link 
-                key={relatedBook.id || relatedBook._id} 
-                href={`/book/${relatedBook.id || relatedBook._id}`}
-                className="group"
-              >
-                <Card className="h-full border-border/50 bg-card/50 backdrop-blur-sm hover:bg-card/80 transition-all duration-300 hover:shadow-lg hover:scale-[1.02] overflow-hidden">
-                  <CardContent className="p-4 h-full flex flex-col">
-                    <div className="flex-1">
-                      <div className="aspect-[3/4] bg-gradient-to-br from-primary/10 to-secondary/10 rounded-lg mb-3 flex items-center justify-center overflow-hidden">
-                        {relatedBook.coverImage ? (
-                          <div className="relative w-full h-full">
-                            <img
-                              src={relatedBook.coverImage}
-                              alt={relatedBook.title}
-                              className="w-full h-full object-cover group-hover:scale-105 transition-transform duration-300"
-                              onError={(e) => {
-                                // Si l'image ne se charge pas, afficher une icône
-                                e.target.style.display = 'none';
-                                e.target.parentElement.innerHTML = `
-                                  <div class="w-full h-full flex items-center justify-center bg-gradient-to-br from-primary/20 to-secondary/20">
-                                    <BookOpen class="w-12 h-12 text-primary/60" />
-                                  </div>
-                                `;
-                              }}
-                            />
-                          </div>
-                        ) : (
-                          <div className="w-full h-full flex items-center justify-center bg-gradient-to-br from-primary/20 to-secondary/20">
-                            <BookOpen className="w-12 h-12 text-primary/60" />
-                          </div>
-                        )}
-                      </div>
-                      
-                      <h3 className="font-semibold text-sm line-clamp-2 mb-1 group-hover:text-primary transition-colors">
-                        {relatedBook.title}
-                      </h3>
-                      <p className="text-xs text-muted-foreground line-clamp-1 mb-2">
-                        {relatedBook.author}
-                      </p>
+            <ChevronLeft className="w-4 h-4" />
+          </Button>
+          
+          <Button
+            variant="outline"
+            size="icon"
+            className="absolute right-0 top-1/2 -translate-y-1/2 translate-x-4 z-10 bg-background/80 backdrop-blur-sm"
+            onClick={nextSlide}
+            disabled={currentSlide >= Math.ceil(relatedBooks.length / 6) - 1}
+          >
+            <ChevronRight className="w-4 h-4" />
+          </Button>
+        </>
+      )}
+
+      {/* Books grid */}
+      <div className="overflow-hidden">
+        <motion.div
+          key={currentSlide}
+          initial={{ opacity: 0, x: 20 }}
+          animate={{ opacity: 1, x: 0 }}
+          exit={{ opacity: 0, x: -20 }}
+          className="grid grid-cols-2 md:grid-cols-3 lg:grid-cols-6 gap-4"
+        >
+          {getCurrentSlideBooks().map((relatedBook) => (
+            <Link 
+              key={relatedBook.id || relatedBook._id} 
+              href={`/book/${relatedBook.id || relatedBook._id}`}
+              className="group"
+            >
+              <Card className="h-full border-border/50 bg-card/50 backdrop-blur-sm hover:bg-card/80 transition-all duration-300 hover:shadow-lg hover:scale-[1.02] overflow-hidden">
+                <CardContent className="p-4 h-full flex flex-col">
+                  <div className="flex-1">
+                    <div className="aspect-[3/4] bg-gradient-to-br from-primary/10 to-secondary/10 rounded-lg mb-3 flex items-center justify-center overflow-hidden">
+                      {relatedBook.coverImage ? (
+                        <div className="relative w-full h-full">
+                          <CoverImage
+                            book={relatedBook}
+                            sizes="(min-width: 1024px) 16vw, (min-width: 768px) 33vw, 50vw"
+                            loading="lazy"
+                            className="w-full h-full object-cover group-hover:scale-105 transition-transform duration-300"
+                            onError={(e) => {
+                              // Si l'image ne se charge pas, afficher une icône
+                              e.target.style.display = 'none';
+                              e.target.parentElement.innerHTML = `
+                                <div class="w-full h-full flex items-center justify-center bg-gradient-to-br from-primary/20 to-secondary/20">
+                                  <BookOpen class="w-12 h-12 text-primary/60" />
+                                </div>
+                              `;
+                            }}
+                          />
+                        </div>
+                      ) : (
+                        <div className="w-full h-full flex items-center justify-center bg-gradient-to-br from-primary/20 to-secondary/20">
+                          <BookOpen className="w-12 h-12 text-primary/60" />
+                        </div>
+                      )}
                     </div>
                     
-                    <Badge variant="secondary" className="text-xs w-fit">
-                      {relatedBook.category}
-                    </Badge>
-                  </CardContent>
-                </Card>
-              </Link>
-            ))}
-          </motion.div>
-        </div>
-
-        {/* Slide indicators */}
-        {relatedBooks.length > 6 && (
-          <div className="flex justify-center gap-2 mt-6">
-            {Array.from({ length: Math.ceil(relatedBooks.length / 6) }).map((_, index) => (
-              <button
-                key={index}
-                onClick={() => setCurrentSlide(index)}
-                className={`w-2 h-2 rounded-full transition-all ${
-                  index === currentSlide 
-                    ? 'bg-primary w-6' 
-                    : 'bg-muted-foreground/30 hover:bg-muted-foreground/50'
-                }`}
-                aria-label={`Aller au slide ${index + 1}`}
-              />
-            ))}
-          </div>
-        )}
+                    <h3 className="font-semibold text-sm line-clamp-2 mb-1 group-hover:text-primary transition-colors">
+                      {relatedBook.title}
+                    </h3>
+                    <p className="text-xs text-muted-foreground line-clamp-1 mb-2">
+                      {relatedBook.author}
+                    </p>
+                  </div>
+                  
+                  <Badge variant="secondary" className="text-xs w-fit">
+                    {relatedBook.category}
+                  </Badge>
+                </CardContent>
+              </Card>
+            </Link>
+          ))}
+        </motion.div>
       </div>
-    )}
+
+      {/* Slide indicators */}
+      {relatedBooks.length > 6 && (
+        <div className="flex justify-center gap-2 mt-6">
+          {Array.from({ length: Math.ceil(relatedBooks.length / 6) }).map((_, index) => (
+            <button
+              key={index}
+              onClick={() => setCurrentSlide(index)}
+              className={`w-2 h-2 rounded-full transition-all ${
+                index === currentSlide 
+                  ? 'bg-primary w-6' 
+                  : 'bg-muted-foreground/30 hover:bg-muted-foreground/50'
+              }`}
+              aria-label={`Aller au slide ${index + 1}`}
+            />
+          ))}
+        </div>
+      )}
+    </div>
   </motion.div>
 )}
       </div>
@@ -0,0 +1,24 @@
+'use client';
+
+// Couverture responsive : sources AVIF / WebP du manifeste `coverSet` quand il
+// existe, sinon l'image d'origine. `sizes` indique la largeur affichée pour
+// que le navigateur choisisse le plus petit dérivé suffisant.
+export default function CoverImage({ book, sizes = '320px', alt, ...imgProps }) {
+  const srcset = book?.coverSet?.srcset || {};
+
+  return (
+    <picture className="contents">
+      {Object.entries(srcset).map(([type, value]) => (
+        <source key={type} type={type} srcSet={value} sizes={sizes} />
+      ))}
+      <img
+        src={book.coverImage}
+        alt={alt ?? book.title}
+        width={book.coverSet?.width}
+        height={book.coverSet?.height}
+        decoding="async"
+        {...imgProps}
+      />
+    </picture>
+  );
+}
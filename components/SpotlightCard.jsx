@@ -7,6 +7,7 @@ import { Badge } from '@/components/ui/badge';
 import { BookOpen } from 'lucide-react';
 import Link from 'next/link';
 import Image from 'next/image';
+import CoverImage from '@/components/CoverImage';
 
 export default function SpotlightCard({ book }) {
   const [mousePosition, setMousePosition] = useState({ x: 0, y: 0 });
@@ -56,9 +57,9 @@ export default function SpotlightCard({ book }) {
                       <div className="w-8 h-8 border-4 border-primary border-t-transparent rounded-full animate-spin" />
                     </div>
                   )}
-                  <img
-                    src={book.coverImage}
-                    alt={book.title}
+                  <CoverImage
+                    book={book}
+                    sizes="(min-width: 1280px) 25vw, (min-width: 1024px) 33vw, (min-width: 768px) 50vw, 100vw"
                     className={`w-full h-full object-cover transition-opacity duration-300 ${imageLoaded ? 'opacity-100' : 'opacity-0'}`}
                     onLoad={() => setImageLoaded(true)}
                     loading="lazy"
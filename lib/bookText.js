@@ -0,0 +1,318 @@
+import { createHash } from 'crypto';
+import { timed } from '@/lib/timing';
+import { stripAccents } from '@/lib/search';
+import { readStoredUpload } from '@/lib/storage';
+import { sizeLimits } from '@/lib/upload';
+import { bumpCatalogVersion } from '@/lib/httpCache';
+
+// Index du texte des livres pour le chat : le texte d'un PDF est extrait et
+// découpé en passages une seule fois, puis chaque question ne transmet au
+// modèle que les passages les mieux classés (BM25). La taille du prompt ne
+// dépend pas de la longueur du livre.
+//
+// L'extraction (PDF entier en mémoire, analyse pdfjs) n'a jamais lieu pendant
+// un upload ni l'enregistrement d'un livre : ceux-ci ne font que rattacher un
+// index existant. Elle est faite au premier tour de chat sur le livre, une
+// seule à la fois par process (un seul PDF en mémoire).
+//
+// - book_texts    : un document par PDF (clé dérivée du contenu, originals[])
+// - book_passages : passages de BOOK_PASSAGE_WORDS mots avec leurs fréquences
+//                   de termes ; index multiclé (textKey, terms) pour ne lire
+//                   que les passages contenant un mot de la question
+//
+// Le livre référence son index par `textIndex` ({ key, pages, passages }).
+// L'extraction utilise pdfjs-dist ; un PDF sans texte (scan) a 0 passage.
+
+const TEXTS = 'book_texts';
+const PASSAGES = 'book_passages';
+
+const PASSAGE_WORDS = parseInt(process.env.BOOK_PASSAGE_WORDS) || 180;
+const PASSAGE_OVERLAP = parseInt(process.env.BOOK_PASSAGE_OVERLAP ?? '30');
+const CONTEXT_PASSAGES = parseInt(process.env.CHAT_CONTEXT_PASSAGES) || 4;
+const CONTEXT_MAX_CHARS = parseInt(process.env.CHAT_CONTEXT_MAX_CHARS) || 4000;
+const MAX_QUERY_TERMS = 16;
+const INSERT_BATCH = 500;
+
+// Paramètres BM25 usuels
+const K1 = 1.2;
+const B = 0.75;
+
+const stopWords = new Set([
+  'au', 'aux', 'avec', 'ce', 'ces', 'cet', 'cette', 'dans', 'de', 'des', 'du', 'elle', 'en', 'est', 'et',
+  'il', 'ils', 'je', 'la', 'le', 'les', 'leur', 'lui', 'ma', 'mais', 'me', 'mes', 'moi', 'mon', 'ne',
+  'nous', 'on', 'ou', 'par', 'pas', 'pour', 'qu', 'que', 'qui', 'quoi', 'sa', 'se', 'ses', 'son', 'sont',
+  'sur', 'ta', 'te', 'tes', 'toi', 'ton', 'tu', 'un', 'une', 'vos', 'votre', 'vous', 'ete', 'etre',
+  'a', 'an', 'and', 'are', 'as', 'at', 'be', 'by', 'for', 'from', 'in', 'is', 'it', 'of', 'on', 'or',
+  'that', 'the', 'this', 'to', 'was', 'what', 'who', 'with', 'livre',
+]);
+
+// "L'Été de Jean-Valjean" -> ['ete', 'jean', 'valjean'] (clés de champ MongoDB sûres)
+export function tokenize(text) {
+  return (stripAccents(String(text || '').toLowerCase()).match(/[a-z0-9]+/g) || [])
+    .filter((term) => term.length > 1 && !stopWords.has(term));
+}
+
+// ---------- Extraction et découpage ----------
+
+let pdfjsPromise = null;
+function loadPdfjs() {
+  pdfjsPromise = pdfjsPromise || import('pdfjs-dist/legacy/build/pdf.js')
+    .then((module) => module.default || module)
+    .catch(() => {
+      console.warn('⚠️ pdfjs-dist indisponible : texte des livres non indexé');
+      return null;
+    });
+  return pdfjsPromise;
+}
+
+async function extractPages(pdfjs, data) {
+  const document = await pdfjs.getDocument({
+    // Vue sur le Buffer, sans copie
+    data: new Uint8Array(data.buffer, data.byteOffset, data.length),
+    isEvalSupported: false,
+    disableFontFace: true,
+    verbosity: 0,
+  }).promise;
+
+  const pages = [];
+  try {
+    for (let number = 1; number <= document.numPages; number++) {
+      const page = await document.getPage(number);
+      const content = await page.getTextContent();
+      const text = content.items.map((item) => item.str || '').join(' ').replace(/\s+/g, ' ').trim();
+      pages.push({ page: number, text });
+      page.cleanup();
+    }
+  } finally {
+    await document.destroy();
+  }
+  return pages;
+}
+
+// Passages de PASSAGE_WORDS mots se chevauchant de PASSAGE_OVERLAP mots,
+// chacun rattaché à la page où il commence
+export function chunkPages(pages) {
+  const words = [];
+  for (const { page, text } of pages) {
+    for (const word of text.split(' ')) {
+      if (word) words.push([word, page]);
+    }
+  }
+
+  const step = Math.max(PASSAGE_WORDS - PASSAGE_OVERLAP, 1);
+  const passages = [];
+  for (let start = 0; start < words.length; start += step) {
+    const slice = words.slice(start, start + PASSAGE_WORDS);
+    passages.push({ page: slice[0][1], text: slice.map(([word]) => word).join(' ') });
+    if (start + PASSAGE_WORDS >= words.length) break;
+  }
+  return passages;
+}
+
+function passageDocs(key, passages) {
+  return passages.map(({ page, text }, n) => {
+    const tf = {};
+    const terms = tokenize(text);
+    for (const term of terms) tf[term] = (tf[term] || 0) + 1;
+    return { textKey: key, n, page, text, length: terms.length, terms: Object.keys(tf), tf };
+  });
+}
+
+// Insertion idempotente : une indexation concurrente du même PDF écrit les mêmes passages
+async function insertIgnoringDuplicates(collection, docs) {
+  for (let i = 0; i < docs.length; i += INSERT_BATCH) {
+    try {
+      await collection.insertMany(docs.slice(i, i + INSERT_BATCH), { ordered: false });
+    } catch (error) {
+      if (error.code !== 11000) throw error;
+    }
+  }
+}
+
+export function textIndexView(doc) {
+  if (!doc) return null;
+  return { key: doc._id, pages: doc.pages, passages: doc.passages };
+}
+
+// Index du PDF `data` publié à `url`. Un PDF déjà indexé (même contenu,
+// quelle que soit l'URL) n'est pas retraité.
+export async function indexBookText(db, { url, data }) {
+  const key = createHash('sha256').update(data).digest('hex').slice(0, 24);
+  const texts = db.collection(TEXTS);
+
+  const existing = await texts.findOneAndUpdate(
+    { _id: key },
+    { $addToSet: { originals: url } },
+    { returnDocument: 'after' }
+  );
+  if (existing) return textIndexView(existing);
+
+  const pdfjs = await loadPdfjs();
+  if (!pdfjs) return null;
+
+  const started = Date.now();
+  const pages = await extractPages(pdfjs, data);
+  const docs = passageDocs(key, chunkPages(pages));
+  await insertIgnoringDuplicates(db.collection(PASSAGES), docs);
+
+  // Le document book_texts n'est écrit qu'une fois les passages en place
+  const totalLength = docs.reduce((sum, doc) => sum + doc.length, 0);
+  const doc = {
+    _id: key,
+    originals: [url],
+    pages: pages.length,
+    passages: docs.length,
+    avgLength: docs.length > 0 ? totalLength / docs.length : 0,
+    createdAt: new Date(),
+  };
+  try {
+    await texts.insertOne(doc);
+  } catch (error) {
+    if (error.code !== 11000) throw error;
+    await texts.updateOne({ _id: key }, { $addToSet: { originals: url } });
+  }
+
+  console.log(`📚 ${docs.length} passages indexés (${pages.length} pages) en ${Date.now() - started}ms`);
+  return textIndexView(doc);
+}
+
+const isPdfUrl = (url) => Boolean(url) && /\.pdf($|\?)/i.test(url);
+
+// Index déjà construit pour le PDF `url`, ou null. Ne lit jamais le fichier :
+// appelé sur le chemin des uploads et des écritures de livres.
+export async function textIndexForUrl(db, url) {
+  if (!isPdfUrl(url)) return null;
+
+  try {
+    return textIndexView(await db.collection(TEXTS).findOne({ originals: url }));
+  } catch (error) {
+    console.error('❌ Lecture de l\'index de texte échouée:', url, error.message);
+    return null;
+  }
+}
+
+// Extractions : une seule à la fois par process, une seule par URL
+const extraction = globalThis._bookTextExtraction || (globalThis._bookTextExtraction = {
+  tail: Promise.resolve(),
+  byUrl: new Map(),
+});
+
+// Construit l'index du PDF `url`. N'échoue jamais : sans index, le chat
+// répond sans extraits du livre.
+function buildTextIndex(db, url) {
+  if (!extraction.byUrl.has(url)) {
+    const run = extraction.tail
+      .then(async () => {
+        const known = await textIndexForUrl(db, url);
+        if (known || !await loadPdfjs()) return known;
+
+        const data = await readStoredUpload(url, sizeLimits.book);
+        return data ? await indexBookText(db, { url, data }) : null;
+      })
+      .catch((error) => {
+        console.error('❌ Indexation du texte indisponible:', url, error.message);
+        return null;
+      })
+      .finally(() => extraction.byUrl.delete(url));
+    extraction.tail = run;
+    extraction.byUrl.set(url, run);
+  }
+  return extraction.byUrl.get(url);
+}
+
+// Index du livre, construit et rattaché au livre au premier besoin
+async function bookTextIndex(db, book) {
+  if (book.textIndex?.key) return book.textIndex;
+  if (!isPdfUrl(book.pdfUrl)) return null;
+
+  const textIndex = await timed('text', () => buildTextIndex(db, book.pdfUrl));
+  if (textIndex) {
+    await db.collection('books').updateOne({ id: book.id }, { $set: { textIndex } });
+    await bumpCatalogVersion(db);
+  }
+  return textIndex;
+}
+
+// ---------- Recherche ----------
+
+async function rankPassages(db, key, terms, k) {
+  const tfProjection = Object.fromEntries(terms.map((term) => [`tf.${term}`, 1]));
+  const [text, candidates] = await Promise.all([
+    db.collection(TEXTS).findOne({ _id: key }, { projection: { passages: 1, avgLength: 1 } }),
+    db.collection(PASSAGES)
+      .find({ textKey: key, terms: { $in: terms } }, { projection: { _id: 0, n: 1, length: 1, ...tfProjection } })
+      .toArray(),
+  ]);
+  if (!text || candidates.length === 0) return [];
+
+  // Les candidats sont exactement les passages contenant un terme : df exact
+  const df = {};
+  for (const candidate of candidates) {
+    for (const term of Object.keys(candidate.tf)) df[term] = (df[term] || 0) + 1;
+  }
+
+  const avgLength = text.avgLength || 1;
+  const scored = candidates.map((candidate) => {
+    let score = 0;
+    for (const [term, tf] of Object.entries(candidate.tf)) {
+      const idf = Math.log(1 + (text.passages - df[term] + 0.5) / (df[term] + 0.5));
+      score += idf * tf * (K1 + 1) / (tf + K1 * (1 - B + B * candidate.length / avgLength));
+    }
+    return { n: candidate.n, score };
+  });
+  return scored.sort((a, b) => b.score - a.score || a.n - b.n).slice(0, k);
+}
+
+// Les `k` passages du livre `bookId` les plus pertinents pour `query`, par
+// score décroissant : [{ n, page, score, text }]. [] si le livre n'a pas de
+// texte indexable ; le premier appel pour un livre construit son index.
+export async function retrievePassages(db, bookId, query, { k = CONTEXT_PASSAGES } = {}) {
+  const terms = [...new Set(tokenize(query))].slice(0, MAX_QUERY_TERMS);
+  if (!bookId || terms.length === 0) return [];
+
+  try {
+    const book = await db.collection('books').findOne({ id: bookId }, { projection: { _id: 0, id: 1, textIndex: 1, pdfUrl: 1 } });
+    const textIndex = book && await bookTextIndex(db, book);
+    const key = textIndex?.key;
+    if (!key || !textIndex.passages) return [];
+
+    const top = await rankPassages(db, key, terms, k);
+    const texts = await db.collection(PASSAGES)
+      .find({ textKey: key, n: { $in: top.map(({ n }) => n) } }, { projection: { _id: 0, n: 1, page: 1, text: 1 } })
+      .toArray();
+    const byN = new Map(texts.map((passage) => [passage.n, passage]));
+    return top.filter(({ n }) => byN.has(n)).map(({ n, score }) => ({ ...byN.get(n), score }));
+  } catch (error) {
+    console.error('❌ Recherche de passages échouée:', bookId, error.message);
+    return [];
+  }
+}
+
+// Ajoute les passages aux messages, dans un message système placé après les
+// consignes du client ; au plus CONTEXT_MAX_CHARS caractères d'extraits.
+export function withBookPassages(messages, passages) {
+  const entries = [];
+  let length = 0;
+  for (const passage of passages) {
+    const entry = `[p. ${passage.page}] ${passage.text}`;
+    if (length + entry.length > CONTEXT_MAX_CHARS) {
+      if (entries.length === 0) entries.push({ passage, entry: entry.slice(0, CONTEXT_MAX_CHARS) });
+      break;
+    }
+    entries.push({ passage, entry });
+    length += entry.length;
+  }
+  if (entries.length === 0) return { messages, pages: [] };
+
+  const context = {
+    role: 'system',
+    content: 'Extraits du livre pertinents pour la question (cite la page si utile) :\n\n'
+      + entries.map(({ entry }) => entry).join('\n\n'),
+  };
+  const leading = messages.findIndex((message) => message.role !== 'system');
+  const at = leading === -1 ? messages.length : leading;
+  return {
+    messages: [...messages.slice(0, at), context, ...messages.slice(at)],
+    pages: entries.map(({ passage }) => passage.page),
+  };
+}
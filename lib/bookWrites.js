@@ -0,0 +1,240 @@
+import { NextResponse } from 'next/server';
+import { v4 as uuidv4 } from 'uuid';
+import { getDbConnection } from '@/lib/mongodb';
+import { timed } from '@/lib/timing';
+import { corsHeaders } from '@/lib/cors';
+import { recordBookChange, rebuildFacets } from '@/lib/facets';
+import { queueRelatedChange, rebuildRelatedInBackground } from '@/lib/related';
+import { importBooks, exportBooks } from '@/lib/bulk';
+import { bumpCatalogVersion } from '@/lib/httpCache';
+import { coverSetForUrl } from '@/lib/covers';
+import { textIndexForUrl } from '@/lib/bookText';
+
+// Écritures sur le catalogue (création, modification, suppression) et
+// import / export NDJSON.
+//
+// Importées directement par les routes dédiées app/api/books et
+// app/api/books/[id] : leur bundle ne contient pas la route générique (chat,
+// upload multipart, admin). L'authentification admin est vérifiée avant
+// l'appel (withAdminAuth, lib/session.js).
+
+// ========== EXPORT NDJSON (GET /books/export) ==========
+// Filtres category / author optionnels
+export async function handleBookExport(request) {
+  const { searchParams } = new URL(request.url);
+
+  try {
+    const { db } = await timed('db', getDbConnection);
+    const query = {};
+    const category = searchParams.get('category');
+    const author = searchParams.get('author');
+    if (category && category !== 'all') query.category = category;
+    if (author && author !== 'all') query.author = author;
+
+    return new Response(exportBooks(db, query), {
+      headers: {
+        'Content-Type': 'application/x-ndjson; charset=utf-8',
+        'Content-Disposition': 'attachment; filename="books.ndjson"',
+        'Cache-Control': 'no-store',
+        ...corsHeaders
+      }
+    });
+  } catch (error) {
+    console.error('❌ Erreur export:', error);
+    return NextResponse.json({
+      success: false,
+      error: 'Erreur serveur'
+    }, { status: 500, headers: corsHeaders });
+  }
+}
+
+// ========== IMPORT EN MASSE (POST /books/import, NDJSON) ==========
+export async function handleBookImport(request) {
+  try {
+    if (!request.body) {
+      return NextResponse.json({
+        success: false,
+        error: 'Corps NDJSON requis'
+      }, { status: 400, headers: corsHeaders });
+    }
+
+    const { db } = await timed('db', getDbConnection);
+    const started = Date.now();
+    const report = await importBooks(db, request.body);
+
+    if (report.inserted + report.upserted + report.updated > 0) {
+      await rebuildFacets(db);
+      await bumpCatalogVersion(db);
+      rebuildRelatedInBackground(db);
+    }
+
+    const seconds = (Date.now() - started) / 1000;
+    console.log(`📥 Import: ${report.rows} lignes, ${report.failed} erreurs en ${seconds.toFixed(1)}s`);
+
+    return NextResponse.json({
+      success: report.failed === 0,
+      ...report,
+      durationMs: Date.now() - started
+    }, { status: report.failed === report.rows && report.rows > 0 ? 400 : 200, headers: corsHeaders });
+
+  } catch (error) {
+    console.error('❌ Erreur import:', error);
+    return NextResponse.json({
+      success: false,
+      error: 'Erreur import',
+      details: error.message
+    }, { status: 500, headers: corsHeaders });
+  }
+}
+
+// ========== CRÉATION DE LIVRE (POST /books) ==========
+export async function handleBookCreate(request) {
+  try {
+    const body = await request.json();
+    const { db } = await timed('db', getDbConnection);
+
+    const book = {
+      id: uuidv4(),
+      ...body,
+      createdAt: new Date(),
+      updatedAt: new Date()
+    };
+
+    // Validation minimale
+    if (!book.title || !book.author) {
+      return NextResponse.json({
+        success: false,
+        error: 'Titre et auteur requis'
+      }, { status: 400, headers: corsHeaders });
+    }
+
+    book.coverSet = await timed('covers', () => coverSetForUrl(db, book.coverImage));
+    book.textIndex = await timed('text', () => textIndexForUrl(db, book.pdfUrl));
+
+    await db.collection('books').insertOne(book);
+    await recordBookChange(db, null, book);
+    queueRelatedChange(db, null, book);
+    await bumpCatalogVersion(db);
+
+    return NextResponse.json({
+      success: true,
+      book,
+      message: 'Livre créé avec succès'
+    }, { status: 201, headers: corsHeaders });
+
+  } catch (error) {
+    console.error('❌ Erreur création livre:', error);
+    return NextResponse.json({
+      success: false,
+      error: 'Erreur création livre'
+    }, { status: 500, headers: corsHeaders });
+  }
+}
+
+// ========== MODIFICATION (PUT /books/:id) ==========
+export async function handleBookUpdate(request) {
+  const { pathname } = new URL(request.url);
+  const id = pathname.replace('/api', '').split('/')[2];
+
+  try {
+    const body = await request.json();
+    const { db } = await timed('db', getDbConnection);
+
+    // Vérifier existence
+    const existingBook = await db.collection('books').findOne({ id });
+    if (!existingBook) {
+      return NextResponse.json({
+        success: false,
+        error: 'Livre non trouvé'
+      }, { status: 404, headers: corsHeaders });
+    }
+
+    const updateData = {
+      ...body,
+      updatedAt: new Date()
+    };
+
+    // Ne pas modifier certaines propriétés
+    delete updateData.id;
+    delete updateData._id;
+    delete updateData.createdAt;
+    delete updateData.coverSet;
+    delete updateData.textIndex;
+    delete updateData.related;
+    delete updateData.relatedAt;
+
+    // Nouvelle couverture (ou livre antérieur aux dérivés) : manifeste srcset
+    if (updateData.coverImage && (updateData.coverImage !== existingBook.coverImage || !existingBook.coverSet)) {
+      updateData.coverSet = await timed('covers', () => coverSetForUrl(db, updateData.coverImage));
+    }
+
+    // Nouveau PDF : index de texte existant rattaché, sinon construit au premier
+    // tour de chat (lib/bookText.js)
+    if (updateData.pdfUrl && (updateData.pdfUrl !== existingBook.pdfUrl || !existingBook.textIndex)) {
+      updateData.textIndex = await timed('text', () => textIndexForUrl(db, updateData.pdfUrl));
+    }
+
+    const result = await db.collection('books').updateOne(
+      { id },
+      { $set: updateData }
+    );
+
+    if (result.modifiedCount === 0) {
+      return NextResponse.json({
+        success: false,
+        error: 'Aucune modification'
+      }, { status: 400, headers: corsHeaders });
+    }
+
+    const updatedBook = await db.collection('books').findOne({ id });
+    await recordBookChange(db, existingBook, updatedBook);
+    queueRelatedChange(db, existingBook, updatedBook);
+    await bumpCatalogVersion(db);
+
+    return NextResponse.json({
+      success: true,
+      book: updatedBook,
+      message: 'Livre mis à jour'
+    }, { headers: corsHeaders });
+
+  } catch (error) {
+    console.error(`❌ PUT Error /books/${id}:`, error);
+    return NextResponse.json({
+      success: false,
+      error: 'Erreur serveur'
+    }, { status: 500, headers: corsHeaders });
+  }
+}
+
+// ========== SUPPRESSION (DELETE /books/:id) ==========
+export async function handleBookDelete(request) {
+  const { pathname } = new URL(request.url);
+  const id = pathname.replace('/api', '').split('/')[2];
+
+  try {
+    const { db } = await timed('db', getDbConnection);
+    const deletedBook = await db.collection('books').findOneAndDelete({ id });
+
+    if (!deletedBook) {
+      return NextResponse.json({
+        success: false,
+        error: 'Livre non trouvé'
+      }, { status: 404, headers: corsHeaders });
+    }
+
+    await recordBookChange(db, deletedBook, null);
+    queueRelatedChange(db, deletedBook, null);
+    await bumpCatalogVersion(db);
+    return NextResponse.json({
+      success: true,
+      message: 'Livre supprimé'
+    }, { headers: corsHeaders });
+
+  } catch (error) {
+    console.error(`❌ DELETE Error /books/${id}:`, error);
+    return NextResponse.json({
+      success: false,
+      error: 'Erreur serveur'
+    }, { status: 500, headers: corsHeaders });
+  }
+}
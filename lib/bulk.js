@@ -0,0 +1,170 @@
+import { v4 as uuidv4 } from 'uuid';
+
+// Import / export en masse du catalogue au format NDJSON (un livre JSON par ligne).
+// L'import lit le corps en flux et écrit par lots non ordonnés ; l'export
+// renvoie un flux alimenté par un curseur MongoDB.
+
+const IMPORT_BATCH_SIZE = parseInt(process.env.BULK_IMPORT_BATCH_SIZE) || 1000;
+const MAX_LINE_LENGTH = 1024 * 1024;
+const MAX_REPORTED_ERRORS = 1000;
+
+// Champs gérés par l'API, jamais repris tels quels de l'import
+// related : calculé par lib/related.js, propre à ce catalogue
+const PROTECTED_FIELDS = ['_id', 'createdAt', 'updatedAt', 'related', 'relatedAt'];
+
+async function* readLines(stream) {
+  const reader = stream.getReader();
+  const decoder = new TextDecoder();
+  let pending = '';
+
+  try {
+    while (true) {
+      const { value, done } = await reader.read();
+      pending += done ? decoder.decode() : decoder.decode(value, { stream: true });
+
+      let newline;
+      while ((newline = pending.indexOf('\n')) !== -1) {
+        yield pending.slice(0, newline);
+        pending = pending.slice(newline + 1);
+      }
+      if (pending.length > MAX_LINE_LENGTH) {
+        throw new Error(`Ligne de plus de ${MAX_LINE_LENGTH} caractères`);
+      }
+      if (done) break;
+    }
+    if (pending.trim()) yield pending;
+  } finally {
+    reader.releaseLock();
+  }
+}
+
+function parseDate(value, fallback) {
+  const date = value ? new Date(value) : null;
+  return date && !Number.isNaN(date.getTime()) ? date : fallback;
+}
+
+// Ligne NDJSON -> opération bulkWrite (upsert si `id` fourni, insertion sinon)
+function toWriteOperation(row, now) {
+  if (!row || typeof row !== 'object' || Array.isArray(row)) {
+    throw new Error('Objet JSON attendu');
+  }
+  if (!row.title || !row.author) {
+    throw new Error('Titre et auteur requis');
+  }
+
+  const createdAt = parseDate(row.createdAt, now);
+  const fields = { ...row };
+  PROTECTED_FIELDS.forEach((field) => delete fields[field]);
+
+  if (!row.id) {
+    const book = { ...fields, id: uuidv4(), createdAt, updatedAt: now };
+    return { id: book.id, operation: { insertOne: { document: book } } };
+  }
+
+  fields.id = String(row.id);
+  return {
+    id: fields.id,
+    operation: {
+      updateOne: {
+        filter: { id: fields.id },
+        update: { $set: { ...fields, updatedAt: now }, $setOnInsert: { createdAt } },
+        upsert: true,
+      },
+    },
+  };
+}
+
+// Importe un flux NDJSON ; les erreurs sont rapportées par numéro de ligne
+export async function importBooks(db, stream) {
+  const books = db.collection('books');
+  const report = { rows: 0, inserted: 0, upserted: 0, updated: 0, failed: 0, errors: [] };
+  let batch = [];
+
+  const fail = (line, id, error) => {
+    report.failed += 1;
+    if (report.errors.length < MAX_REPORTED_ERRORS) {
+      report.errors.push({ line, id, error });
+    }
+  };
+
+  const flush = async () => {
+    if (batch.length === 0) return;
+    const current = batch;
+    batch = [];
+
+    let result;
+    try {
+      result = await books.bulkWrite(current.map((entry) => entry.operation), { ordered: false });
+    } catch (error) {
+      if (!error.writeErrors && !error.result) throw error;
+      // Lot partiellement appliqué : rapporter chaque ligne en échec
+      const writeErrors = Array.isArray(error.writeErrors) ? error.writeErrors : [error.writeErrors].filter(Boolean);
+      writeErrors.forEach((writeError) => {
+        const entry = current[writeError.index];
+        fail(entry.line, entry.id, writeError.errmsg || writeError.message);
+      });
+      result = error.result;
+    }
+
+    report.inserted += result.insertedCount || 0;
+    report.upserted += result.upsertedCount || 0;
+    report.updated += result.matchedCount || 0;
+  };
+
+  let line = 0;
+  const now = new Date();
+  for await (const text of readLines(stream)) {
+    line += 1;
+    if (!text.trim()) continue;
+    report.rows += 1;
+
+    try {
+      const { id, operation } = toWriteOperation(JSON.parse(text), now);
+      batch.push({ line, id, operation });
+    } catch (error) {
+      fail(line, undefined, error.message);
+    }
+
+    if (batch.length >= IMPORT_BATCH_SIZE) {
+      await flush();
+    }
+  }
+  await flush();
+
+  report.errorsTruncated = report.failed > report.errors.length;
+  return report;
+}
+
+// Flux NDJSON de tous les livres correspondant à `query`
+export function exportBooks(db, query = {}) {
+  const encoder = new TextEncoder();
+  const cursor = db.collection('books')
+    .find(query, { projection: { _id: 0 } })
+    .sort({ createdAt: -1, id: -1 })
+    .batchSize(500);
+
+  return new ReadableStream({
+    async pull(controller) {
+      try {
+        // Regrouper les documents déjà reçus du serveur dans un même chunk
+        let lines = '';
+        do {
+          const book = await cursor.next();
+          if (!book) {
+            if (lines) controller.enqueue(encoder.encode(lines));
+            controller.close();
+            return;
+          }
+          lines += `${JSON.stringify(book)}\n`;
+        } while (cursor.bufferedCount() > 0 && lines.length < 64 * 1024);
+        controller.enqueue(encoder.encode(lines));
+      } catch (error) {
+        console.error('❌ Erreur export:', error);
+        controller.error(error);
+      }
+    },
+    async cancel() {
+      await cursor.close();
+    },
+  });
+}
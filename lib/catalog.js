@@ -0,0 +1,300 @@
+import { NextResponse } from 'next/server';
+import { getDbConnection } from '@/lib/mongodb';
+import { timed } from '@/lib/timing';
+import { corsHeaders } from '@/lib/cors';
+import {
+  ensureSearchIndex,
+  textSearchQuery,
+  regexSearchQuery,
+  relevanceProjection,
+  relevanceSort,
+} from '@/lib/search';
+import { getFacets } from '@/lib/facets';
+import {
+  getCatalogVersion,
+  catalogCachePolicy,
+  catalogValidators,
+  cacheHeaders,
+  isNotModified,
+} from '@/lib/httpCache';
+import { cursorSort, encodeCursor, decodeCursor, afterCursorQuery } from '@/lib/pagination';
+import { bookProjection, listSort } from '@/lib/listing';
+
+// Lectures du catalogue (GET /books, /books/:id, /categories, /authors, et
+// plusieurs livres par id : GET /books?ids=a,b,c ou POST /books/batch).
+//
+// Routes les plus sollicitées : servies par des routes dédiées
+// (app/api/books, app/api/books/[id], app/api/categories, app/api/authors)
+// dont le bundle ne contient ni le chat, ni l'upload, ni l'admin ; Next.js ne
+// les envoie jamais à la route générique app/api/[[...path]].
+
+// Nombre maximal d'ids par requête groupée
+const MAX_BATCH_IDS = parseInt(process.env.BOOKS_BATCH_MAX_IDS) || 500;
+
+// Livres `rawIds` en une seule requête $in, dans l'ordre demandé ; les ids
+// inconnus sont listés dans `missing`
+async function booksByIds(db, rawIds, fieldsParam, headers) {
+  const ids = [...new Set(rawIds.map((id) => String(id).trim()).filter(Boolean))];
+  if (ids.length === 0 || ids.length > MAX_BATCH_IDS) {
+    return NextResponse.json(
+      { success: false, error: `Entre 1 et ${MAX_BATCH_IDS} ids requis` },
+      { status: 400, headers: corsHeaders }
+    );
+  }
+  
+  const fields = bookProjection(Array.isArray(fieldsParam) ? fieldsParam.join(',') : fieldsParam);
+  if (fields?.error) {
+    return NextResponse.json({ success: false, error: fields.error }, { status: 400, headers: corsHeaders });
+  }
+  
+  const docs = await timed('find', () => db.collection('books')
+    .find({ id: { $in: ids } }, { projection: fields?.projection })
+    .toArray());
+  const byId = new Map(docs.map((doc) => [doc.id, doc]));
+  
+  return timed('serialize', () => NextResponse.json({
+    success: true,
+    books: ids.filter((id) => byId.has(id)).map((id) => byId.get(id)),
+    missing: ids.filter((id) => !byId.has(id))
+  }, { headers }));
+}
+
+// POST /books/batch { ids: [...], fields? } : même réponse que GET /books?ids=,
+// pour les listes trop longues pour une URL
+export async function handleCatalogBatch(request) {
+  console.log(`📦 POST ${request.url}`);
+  
+  try {
+    const body = await request.json().catch(() => null);
+    if (!Array.isArray(body?.ids)) {
+      return NextResponse.json(
+        { success: false, error: 'Tableau ids requis' },
+        { status: 400, headers: corsHeaders }
+      );
+    }
+    
+    const { db } = await timed('db', getDbConnection);
+    return booksByIds(db, body.ids, body.fields, corsHeaders);
+  } catch (error) {
+    console.error('❌ Erreur POST /books/batch:', error);
+    return NextResponse.json(
+      { success: false, error: 'Erreur serveur' },
+      { status: 500, headers: corsHeaders }
+    );
+  }
+}
+
+export async function handleCatalogGet(request) {
+  console.log(`🌐 GET ${request.url}`);
+  
+  const { pathname, searchParams } = new URL(request.url);
+  const path = pathname.replace('/api', '') || '/';
+  
+  try {
+    const { db } = await timed('db', getDbConnection);
+    
+    // Validateurs HTTP (ETag / Last-Modified)
+    const cachePolicy = catalogCachePolicy(path, searchParams);
+    let responseHeaders = corsHeaders;
+    if (cachePolicy) {
+      const validators = catalogValidators(path, searchParams, await timed('version', () => getCatalogVersion(db)));
+      responseHeaders = { ...corsHeaders, ...cacheHeaders(cachePolicy, validators) };
+      
+      if (isNotModified(request, validators)) {
+        return new NextResponse(null, { status: 304, headers: responseHeaders });
+      }
+    }
+    
+    // Plusieurs livres précis (historique, favoris...) en une requête
+    if (path === '/books' && searchParams.has('ids')) {
+      return booksByIds(db, searchParams.get('ids').split(','), searchParams.get('fields'), responseHeaders);
+    }
+    
+    // Get all books with pagination
+    if (path === '/books') {
+      const category = searchParams.get('category');
+      const author = searchParams.get('author');
+      const search = searchParams.get('search');
+      const page = parseInt(searchParams.get('page')) || 1;
+      const limit = parseInt(searchParams.get('limit')) || 12;
+      const skip = (page - 1) * limit;
+      
+      let query = {};
+      if (category && category !== 'all') query.category = category;
+      if (author && author !== 'all') query.author = author;
+      
+      // Vue compacte (fields=summary ou liste de champs) et tri serveur
+      const fields = bookProjection(searchParams.get('fields'));
+      const requestedSort = listSort(searchParams.get('sort'), searchParams.get('order'));
+      const invalid = fields?.error ? fields : requestedSort?.error ? requestedSort : null;
+      if (invalid) {
+        return NextResponse.json(
+          { success: false, error: invalid.error, allowed: invalid.allowed },
+          { status: 400, headers: corsHeaders }
+        );
+      }
+      const projection = fields?.projection;
+      
+      // Pagination par curseur : after=<createdAt,id>, total seulement si count=true
+      if (searchParams.has('after')) {
+        const after = decodeCursor(searchParams.get('after'));
+        if (after === null || requestedSort) {
+          return NextResponse.json(
+            { success: false, error: after === null ? 'Curseur invalide' : 'Tri non supporté avec after' },
+            { status: 400, headers: corsHeaders }
+          );
+        }
+        
+        // Même repli que la pagination par page : sans résultat indexé, mots
+        // partiels. Décidé sur toute la recherche (pas sur la page) pour que
+        // toutes les pages d'un parcours gardent le même mode.
+        let searchMode;
+        if (search) {
+          const textQuery = { ...query, ...textSearchQuery(search) };
+          const indexed = await timed('index', () => ensureSearchIndex(db))
+            && await timed('count', () => db.collection('books').countDocuments(textQuery, { limit: 1 })) > 0;
+          searchMode = indexed ? 'text' : 'partial';
+          query = indexed ? textQuery : { ...query, ...regexSearchQuery(search) };
+        }
+        
+        const pageQuery = after ? { $and: [query, afterCursorQuery(after)] } : query;
+        const docs = await timed('find', () => db.collection('books')
+          .find(pageQuery, { projection })
+          .sort(cursorSort)
+          .limit(limit + 1)
+          .toArray());
+        
+        const hasNext = docs.length > limit;
+        const books = hasNext ? docs.slice(0, limit) : docs;
+        const total = searchParams.get('count') === 'true'
+          ? await timed('count', () => db.collection('books').countDocuments(query))
+          : undefined;
+        
+        return timed('serialize', () => NextResponse.json({
+          success: true,
+          books,
+          searchMode,
+          pagination: {
+            limit,
+            total,
+            hasNext,
+            nextCursor: hasNext ? encodeCursor(books[books.length - 1]) : null
+          }
+        }, { headers: responseHeaders }));
+      }
+      
+      let total;
+      let books;
+      let searchMode;
+      
+      // Recherche indexée (pertinence, sans accents), repli regex pour les mots partiels
+      if (search && await timed('index', () => ensureSearchIndex(db))) {
+        const textQuery = { ...query, ...textSearchQuery(search) };
+        total = await timed('count', () => db.collection('books').countDocuments(textQuery));
+        
+        if (total > 0) {
+          searchMode = 'text';
+          books = await timed('find', () => db.collection('books')
+            .find(textQuery, { projection: { ...projection, ...relevanceProjection } })
+            .sort(requestedSort?.sort || relevanceSort)
+            .skip(skip)
+            .limit(limit)
+            .toArray());
+        }
+      }
+      
+      if (!books) {
+        if (search) {
+          searchMode = 'partial';
+          query = { ...query, ...regexSearchQuery(search) };
+        }
+        
+        total = await timed('count', () => db.collection('books').countDocuments(query));
+        books = await timed('find', () => db.collection('books')
+          .find(query, { projection })
+          .sort(requestedSort?.sort || { createdAt: -1 })
+          .skip(skip)
+          .limit(limit)
+          .toArray());
+      }
+
+      return timed('serialize', () => NextResponse.json({
+        success: true,
+        books,
+        searchMode,
+        pagination: {
+          page,
+          limit,
+          total,
+          totalPages: Math.ceil(total / limit),
+          hasNext: page < Math.ceil(total / limit),
+          hasPrev: page > 1
+        }
+      }, { headers: responseHeaders }));
+    }
+    
+    // Get single book
+    if (path.startsWith('/books/')) {
+      const id = path.split('/')[2];
+      const book = await timed('find', () => db.collection('books').findOne({ id }));
+
+      if (!book) {
+        return NextResponse.json(
+          { success: false, error: 'Livre non trouvé' },
+          { status: 404, headers: corsHeaders }
+        );
+      }
+      
+      // include=related : livres similaires précalculés dans la même réponse
+      const include = (searchParams.get('include') || '').split(',');
+      const related = include.includes('related')
+        ? await timed('related', async () => {
+          const { relatedBooks } = await import('@/lib/related');
+          return relatedBooks(db, book);
+        })
+        : undefined;
+      
+      return NextResponse.json({ 
+        success: true, 
+        book,
+        related
+      }, { headers: responseHeaders });
+    }
+    
+    // Get categories
+    if (path === '/categories') {
+      const { categories } = await timed('facets', () => getFacets(db, { fresh: searchParams.get('fresh') === 'true' }));
+      return NextResponse.json({ 
+        success: true, 
+        categories: categories.map(c => c.value),
+        counts: Object.fromEntries(categories.map(c => [c.value, c.count]))
+      }, { headers: responseHeaders });
+    }
+    
+    // Get authors
+    if (path === '/authors') {
+      const { authors } = await timed('facets', () => getFacets(db, { fresh: searchParams.get('fresh') === 'true' }));
+      return NextResponse.json({ 
+        success: true, 
+        authors: authors.map(a => a.value),
+        counts: Object.fromEntries(authors.map(a => [a.value, a.count]))
+      }, { headers: responseHeaders });
+    }
+    
+    return NextResponse.json({
+      success: false,
+      error: 'Route non trouvée'
+    }, { status: 404, headers: corsHeaders });
+    
+  } catch (error) {
+    console.error(`❌ Erreur GET ${path}:`, error);
+    return NextResponse.json(
+      { 
+        success: false, 
+        error: 'Erreur serveur',
+        details: process.env.NODE_ENV === 'development' ? error.message : undefined
+      },
+      { status: 500, headers: corsHeaders }
+    );
+  }
+}
@@ -0,0 +1,155 @@
+import { createHash } from 'crypto';
+import { stripAccents } from '@/lib/search';
+
+// Chat IA : modèle (OpenAI ou stub local), cache des réponses et mise en
+// forme text/event-stream commune aux réponses en direct et rejouées.
+//
+// Trames envoyées (format lu par app/book/[id]/page.js) :
+//   data: {"type":"text-delta","text":"..."}
+//   data: {"type":"error","text":"..."}
+//   data: [DONE]
+
+const CHAT_MODEL = process.env.CHAT_MODEL || 'gpt-3.5-turbo';
+const CACHE_MAX_ENTRIES = parseInt(process.env.CHAT_CACHE_MAX_ENTRIES) || 500;
+const CACHE_TTL_MS = parseInt(process.env.CHAT_CACHE_TTL_MS) || 24 * 60 * 60 * 1000;
+
+// Latences simulées du modèle stub (premier token, puis entre deux tokens)
+const STUB_FIRST_TOKEN_MS = parseInt(process.env.STUB_CHAT_FIRST_TOKEN_MS ?? '400');
+const STUB_TOKEN_MS = parseInt(process.env.STUB_CHAT_TOKEN_MS ?? '10');
+
+export function isStubModel() {
+  return CHAT_MODEL === 'stub';
+}
+
+export function chatModelName() {
+  return CHAT_MODEL;
+}
+
+// ---------- Modèle ----------
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+// Modèle local déterministe, sans réseau : reformule la dernière question
+async function* stubTextStream(messages) {
+  const question = [...messages].reverse().find((message) => message.role === 'user')?.content || '';
+  const context = messages
+    .filter((message) => message.role === 'system')
+    .reduce((sum, message) => sum + message.content.length, 0);
+  const answer = `Réponse simulée (${context} caractères de contexte) à : ${question}`;
+
+  await sleep(STUB_FIRST_TOKEN_MS);
+  for (const token of answer.match(/\S+\s*/g) || []) {
+    yield token;
+    if (STUB_TOKEN_MS) await sleep(STUB_TOKEN_MS);
+  }
+}
+
+// Flux de fragments de texte produits par le modèle configuré
+export async function streamChatText(messages, { temperature = 0.7, maxTokens = 500 } = {}) {
+  if (isStubModel()) {
+    return stubTextStream(messages);
+  }
+
+  // SDK chargé au premier appel réel : le modèle stub et le cache n'en ont pas besoin
+  const [{ streamText }, { openai }] = await Promise.all([import('ai'), import('@ai-sdk/openai')]);
+  const result = await streamText({
+    model: openai(CHAT_MODEL),
+    messages,
+    temperature,
+    maxTokens,
+  });
+  return result.textStream;
+}
+
+// ---------- Cache des réponses (LRU + TTL, par instance) ----------
+
+const cache = globalThis._chatResponseCache || (globalThis._chatResponseCache = new Map());
+
+// Casse, accents, espaces et ponctuation finale n'influencent pas la clé
+export function normalizePrompt(text) {
+  return stripAccents(String(text || ''))
+    .toLowerCase()
+    .replace(/\s+/g, ' ')
+    .replace(/[\s?!.…]+$/, '')
+    .trim();
+}
+
+export function chatCacheKey(messages, { bookId } = {}) {
+  const conversation = messages.map((message) => [message.role, normalizePrompt(message.content)]);
+  return createHash('sha256')
+    .update(JSON.stringify([CHAT_MODEL, bookId || null, conversation]))
+    .digest('hex');
+}
+
+export function getCachedAnswer(key) {
+  const entry = cache.get(key);
+  if (!entry) return null;
+
+  if (Date.now() > entry.expiresAt) {
+    cache.delete(key);
+    return null;
+  }
+  // Ré-insertion : l'entrée devient la plus récemment utilisée
+  cache.delete(key);
+  cache.set(key, entry);
+  return entry.answer;
+}
+
+export function setCachedAnswer(key, answer) {
+  cache.delete(key);
+  cache.set(key, { answer, expiresAt: Date.now() + CACHE_TTL_MS });
+  while (cache.size > CACHE_MAX_ENTRIES) {
+    cache.delete(cache.keys().next().value);
+  }
+}
+
+export function chatCacheStats() {
+  return { entries: cache.size, maxEntries: CACHE_MAX_ENTRIES, ttlMs: CACHE_TTL_MS };
+}
+
+// Relaie le flux du modèle et met la réponse complète en cache à la fin
+export async function* recordAnswer(key, textStream) {
+  let answer = '';
+  for await (const delta of textStream) {
+    answer += delta;
+    yield delta;
+  }
+  if (answer) setCachedAnswer(key, answer);
+}
+
+// Rejoue une réponse en cache par petits fragments, comme un flux du modèle
+export async function* replayAnswer(answer) {
+  for (const fragment of answer.match(/\S+\s*|\s+/g) || []) {
+    yield fragment;
+  }
+}
+
+// ---------- Mise en forme text/event-stream ----------
+
+export function eventStream(textStream) {
+  const encoder = new TextEncoder();
+  const frame = (data) => encoder.encode(`data: ${typeof data === 'string' ? data : JSON.stringify(data)}\n\n`);
+  const iterator = textStream[Symbol.asyncIterator]();
+
+  return new ReadableStream({
+    async pull(controller) {
+      try {
+        const { value, done } = await iterator.next();
+        if (done) {
+          controller.enqueue(frame('[DONE]'));
+          controller.close();
+          return;
+        }
+        controller.enqueue(frame({ type: 'text-delta', text: value }));
+      } catch (error) {
+        console.error('❌ Erreur flux chat:', error);
+        controller.enqueue(frame({ type: 'error', text: 'Erreur communication AI' }));
+        controller.enqueue(frame('[DONE]'));
+        controller.close();
+      }
+    },
+    async cancel() {
+      await iterator.return?.();
+    },
+  });
+}
@@ -0,0 +1,215 @@
+import { createHash } from 'crypto';
+import { Binary } from 'mongodb';
+import { v4 as uuidv4 } from 'uuid';
+import { checkDeclaredFile, defaultExtensions, sizeLimits, tooLargeError, validatedChunks, UploadError } from '@/lib/upload';
+import { storeUpload } from '@/lib/storage';
+import { linearizedPdf } from '@/lib/pdf';
+
+// Upload en plusieurs parties, reprenable :
+//   POST   /api/uploads                       -> démarre une session
+//   PUT    /api/uploads/:id/parts/:index      -> envoie une partie (X-Part-SHA256)
+//   GET    /api/uploads/:id                   -> parties déjà reçues (reprise)
+//   POST   /api/uploads/:id/complete          -> assemble et stocke le fichier
+//   DELETE /api/uploads/:id                   -> abandonne la session
+//
+// Les sessions et parties sont stockées dans MongoDB (partagé entre instances
+// serverless) et expirent automatiquement après UPLOAD_SESSION_TTL_HOURS
+// (index TTL déclarés dans lib/indexes.js).
+
+const SESSIONS = 'upload_sessions';
+const PARTS = 'upload_parts';
+
+// Sous la limite de 4,5 Mo par requête des fonctions Vercel
+export const DEFAULT_CHUNK_SIZE = 4 * 1024 * 1024;
+const MIN_CHUNK_SIZE = 256 * 1024;
+const SESSION_TTL_MS = (parseInt(process.env.UPLOAD_SESSION_TTL_HOURS) || 24) * 60 * 60 * 1000;
+
+function sessionView(session, receivedParts) {
+  return {
+    uploadId: session._id,
+    type: session.type,
+    filename: session.originalName,
+    size: session.size,
+    chunkSize: session.chunkSize,
+    totalParts: session.totalParts,
+    receivedParts,
+    status: session.status,
+    expiresAt: session.expiresAt,
+  };
+}
+
+async function findSession(db, uploadId) {
+  const session = await db.collection(SESSIONS).findOne({ _id: uploadId });
+  if (!session) {
+    throw new UploadError('Session d\'upload introuvable ou expirée', 404);
+  }
+  return session;
+}
+
+async function receivedPartIndexes(db, uploadId) {
+  const parts = await db.collection(PARTS)
+    .find({ uploadId }, { projection: { index: 1 } })
+    .sort({ index: 1 })
+    .toArray();
+  return parts.map((part) => part.index);
+}
+
+export async function createUploadSession(db, { type, filename, contentType, size, chunkSize, sha256 }) {
+  if (!filename || !Number.isInteger(size) || size <= 0) {
+    throw new UploadError('filename et size requis');
+  }
+  checkDeclaredFile(type, { filename, contentType });
+  if (size > sizeLimits[type]) {
+    throw tooLargeError(type, size);
+  }
+
+  const partSize = Math.min(Math.max(parseInt(chunkSize) || DEFAULT_CHUNK_SIZE, MIN_CHUNK_SIZE), DEFAULT_CHUNK_SIZE);
+  const extension = filename.includes('.') ? filename.split('.').pop().toLowerCase() : defaultExtensions[type] || 'bin';
+  const now = new Date();
+
+  const session = {
+    _id: uuidv4(),
+    type,
+    filename: `${type}-${uuidv4()}.${extension}`,
+    originalName: filename,
+    contentType,
+    size,
+    chunkSize: partSize,
+    totalParts: Math.ceil(size / partSize),
+    sha256: sha256 ? String(sha256).toLowerCase() : null,
+    status: 'pending',
+    createdAt: now,
+    expiresAt: new Date(now.getTime() + SESSION_TTL_MS),
+  };
+  await db.collection(SESSIONS).insertOne(session);
+
+  return sessionView(session, []);
+}
+
+export async function getUploadSession(db, uploadId) {
+  const session = await findSession(db, uploadId);
+  return { ...sessionView(session, await receivedPartIndexes(db, uploadId)), result: session.result };
+}
+
+// Enregistre une partie ; renvoyer une partie déjà reçue (même somme) est sans effet
+export async function storeUploadPart(db, uploadId, index, data, checksum) {
+  const session = await findSession(db, uploadId);
+  if (session.status !== 'pending') {
+    throw new UploadError('Upload déjà finalisé', 409);
+  }
+
+  if (!Number.isInteger(index) || index < 0 || index >= session.totalParts) {
+    throw new UploadError('Index de partie invalide', 400, { totalParts: session.totalParts });
+  }
+  const expectedSize = index === session.totalParts - 1
+    ? session.size - index * session.chunkSize
+    : session.chunkSize;
+  if (data.length !== expectedSize) {
+    throw new UploadError('Taille de partie invalide', 400, { expected: expectedSize, received: data.length });
+  }
+
+  const sha256 = createHash('sha256').update(data).digest('hex');
+  if (!checksum || checksum.toLowerCase() !== sha256) {
+    throw new UploadError('Somme de contrôle invalide', 422, { expected: checksum, received: sha256 });
+  }
+
+  const result = await db.collection(PARTS).updateOne(
+    { uploadId, index },
+    {
+      $setOnInsert: {
+        uploadId,
+        index,
+        offset: index * session.chunkSize,
+        size: data.length,
+        sha256,
+        data: new Binary(data),
+        expiresAt: session.expiresAt,
+      },
+    },
+    { upsert: true }
+  );
+
+  return { uploadId, index, offset: index * session.chunkSize, size: data.length, sha256, duplicate: result.upsertedCount === 0 };
+}
+
+async function* partData(db, uploadId) {
+  // Une partie en mémoire à la fois
+  const cursor = db.collection(PARTS).find({ uploadId }).sort({ index: 1 }).batchSize(1);
+  for await (const part of cursor) {
+    yield Buffer.from(part.data.buffer);
+  }
+}
+
+export async function completeUploadSession(db, uploadId) {
+  const session = await findSession(db, uploadId);
+  if (session.status === 'completed') {
+    return session.result;
+  }
+
+  const received = await receivedPartIndexes(db, uploadId);
+  if (received.length !== session.totalParts) {
+    const have = new Set(received);
+    const missingParts = Array.from({ length: session.totalParts }, (_, i) => i).filter((i) => !have.has(i));
+    throw new UploadError('Parties manquantes', 409, { missingParts });
+  }
+
+  // Verrou : une seule finalisation à la fois
+  const locked = await db.collection(SESSIONS).findOneAndUpdate(
+    { _id: uploadId, status: 'pending' },
+    { $set: { status: 'completing' } }
+  );
+  if (!locked) {
+    throw new UploadError('Finalisation déjà en cours', 409);
+  }
+
+  try {
+    if (session.sha256) {
+      const hash = createHash('sha256');
+      for await (const chunk of partData(db, uploadId)) hash.update(chunk);
+      const digest = hash.digest('hex');
+      if (digest !== session.sha256) {
+        throw new UploadError('Somme de contrôle du fichier invalide', 422, { expected: session.sha256, received: digest });
+      }
+    }
+
+    const stats = {};
+    const pdf = {};
+    let chunks = validatedChunks(session.type, partData(db, uploadId), stats);
+    if (session.type === 'book' && session.filename.endsWith('.pdf')) {
+      chunks = linearizedPdf(chunks, pdf);
+    }
+    const stored = await storeUpload({
+      type: session.type,
+      filename: session.filename,
+      originalName: session.originalName,
+      contentType: session.contentType,
+      chunks,
+    });
+
+    const result = {
+      url: stored.url,
+      downloadUrl: stored.downloadUrl,
+      pathname: stored.pathname,
+      filename: session.filename,
+      originalName: session.originalName,
+      size: stats.size,
+      type: session.contentType,
+      uploaded_type: session.type,
+      linearized: pdf.linearized,
+      simulated: stored.simulated,
+    };
+
+    await db.collection(SESSIONS).updateOne({ _id: uploadId }, { $set: { status: 'completed', result } });
+    await db.collection(PARTS).deleteMany({ uploadId });
+    return result;
+  } catch (error) {
+    await db.collection(SESSIONS).updateOne({ _id: uploadId }, { $set: { status: 'pending' } });
+    throw error;
+  }
+}
+
+export async function abortUploadSession(db, uploadId) {
+  await findSession(db, uploadId);
+  await db.collection(PARTS).deleteMany({ uploadId });
+  await db.collection(SESSIONS).deleteOne({ _id: uploadId });
+}
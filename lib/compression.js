@@ -0,0 +1,83 @@
+import { promisify } from 'util';
+import zlib from 'zlib';
+import { timed } from '@/lib/timing';
+
+// Compression des réponses JSON de l'API, brotli ou gzip selon Accept-Encoding.
+// Les flux (chat, export NDJSON, fichiers) ne passent pas par ici. Une réponse
+// déjà encodée (Content-Encoding) n'est pas recompressée, y compris par la
+// compression gzip intégrée au serveur Next.
+//
+// L'ETag fort du catalogue devient faible sur une réponse compressée : les
+// deux représentations sont équivalentes et isNotModified() ignore le préfixe
+// W/, la revalidation (304) fonctionne quel que soit l'encodage.
+
+const MIN_BYTES = parseInt(process.env.COMPRESS_MIN_BYTES) || 1024;
+// Qualité brotli : 11 est trop lent pour une réponse dynamique
+const BROTLI_QUALITY = parseInt(process.env.COMPRESS_BROTLI_QUALITY) || 5;
+const GZIP_LEVEL = parseInt(process.env.COMPRESS_GZIP_LEVEL) || 6;
+
+const brotliCompress = promisify(zlib.brotliCompress);
+const gzip = promisify(zlib.gzip);
+
+const encoders = {
+  br: (data) => brotliCompress(data, {
+    params: {
+      [zlib.constants.BROTLI_PARAM_QUALITY]: BROTLI_QUALITY,
+      [zlib.constants.BROTLI_PARAM_SIZE_HINT]: data.length,
+    },
+  }),
+  gzip: (data) => gzip(data, { level: GZIP_LEVEL }),
+};
+
+// Encodage retenu parmi ceux acceptés (q > 0) : la qualité la plus haute,
+// brotli avant gzip à égalité. null = réponse non compressée.
+export function negotiateEncoding(acceptEncoding) {
+  if (!acceptEncoding) return null;
+
+  const accepted = new Map();
+  for (const part of acceptEncoding.toLowerCase().split(',')) {
+    const [name, ...params] = part.split(';').map((value) => value.trim());
+    const quality = params.find((param) => param.startsWith('q='));
+    accepted.set(name, quality ? parseFloat(quality.slice(2)) || 0 : 1);
+  }
+
+  let best = null;
+  let bestQuality = 0;
+  for (const encoding of Object.keys(encoders)) {
+    const quality = accepted.get(encoding) ?? accepted.get('*') ?? 0;
+    if (quality > bestQuality) {
+      best = encoding;
+      bestQuality = quality;
+    }
+  }
+  return best;
+}
+
+export async function compressResponse(request, response) {
+  const type = response.headers.get('content-type') || '';
+  if (!response.body || !type.startsWith('application/json') || response.headers.has('content-encoding')) {
+    return response;
+  }
+
+  // La représentation dépend d'Accept-Encoding, même sous le seuil
+  response.headers.append('Vary', 'Accept-Encoding');
+  const encoding = negotiateEncoding(request.headers.get('accept-encoding'));
+  if (!encoding) return response;
+
+  const data = Buffer.from(await response.arrayBuffer());
+  if (data.length < MIN_BYTES) return new Response(data, response);
+
+  const body = await timed('compress', () => encoders[encoding](data));
+  const headers = new Headers(response.headers);
+  headers.set('Content-Encoding', encoding);
+  headers.set('Content-Length', String(body.length));
+  const etag = headers.get('etag');
+  if (etag && !etag.startsWith('W/')) headers.set('ETag', `W/${etag}`);
+
+  return new Response(body, { status: response.status, statusText: response.statusText, headers });
+}
+
+// Enveloppe un handler de route : réponses JSON compressées si le client l'accepte
+export function withCompression(handler) {
+  return async (request, context) => compressResponse(request, await handler(request, context));
+}
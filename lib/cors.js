@@ -0,0 +1,15 @@
+import { NextResponse } from 'next/server';
+
+// Headers CORS communs à toutes les routes de l'API
+export const corsHeaders = {
+  'Access-Control-Allow-Origin': process.env.CORS_ORIGINS || '*',
+  'Access-Control-Allow-Methods': 'GET, POST, PUT, DELETE, OPTIONS, PATCH',
+  'Access-Control-Allow-Headers': 'Content-Type, Authorization, X-Requested-With',
+  'Access-Control-Allow-Credentials': 'true',
+  'Access-Control-Max-Age': '86400',
+};
+
+// Réponse aux requêtes OPTIONS (pré-vol CORS)
+export function preflight() {
+  return NextResponse.json({}, { headers: corsHeaders });
+}
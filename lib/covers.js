@@ -0,0 +1,147 @@
+import { createHash } from 'crypto';
+import { readStoredUpload, storeUpload } from '@/lib/storage';
+import { sizeLimits } from '@/lib/upload';
+
+// Dérivés des couvertures : plusieurs largeurs en AVIF et WebP, générés à
+// l'upload (ou à l'enregistrement du livre pour une couverture existante),
+// stockés à côté de l'original sous une clé dérivée du contenu
+// (<sha256>-<largeur>w.<format>) et décrits par un manifeste `coverSet`
+// prêt pour <source srcset> :
+//
+//   { key, width, height, srcset: { 'image/avif': 'url 160w, url 320w', 'image/webp': ... } }
+//
+// Le redimensionnement utilise `sharp` (dépendance du projet, hors bundle via
+// serverComponentsExternalPackages) ; si son binaire ne se charge pas sur la
+// plateforme, les couvertures restent servies telles quelles et coverSet vaut
+// null (le harnais le signale en échec).
+
+const DERIVATIVES = 'cover_derivatives';
+
+export const COVER_WIDTHS = (process.env.COVER_WIDTHS || '160,320,480,640')
+  .split(',')
+  .map((width) => parseInt(width))
+  .filter((width) => width > 0)
+  .sort((a, b) => a - b);
+
+const FORMATS = [
+  { format: 'avif', contentType: 'image/avif', options: { quality: 50 } },
+  { format: 'webp', contentType: 'image/webp', options: { quality: 72 } },
+];
+
+let sharpPromise = null;
+function loadSharp() {
+  sharpPromise = sharpPromise || import('sharp')
+    .then((module) => module.default)
+    .catch((error) => {
+      console.error('❌ sharp indisponible, pas de dérivés de couverture:', error.message);
+      return null;
+    });
+  return sharpPromise;
+}
+
+export function coverSetView(doc) {
+  if (!doc) return null;
+
+  const srcset = {};
+  for (const { contentType } of FORMATS) {
+    const variants = doc.variants.filter((variant) => variant.contentType === contentType);
+    if (variants.length > 0) {
+      srcset[contentType] = variants.map((variant) => `${variant.url} ${variant.width}w`).join(', ');
+    }
+  }
+  return { key: doc._id, width: doc.width, height: doc.height, srcset };
+}
+
+// Relaie le flux tout en gardant une copie des morceaux (couvertures : 20 Mo max)
+export async function* keepChunks(chunks, kept) {
+  for await (const chunk of chunks) {
+    kept.push(chunk);
+    yield chunk;
+  }
+}
+
+async function generateVariants(sharp, data, key) {
+  const { width, height } = await sharp(data).metadata();
+  if (!width || !height) throw new Error('Dimensions de l\'image illisibles');
+
+  // Jamais d'agrandissement ; une image plus étroite que toutes les tailles garde sa largeur
+  const widths = COVER_WIDTHS.filter((candidate) => candidate < width);
+  if (widths.length === 0) widths.push(width);
+
+  const variants = [];
+  for (const targetWidth of widths) {
+    for (const { format, contentType, options } of FORMATS) {
+      const buffer = await sharp(data)
+        .rotate()
+        .resize({ width: targetWidth })
+        .toFormat(format, options)
+        .toBuffer();
+      const stored = await storeUpload({
+        type: 'cover',
+        filename: `${key}-${targetWidth}w.${format}`,
+        originalName: `${key}-${targetWidth}w.${format}`,
+        contentType,
+        chunks: [buffer],
+        immutable: true,
+      });
+      variants.push({
+        contentType,
+        width: targetWidth,
+        height: Math.round(height * targetWidth / width),
+        bytes: buffer.length,
+        url: stored.url,
+      });
+    }
+  }
+  return { width, height, variants };
+}
+
+// Dérivés de l'image `data` publiée à `url`. Une image déjà traitée (même
+// contenu, quelle que soit l'URL) n'est pas régénérée.
+export async function deriveCover(db, { url, data }) {
+  const key = createHash('sha256').update(data).digest('hex').slice(0, 24);
+  const collection = db.collection(DERIVATIVES);
+
+  const existing = await collection.findOneAndUpdate(
+    { _id: key },
+    { $addToSet: { originals: url } },
+    { returnDocument: 'after' }
+  );
+  if (existing) return coverSetView(existing);
+
+  const sharp = await loadSharp();
+  if (!sharp) return null;
+
+  const started = Date.now();
+  const { width, height, variants } = await generateVariants(sharp, data, key);
+  const doc = { _id: key, originals: [url], width, height, variants, createdAt: new Date() };
+
+  try {
+    await collection.insertOne(doc);
+  } catch (error) {
+    // Généré en parallèle par une autre requête : mêmes clés, mêmes fichiers
+    if (error.code !== 11000) throw error;
+    await collection.updateOne({ _id: key }, { $addToSet: { originals: url } });
+  }
+
+  console.log(`🖼️ ${variants.length} dérivés de couverture générés en ${Date.now() - started}ms`);
+  return coverSetView(doc);
+}
+
+// Manifeste de la couverture `url`, généré à la demande si besoin.
+// N'échoue jamais : sans dérivés, le livre garde simplement son coverImage.
+export async function coverSetForUrl(db, url) {
+  if (!url) return null;
+
+  try {
+    const known = await db.collection(DERIVATIVES).findOne({ originals: url });
+    if (known) return coverSetView(known);
+
+    if (!await loadSharp()) return null;
+    const data = await readStoredUpload(url, sizeLimits.cover);
+    return data ? await deriveCover(db, { url, data }) : null;
+  } catch (error) {
+    console.error('❌ Dérivés de couverture indisponibles:', url, error.message);
+    return null;
+  }
+}
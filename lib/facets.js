@@ -0,0 +1,202 @@
+import { getCatalogVersion, bumpCatalogVersion } from '@/lib/httpCache';
+
+// Facettes du catalogue (catégories, auteurs, total) avec compteurs par valeur.
+//
+// Les compteurs sont stockés dans la collection `catalog_facets` et mis à jour
+// par $inc à chaque création / modification / suppression de livre. Chaque
+// instance garde une copie en mémoire pendant FACET_CACHE_TTL_MS, tant que la
+// version du catalogue (lib/httpCache.js) n'a pas changé : une écriture faite
+// par une autre instance invalide la copie en même temps que l'ETag. La
+// collection est entièrement recalculée en arrière-plan toutes les
+// FACET_REBUILD_MS pour rattraper les écritures faites hors API ; un recalcul
+// qui change les compteurs change la version.
+
+const FACETS_COLLECTION = 'catalog_facets';
+const FACET_FIELDS = { category: 'categories', author: 'authors' };
+const META = { field: '_meta', value: null };
+const TOTAL = { field: '_total', value: null };
+
+const FACET_CACHE_TTL_MS = parseInt(process.env.FACET_CACHE_TTL_MS) || 5000;
+const FACET_REBUILD_MS = parseInt(process.env.FACET_REBUILD_MS) || 10 * 60 * 1000;
+
+const cache = globalThis._facetCache || (globalThis._facetCache = {
+  data: null,
+  version: null,
+  expiresAt: 0,
+  loading: null,
+  rebuilding: null,
+});
+
+function isFacetValue(value) {
+  return value !== undefined && value !== null && value !== '';
+}
+
+function byValue(a, b) {
+  return a.value < b.value ? -1 : a.value > b.value ? 1 : 0;
+}
+
+function countsSignature(docs) {
+  return docs
+    .filter((doc) => doc.count > 0)
+    .map((doc) => JSON.stringify([doc.field, doc.value, doc.count]))
+    .sort()
+    .join('\n');
+}
+
+// Comptage des valeurs de `field` sur tout `books` (parcours voulu, reprise
+// par lib/queryShapes.js)
+export function facetPipeline(field) {
+  return [
+    { $match: { [field]: { $nin: [null, ''] } } },
+    { $group: { _id: `$${field}`, count: { $sum: 1 } } },
+  ];
+}
+
+// Calcul complet depuis `books` (équivalent de distinct() + comptages)
+export async function computeFacets(db) {
+  const books = db.collection('books');
+  const fields = Object.keys(FACET_FIELDS);
+
+  const [totalBooks, ...groups] = await Promise.all([
+    books.countDocuments(),
+    ...fields.map((field) => books.aggregate(facetPipeline(field)).toArray()),
+  ]);
+
+  const facets = { totalBooks, builtAt: new Date() };
+  fields.forEach((field, index) => {
+    facets[FACET_FIELDS[field]] = groups[index]
+      .map(({ _id, count }) => ({ value: _id, count }))
+      .sort(byValue);
+  });
+  return facets;
+}
+
+// Réécrit la collection de facettes à partir d'un calcul complet.
+// Un $inc concurrent peut être écrasé : il sera rattrapé au prochain rebuild.
+export async function rebuildFacets(db) {
+  const facets = await computeFacets(db);
+  const collection = db.collection(FACETS_COLLECTION);
+
+  const { builtAt } = facets;
+  const docs = [{ ...TOTAL, count: facets.totalBooks, builtAt }];
+  for (const [field, key] of Object.entries(FACET_FIELDS)) {
+    facets[key].forEach(({ value, count }) => docs.push({ field, value, count, builtAt }));
+  }
+  const previous = await collection.find({ field: { $ne: META.field } }).toArray();
+
+  await collection.bulkWrite(docs.map((doc) => ({
+    replaceOne: { filter: { field: doc.field, value: doc.value }, replacement: doc, upsert: true },
+  })), { ordered: false });
+
+  // Valeurs disparues depuis le dernier calcul
+  await collection.deleteMany({ field: { $ne: META.field }, builtAt: { $ne: builtAt } });
+  await collection.replaceOne(META, { ...META, builtAt }, { upsert: true });
+
+  // Compteurs corrigés (écritures hors API, $inc perdu) : nouvelle version
+  const changed = countsSignature(previous) !== countsSignature(docs);
+  if (changed) await bumpCatalogVersion(db);
+
+  console.log(`🔄 Facettes recalculées (${facets.totalBooks} livres${changed ? ', compteurs corrigés' : ''})`);
+  cache.data = facets;
+  cache.version = (await getCatalogVersion(db)).version;
+  cache.expiresAt = Date.now() + FACET_CACHE_TTL_MS;
+  return facets;
+}
+
+function rebuildInBackground(db) {
+  if (!cache.rebuilding) {
+    cache.rebuilding = rebuildFacets(db)
+      .catch((error) => console.error('❌ Rebuild facettes échoué:', error))
+      .finally(() => { cache.rebuilding = null; });
+  }
+  return cache.rebuilding;
+}
+
+async function loadFacets(db) {
+  const docs = await db.collection(FACETS_COLLECTION).find({}).toArray();
+  const meta = docs.find((doc) => doc.field === META.field);
+
+  // Jamais construites : calcul complet bloquant (une seule fois)
+  if (!meta) {
+    return rebuildFacets(db);
+  }
+
+  if (Date.now() - new Date(meta.builtAt).getTime() > FACET_REBUILD_MS) {
+    rebuildInBackground(db);
+  }
+
+  const facets = {
+    totalBooks: docs.find((doc) => doc.field === TOTAL.field)?.count || 0,
+    builtAt: meta.builtAt,
+  };
+  for (const [field, key] of Object.entries(FACET_FIELDS)) {
+    facets[key] = docs
+      .filter((doc) => doc.field === field && doc.count > 0)
+      .map(({ value, count }) => ({ value, count }))
+      .sort(byValue);
+  }
+  return facets;
+}
+
+// Facettes pour /categories, /authors et /admin/stats.
+// `fresh: true` ignore tous les caches et recalcule depuis `books`.
+export async function getFacets(db, { fresh = false } = {}) {
+  if (fresh) {
+    return computeFacets(db);
+  }
+
+  // Même version que celle de l'ETag de la réponse (lue juste avant, en cache)
+  const { version } = await getCatalogVersion(db);
+  if (cache.data && cache.version === version && Date.now() < cache.expiresAt) {
+    return cache.data;
+  }
+
+  if (!cache.loading || cache.loading.version !== version) {
+    const loading = loadFacets(db)
+      .then((facets) => {
+        cache.data = facets;
+        cache.version = version;
+        cache.expiresAt = Date.now() + FACET_CACHE_TTL_MS;
+        return facets;
+      })
+      .finally(() => {
+        if (cache.loading === loading) cache.loading = null;
+      });
+    loading.version = version;
+    cache.loading = loading;
+  }
+  return cache.loading;
+}
+
+// À appeler après chaque écriture sur `books` avec le document avant/après
+// (null pour une création / suppression).
+export async function recordBookChange(db, before, after) {
+  const deltas = new Map();
+  const add = (field, value, inc) => {
+    const key = JSON.stringify([field, value]);
+    const delta = deltas.get(key) || { field, value, inc: 0 };
+    delta.inc += inc;
+    deltas.set(key, delta);
+  };
+
+  add(TOTAL.field, TOTAL.value, (after ? 1 : 0) - (before ? 1 : 0));
+  for (const field of Object.keys(FACET_FIELDS)) {
+    if (before && isFacetValue(before[field])) add(field, before[field], -1);
+    if (after && isFacetValue(after[field])) add(field, after[field], 1);
+  }
+
+  const changes = [...deltas.values()].filter(({ inc }) => inc !== 0);
+  if (changes.length === 0) return;
+
+  try {
+    await db.collection(FACETS_COLLECTION).bulkWrite(changes.map(({ field, value, inc }) => ({
+      updateOne: { filter: { field, value }, update: { $inc: { count: inc } }, upsert: true },
+    })), { ordered: false });
+  } catch (error) {
+    // Compteurs potentiellement faux : forcer un recalcul complet
+    console.error('❌ Mise à jour facettes échouée:', error);
+    rebuildInBackground(db);
+  } finally {
+    cache.expiresAt = 0;
+  }
+}
@@ -0,0 +1,117 @@
+import { createReadStream } from 'fs';
+import { stat } from 'fs/promises';
+import path from 'path';
+import { Readable } from 'stream';
+import { UPLOADS_ROOT, uploadFolders } from '@/lib/storage';
+
+// Service des fichiers stockés localement (/uploads/<dossier>/<fichier>,
+// réécrit vers /api/files/... dans next.config.js) avec requêtes partielles :
+// Accept-Ranges, 206 + Content-Range, 416, If-Range, ETag / 304.
+// Le lecteur PDF et le lecteur audio ne téléchargent que les octets lus.
+
+const SERVED_FOLDERS = new Set(Object.values(uploadFolders));
+
+const contentTypes = {
+  pdf: 'application/pdf',
+  epub: 'application/epub+zip',
+  mp3: 'audio/mpeg',
+  m4a: 'audio/mp4',
+  mp4: 'audio/mp4',
+  ogg: 'audio/ogg',
+  wav: 'audio/wav',
+  jpg: 'image/jpeg',
+  jpeg: 'image/jpeg',
+  png: 'image/png',
+  gif: 'image/gif',
+  webp: 'image/webp',
+  avif: 'image/avif',
+};
+
+// En-tête Range -> { start, end } inclusifs, null (ignoré) ou 'unsatisfiable'.
+// Une seule plage est servie ; une demande multi-plages reçoit le fichier entier.
+export function parseRange(header, size) {
+  const match = /^bytes=(\d*)-(\d*)$/.exec((header || '').trim());
+  if (!match || (!match[1] && !match[2])) return null;
+
+  let start;
+  let end;
+  if (!match[1]) {
+    // Suffixe : les N derniers octets
+    const length = parseInt(match[2]);
+    if (length === 0) return 'unsatisfiable';
+    start = Math.max(size - length, 0);
+    end = size - 1;
+  } else {
+    start = parseInt(match[1]);
+    end = match[2] ? Math.min(parseInt(match[2]), size - 1) : size - 1;
+    if (match[2] && parseInt(match[2]) < start) return null;
+  }
+
+  if (start >= size) return 'unsatisfiable';
+  return { start, end };
+}
+
+function fileEtag(stats) {
+  return `"${stats.size.toString(36)}-${Math.floor(stats.mtimeMs).toString(36)}"`;
+}
+
+// Réponse pour GET /api/files/<dossier>/<fichier>, null si le fichier n'existe pas
+export async function serveStoredFile(request, folder, name, extraHeaders = {}) {
+  if (!SERVED_FOLDERS.has(folder) || !name || name !== path.basename(name) || name.startsWith('.')) {
+    return null;
+  }
+
+  const file = path.join(UPLOADS_ROOT, folder, name);
+  let stats;
+  try {
+    stats = await stat(file);
+  } catch {
+    return null;
+  }
+  if (!stats.isFile()) return null;
+
+  const etag = fileEtag(stats);
+  const extension = name.split('.').pop().toLowerCase();
+  const headers = {
+    ...extraHeaders,
+    'Accept-Ranges': 'bytes',
+    'Content-Type': contentTypes[extension] || 'application/octet-stream',
+    // Noms uniques (uuid ou empreinte du contenu) : jamais réécrits
+    // no-transform : pas de compression à la volée, les plages restent des octets du fichier
+    'Cache-Control': 'public, max-age=31536000, immutable, no-transform',
+    'ETag': etag,
+    'Last-Modified': stats.mtime.toUTCString(),
+  };
+
+  const ifNoneMatch = request.headers.get('if-none-match');
+  if (ifNoneMatch && ifNoneMatch.split(',').some((tag) => tag.trim().replace(/^W\//, '') === etag)) {
+    return new Response(null, { status: 304, headers });
+  }
+
+  // If-Range : la plage ne vaut que pour cette version du fichier
+  const ifRange = request.headers.get('if-range');
+  const rangeAllowed = !ifRange || ifRange === etag || ifRange === headers['Last-Modified'];
+  const range = rangeAllowed ? parseRange(request.headers.get('range'), stats.size) : null;
+
+  if (range === 'unsatisfiable') {
+    return new Response(null, {
+      status: 416,
+      headers: { ...headers, 'Content-Range': `bytes */${stats.size}` },
+    });
+  }
+
+  const { start, end } = range || { start: 0, end: stats.size - 1 };
+  const length = stats.size === 0 ? 0 : end - start + 1;
+  const body = length === 0 || request.method === 'HEAD'
+    ? null
+    : Readable.toWeb(createReadStream(file, { start, end }));
+
+  return new Response(body, {
+    status: range ? 206 : 200,
+    headers: {
+      ...headers,
+      'Content-Length': String(length),
+      ...(range ? { 'Content-Range': `bytes ${start}-${end}/${stats.size}` } : {}),
+    },
+  });
+}
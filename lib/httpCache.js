@@ -0,0 +1,112 @@
+import { createHash, randomBytes } from 'crypto';
+
+// Cache HTTP des lectures du catalogue : ETag fort dérivé d'une version du
+// catalogue qui change à chaque écriture sur `books` (API, recalcul des
+// facettes, scripts de seed), réponses 304 sur If-None-Match /
+// If-Modified-Since, et Cache-Control pour le CDN.
+
+const STATE_COLLECTION = 'catalog_state';
+const VERSION_ID = 'catalog_version';
+
+// Durée pendant laquelle une instance réutilise la version lue en base
+const VERSION_TTL_MS = parseInt(process.env.CATALOG_VERSION_TTL_MS) || 1000;
+const S_MAXAGE = parseInt(process.env.CATALOG_S_MAXAGE) || 10;
+const STALE_WHILE_REVALIDATE = parseInt(process.env.CATALOG_STALE_WHILE_REVALIDATE) || 60;
+
+const cache = globalThis._catalogVersionCache || (globalThis._catalogVersionCache = {
+  value: null,
+  expiresAt: 0,
+});
+
+function newVersion() {
+  return `${Date.now().toString(36)}-${randomBytes(4).toString('hex')}`;
+}
+
+// Version initiale d'une base où rien n'a encore été écrit
+const INITIAL_VERSION = { version: 'initial', updatedAt: new Date(0) };
+
+// Version courante du catalogue { version, updatedAt }. Lecture seule : seul
+// bumpCatalogVersion() écrit le document.
+export async function getCatalogVersion(db) {
+  if (cache.value && Date.now() < cache.expiresAt) {
+    return cache.value;
+  }
+
+  const state = await db.collection(STATE_COLLECTION).findOne(
+    { _id: VERSION_ID },
+    { projection: { version: 1, updatedAt: 1 } }
+  );
+
+  cache.value = state ? { version: state.version, updatedAt: state.updatedAt } : INITIAL_VERSION;
+  cache.expiresAt = Date.now() + VERSION_TTL_MS;
+  return cache.value;
+}
+
+// À appeler après chaque écriture sur `books`
+export async function bumpCatalogVersion(db) {
+  const value = { version: newVersion(), updatedAt: new Date() };
+  try {
+    await db.collection(STATE_COLLECTION).updateOne(
+      { _id: VERSION_ID },
+      { $set: value },
+      { upsert: true }
+    );
+    cache.value = value;
+    cache.expiresAt = Date.now() + VERSION_TTL_MS;
+  } catch (error) {
+    console.error('❌ Mise à jour version catalogue échouée:', error);
+    cache.expiresAt = 0;
+  }
+}
+
+// Politique de cache par route GET, null = pas de validateurs
+export function catalogCachePolicy(path, searchParams) {
+  if (searchParams.get('fresh') === 'true' || path === '/books/export') return null;
+
+  if (path === '/books' || path.startsWith('/books/') || path === '/categories' || path === '/authors') {
+    return `public, max-age=0, s-maxage=${S_MAXAGE}, stale-while-revalidate=${STALE_WHILE_REVALIDATE}`;
+  }
+  if (path === '/admin/stats') {
+    return 'private, no-cache';
+  }
+  return null;
+}
+
+// ETag propre à la ressource (chemin + paramètres triés) et à la version
+export function catalogValidators(path, searchParams, { version, updatedAt }) {
+  const params = [...searchParams.entries()]
+    .sort(([a], [b]) => (a < b ? -1 : a > b ? 1 : 0))
+    .map(([key, value]) => `${key}=${value}`)
+    .join('&');
+  const hash = createHash('sha1').update(`${version}|${path}?${params}`).digest('hex').slice(0, 20);
+
+  return {
+    etag: `"${hash}"`,
+    lastModified: new Date(updatedAt).toUTCString(),
+  };
+}
+
+export function cacheHeaders(policy, { etag, lastModified }) {
+  return {
+    'Cache-Control': policy,
+    'ETag': etag,
+    'Last-Modified': lastModified,
+  };
+}
+
+// If-None-Match prime sur If-Modified-Since (RFC 9110 §13.2.2)
+export function isNotModified(request, { etag, lastModified }) {
+  const ifNoneMatch = request.headers.get('if-none-match');
+  if (ifNoneMatch) {
+    return ifNoneMatch.trim() === '*' ||
+      ifNoneMatch.split(',').some((tag) => tag.trim().replace(/^W\//, '') === etag);
+  }
+
+  const ifModifiedSince = request.headers.get('if-modified-since');
+  if (ifModifiedSince) {
+    const since = Date.parse(ifModifiedSince);
+    return !Number.isNaN(since) && Date.parse(lastModified) <= since;
+  }
+
+  return false;
+}
@@ -0,0 +1,77 @@
+import { textIndexSpec } from '@/lib/search';
+
+// Index déclarés par l'API, créés une fois par base et par process à la
+// première connexion (createIndex est idempotent). Les formes de requêtes qui
+// doivent les utiliser sont dans lib/queryShapes.js.
+
+export const declaredIndexes = {
+  books: [
+    { key: { id: 1 }, options: { unique: true, name: 'book_id' } },
+    // Liste par défaut et pagination par curseur (createdAt desc, id desc)
+    { key: { createdAt: -1, id: -1 }, options: { name: 'book_recent' } },
+    // Listes filtrées triées par date
+    { key: { category: 1, createdAt: -1, id: -1 }, options: { name: 'book_category_recent' } },
+    { key: { author: 1, createdAt: -1, id: -1 }, options: { name: 'book_author_recent' } },
+    // Table admin triée par titre (les tris auteur / catégorie réutilisent les index ci-dessus)
+    { key: { title: 1, id: 1 }, options: { name: 'book_title' } },
+    // Livres listant un livre modifié ou supprimé comme similaire
+    { key: { 'related.id': 1 }, options: { name: 'book_related' } },
+    textIndexSpec,
+  ],
+  admins: [
+    { key: { email: 1 }, options: { unique: true, name: 'admin_email' } },
+  ],
+  catalog_facets: [
+    { key: { field: 1, value: 1 }, options: { unique: true, name: 'facet_field_value' } },
+  ],
+  cover_derivatives: [
+    { key: { originals: 1 }, options: { name: 'cover_original' } },
+  ],
+  book_texts: [
+    { key: { originals: 1 }, options: { name: 'book_text_original' } },
+  ],
+  // Vecteurs des livres similaires : candidats par terme, auteur ou catégorie, les plus récents d'abord
+  related_vectors: [
+    { key: { terms: 1, createdAt: -1 }, options: { name: 'related_terms' } },
+    { key: { author: 1, createdAt: -1 }, options: { name: 'related_author_recent' } },
+    { key: { category: 1, createdAt: -1 }, options: { name: 'related_category_recent' } },
+  ],
+  book_passages: [
+    { key: { textKey: 1, n: 1 }, options: { unique: true, name: 'book_passage' } },
+    // Passages candidats d'une question (index multiclé sur les termes)
+    { key: { textKey: 1, terms: 1 }, options: { name: 'book_passage_terms' } },
+  ],
+  // Jetons admin révoqués, supprimés à l'expiration du jeton
+  admin_revoked_sessions: [
+    { key: { expiresAt: 1 }, options: { expireAfterSeconds: 0, name: 'admin_revoked_ttl' } },
+  ],
+  upload_sessions: [
+    { key: { expiresAt: 1 }, options: { expireAfterSeconds: 0, name: 'upload_session_ttl' } },
+  ],
+  upload_parts: [
+    { key: { uploadId: 1, index: 1 }, options: { unique: true, name: 'upload_part' } },
+    { key: { expiresAt: 1 }, options: { expireAfterSeconds: 0, name: 'upload_part_ttl' } },
+  ],
+};
+
+const ensured = globalThis._declaredIndexes || (globalThis._declaredIndexes = new Map());
+
+// Un index en échec (ex. doublons d'`id` existants) est signalé sans bloquer l'API
+async function createDeclaredIndexes(db) {
+  const results = await Promise.allSettled(
+    Object.entries(declaredIndexes).flatMap(([collection, indexes]) =>
+      indexes.map(({ key, options }) => db.collection(collection).createIndex(key, options))
+    )
+  );
+
+  const failures = results.filter((result) => result.status === 'rejected');
+  failures.forEach(({ reason }) => console.error('❌ Création d\'index échouée:', reason.message));
+  console.log(`🗂️ Index vérifiés sur ${db.databaseName} (${results.length - failures.length}/${results.length})`);
+}
+
+export function ensureIndexes(db) {
+  if (!ensured.has(db.databaseName)) {
+    ensured.set(db.databaseName, createDeclaredIndexes(db));
+  }
+  return ensured.get(db.databaseName);
+}
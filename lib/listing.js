@@ -0,0 +1,51 @@
+// Vues liste du catalogue : projection `fields=` et tri `sort=` / `order=`.
+//
+//   fields=summary                  -> forme compacte pour les grilles et tables
+//   fields=title,author,coverImage  -> champs au choix (id toujours inclus)
+//   sort=title&order=asc            -> tri serveur (createdAt, title, author, category)
+
+// Ce qu'affichent les cartes et la table admin
+export const summaryFields = ['id', 'title', 'author', 'category', 'year', 'coverImage', 'coverSet', 'createdAt'];
+
+// Les livres sont libres (champs du formulaire + import) : tout nom simple est
+// accepté, mais ni opérateur ($) ni chemin (.) dans la projection.
+const FIELD_NAME = /^[A-Za-z][A-Za-z0-9_]*$/;
+
+// null = document complet, { error } = champ invalide
+export function bookProjection(fieldsParam) {
+  if (!fieldsParam) return null;
+
+  const fields = fieldsParam === 'summary'
+    ? summaryFields
+    : fieldsParam.split(',').map((field) => field.trim()).filter(Boolean);
+
+  const invalid = fields.filter((field) => !FIELD_NAME.test(field));
+  if (invalid.length > 0 || fields.length === 0) {
+    return { error: `Champs invalides: ${invalid.join(', ') || fieldsParam}` };
+  }
+
+  // id et createdAt servent à l'affichage et au curseur de pagination
+  const projection = { _id: 0, id: 1, createdAt: 1 };
+  fields.forEach((field) => { projection[field] = 1; });
+  return { projection };
+}
+
+// Chaque tri finit par des champs uniques pour une pagination stable ;
+// les clés suivent les index déclarés dans lib/indexes.js.
+export const listSorts = {
+  createdAt: (dir) => ({ createdAt: dir, id: dir }),
+  title: (dir) => ({ title: dir, id: dir }),
+  author: (dir) => ({ author: dir, createdAt: -dir, id: -dir }),
+  category: (dir) => ({ category: dir, createdAt: -dir, id: -dir }),
+};
+
+// null = pas de tri demandé, { error } = tri inconnu
+export function listSort(sortParam, orderParam) {
+  if (!sortParam) return null;
+  if (!listSorts[sortParam]) {
+    return { error: `Tri inconnu: ${sortParam}`, allowed: Object.keys(listSorts) };
+  }
+  const defaultDir = sortParam === 'createdAt' ? -1 : 1;
+  const dir = orderParam === 'asc' ? 1 : orderParam === 'desc' ? -1 : defaultDir;
+  return { sort: listSorts[sortParam](dir) };
+}
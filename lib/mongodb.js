@@ -0,0 +1,124 @@
+import { MongoClient } from 'mongodb';
+import { ensureIndexes } from '@/lib/indexes';
+
+// Intervalle minimal entre deux pings de vérification du client partagé
+const HEALTH_CHECK_INTERVAL_MS = parseInt(process.env.MONGODB_HEALTH_CHECK_MS) || 30000;
+
+const clientOptions = {
+  maxPoolSize: parseInt(process.env.MONGODB_MAX_POOL_SIZE) || 10,
+  minPoolSize: 0,
+  maxIdleTimeMS: 60000,
+  serverSelectionTimeoutMS: 10000,
+  connectTimeoutMS: 10000,
+  socketTimeoutMS: 30000,
+};
+
+// Cache au niveau du process : réutilisé par toutes les invocations d'une même
+// instance serverless et conservé entre les rechargements à chaud en dev.
+const cache = globalThis._mongoClientCache || (globalThis._mongoClientCache = {
+  promise: null,
+  client: null,
+  lastHealthCheck: 0,
+});
+
+// Compteurs du process (événements CMAP du driver), exposés par /api/health
+const stats = globalThis._mongoConnectionStats || (globalThis._mongoConnectionStats = {
+  clientsCreated: 0,
+  connectionsCreated: 0,
+  connectionsClosed: 0,
+});
+
+export function getDbName(mongoUri) {
+  return mongoUri.split('/').pop().split('?')[0] || 'immersive_library';
+}
+
+function connectClient(mongoUri) {
+  const client = new MongoClient(mongoUri, clientOptions);
+  stats.clientsCreated++;
+  client.on('connectionCreated', () => { stats.connectionsCreated++; });
+  client.on('connectionClosed', () => { stats.connectionsClosed++; });
+
+  // Si la topologie est fermée (failover, coupure réseau longue), repartir de zéro
+  client.on('topologyClosed', () => {
+    if (cache.client === client) {
+      console.warn('⚠️ Topologie MongoDB fermée, reconnexion au prochain appel');
+      cache.promise = null;
+      cache.client = null;
+    }
+  });
+
+  cache.promise = client.connect().then(() => {
+    console.log('✅ Pool MongoDB partagé établi');
+    cache.client = client;
+    cache.lastHealthCheck = Date.now();
+    return client;
+  }).catch((error) => {
+    cache.promise = null;
+    throw error;
+  });
+
+  return cache.promise;
+}
+
+// Clients et connexions ouverts par ce process depuis son démarrage :
+// `open` doit rester borné par maxPoolSize, quel que soit le trafic
+export function connectionStats() {
+  const { clientsCreated, connectionsCreated, connectionsClosed } = stats;
+  return {
+    clientsCreated,
+    connectionsCreated,
+    connectionsClosed,
+    open: connectionsCreated - connectionsClosed,
+    maxPoolSize: clientOptions.maxPoolSize,
+  };
+}
+
+// Ferme et oublie le client partagé (utilisé quand il ne répond plus)
+export async function resetDbConnection() {
+  const client = cache.client;
+  cache.promise = null;
+  cache.client = null;
+  cache.lastHealthCheck = 0;
+  if (client) {
+    await client.close(true).catch((error) => {
+      console.error('Erreur fermeture client:', error);
+    });
+  }
+}
+
+async function ensureHealthy(client, mongoUri) {
+  if (Date.now() - cache.lastHealthCheck < HEALTH_CHECK_INTERVAL_MS) {
+    return client;
+  }
+
+  try {
+    await client.db('admin').command({ ping: 1 });
+    cache.lastHealthCheck = Date.now();
+    return client;
+  } catch (error) {
+    console.warn('⚠️ Client MongoDB périmé, reconnexion:', error.message);
+    await resetDbConnection();
+    return connectClient(mongoUri);
+  }
+}
+
+// Connexion MongoDB partagée : un seul MongoClient (et son pool) par process
+export async function getDbConnection() {
+  const mongoUri = process.env.MONGODB_URI;
+
+  if (!mongoUri) {
+    console.error('❌ ERREUR: MONGODB_URI non configuré');
+    throw new Error('Configuration de base de données manquante');
+  }
+
+  try {
+    const client = await ensureHealthy(await (cache.promise || connectClient(mongoUri)), mongoUri);
+    const db = client.db(getDbName(mongoUri));
+    await ensureIndexes(db);
+
+    return { client, db };
+  } catch (error) {
+    console.error('❌ Erreur MongoDB:', error);
+    throw new Error(`Échec connexion base de données: ${error.message}`);
+  }
+}
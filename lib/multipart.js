@@ -0,0 +1,119 @@
+// Lecture en flux d'un corps multipart/form-data (RFC 7578) sans le charger
+// en mémoire : seuls la fin du tampon (longueur du délimiteur) et les
+// en-têtes de la partie courante sont conservés.
+
+const CRLF = Buffer.from('\r\n');
+const HEADER_END = Buffer.from('\r\n\r\n');
+const MAX_HEADER_SIZE = 16 * 1024;
+
+export function getBoundary(contentType) {
+  const match = /boundary=(?:"([^"]+)"|([^;]+))/i.exec(contentType || '');
+  return match ? (match[1] || match[2]).trim() : null;
+}
+
+function parsePartHeaders(raw) {
+  const headers = {};
+  for (const line of raw.split('\r\n')) {
+    const separator = line.indexOf(':');
+    if (separator > 0) {
+      headers[line.slice(0, separator).trim().toLowerCase()] = line.slice(separator + 1).trim();
+    }
+  }
+
+  const disposition = headers['content-disposition'] || '';
+  const name = /\bname="([^"]*)"/i.exec(disposition);
+  const filename = /\bfilename="([^"]*)"/i.exec(disposition);
+
+  return {
+    name: name ? name[1] : null,
+    filename: filename ? filename[1] : null,
+    contentType: headers['content-type'] || (filename ? 'application/octet-stream' : 'text/plain'),
+    headers,
+  };
+}
+
+// Itère sur les parties d'un corps multipart. Chaque partie expose `body`,
+// un itérable asynchrone de Buffer qui doit être consommé entièrement
+// (ou via `text()`) avant de passer à la partie suivante.
+export async function* iterateMultipart(stream, boundary) {
+  const reader = stream.getReader();
+  const delimiter = Buffer.from(`\r\n--${boundary}`);
+  // Le premier délimiteur n'est pas précédé de CRLF : on l'ajoute
+  let buffer = CRLF;
+  let finished = false;
+
+  async function fill() {
+    if (finished) return false;
+    const { value, done } = await reader.read();
+    if (done) {
+      finished = true;
+      return false;
+    }
+    buffer = buffer.length ? Buffer.concat([buffer, Buffer.from(value)]) : Buffer.from(value);
+    return true;
+  }
+
+  async function* readUntilDelimiter() {
+    while (true) {
+      const index = buffer.indexOf(delimiter);
+      if (index !== -1) {
+        if (index > 0) yield buffer.subarray(0, index);
+        buffer = buffer.subarray(index + delimiter.length);
+        return;
+      }
+      // Garder de quoi reconnaître un délimiteur coupé entre deux chunks
+      const safe = buffer.length - (delimiter.length - 1);
+      if (safe > 0) {
+        yield buffer.subarray(0, safe);
+        buffer = buffer.subarray(safe);
+      }
+      if (!await fill()) {
+        throw new Error('Corps multipart incomplet');
+      }
+    }
+  }
+
+  try {
+    // Préambule
+    for await (const _ of readUntilDelimiter()) { /* ignoré */ }
+
+    while (true) {
+      while (buffer.length < 2) {
+        if (!await fill()) throw new Error('Corps multipart incomplet');
+      }
+      // "--" après le délimiteur : fin du corps
+      if (buffer[0] === 0x2d && buffer[1] === 0x2d) return;
+      buffer = buffer.subarray(2);
+
+      let headerEnd;
+      while ((headerEnd = buffer.indexOf(HEADER_END)) === -1) {
+        if (buffer.length > MAX_HEADER_SIZE) throw new Error('En-têtes multipart trop longs');
+        if (!await fill()) throw new Error('Corps multipart incomplet');
+      }
+      const part = parsePartHeaders(buffer.subarray(0, headerEnd).toString('utf8'));
+      buffer = buffer.subarray(headerEnd + HEADER_END.length);
+
+      let consumed = false;
+      const body = readUntilDelimiter();
+      part.body = (async function* () {
+        yield* body;
+        consumed = true;
+      })();
+      part.text = async () => {
+        const chunks = [];
+        for await (const chunk of part.body) chunks.push(chunk);
+        return Buffer.concat(chunks).toString('utf8');
+      };
+
+      yield part;
+
+      if (!consumed) {
+        for await (const _ of part.body) { /* partie ignorée par l'appelant */ }
+      }
+    }
+  } finally {
+    // Abandon en cours de route (fichier refusé...) : ne pas lire la suite
+    if (!finished) await reader.cancel().catch(() => {});
+    reader.releaseLock();
+  }
+}
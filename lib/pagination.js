@@ -0,0 +1,50 @@
+// Pagination par curseur (keyset) : `after=<createdAt ISO>,<id>` du dernier
+// livre reçu. Le coût ne dépend pas de la profondeur, contrairement à skip().
+//
+// Un livre sans createdAt (anciens documents, écritures hors API) est trié
+// après tous les autres (null est la plus petite valeur) ; son curseur porte
+// `-` à la place de la date.
+
+const MISSING_DATE = '-';
+
+// Ordre total et stable : createdAt puis id pour départager les égalités
+export const cursorSort = { createdAt: -1, id: -1 };
+
+export function encodeCursor(book) {
+  const createdAt = book.createdAt ? new Date(book.createdAt) : null;
+  const valid = createdAt && !Number.isNaN(createdAt.getTime());
+  return `${valid ? createdAt.toISOString() : MISSING_DATE},${book.id}`;
+}
+
+// undefined = première page, null = curseur invalide
+export function decodeCursor(value) {
+  if (!value) return undefined;
+
+  const separator = value.indexOf(',');
+  if (separator === -1) return null;
+
+  const date = value.slice(0, separator);
+  const id = value.slice(separator + 1);
+  if (!id) return null;
+  if (date === MISSING_DATE) return { createdAt: null, id };
+
+  const createdAt = new Date(date);
+  if (Number.isNaN(createdAt.getTime())) return null;
+
+  return { createdAt, id };
+}
+
+// Filtre "strictement après le curseur" dans l'ordre cursorSort. Les livres
+// sans date suivent tous les livres datés.
+export function afterCursorQuery({ createdAt, id }) {
+  if (createdAt === null) {
+    return { createdAt: null, id: { $lt: id } };
+  }
+  return {
+    $or: [
+      { createdAt: { $lt: createdAt } },
+      { createdAt, id: { $lt: id } },
+      { createdAt: null },
+    ],
+  };
+}
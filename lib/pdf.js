@@ -0,0 +1,68 @@
+import { execFile } from 'child_process';
+import { createReadStream, createWriteStream } from 'fs';
+import { mkdtemp, rm } from 'fs/promises';
+import os from 'os';
+import path from 'path';
+import { Readable } from 'stream';
+import { pipeline } from 'stream/promises';
+import { promisify } from 'util';
+
+// Linéarisation des PDF à l'upload ("fast web view") : le dictionnaire de
+// linéarisation et les objets de la première page sont placés en tête du
+// fichier, le lecteur affiche la page 1 après quelques requêtes partielles.
+//
+// Utilise qpdf (QPDF_BIN ou PATH). Sans qpdf, ou si qpdf échoue, le fichier
+// est stocké tel quel.
+
+const run = promisify(execFile);
+const QPDF_BIN = process.env.QPDF_BIN || 'qpdf';
+
+let qpdfAvailable = null;
+async function hasQpdf() {
+  if (qpdfAvailable === null) {
+    qpdfAvailable = await run(QPDF_BIN, ['--version'])
+      .then(() => true)
+      .catch(() => {
+        console.warn('⚠️ qpdf introuvable : les PDF ne sont pas linéarisés');
+        return false;
+      });
+  }
+  return qpdfAvailable;
+}
+
+// Remplace le flux `chunks` d'un PDF par sa version linéarisée.
+// `info.linearized` indique si la linéarisation a eu lieu.
+export async function* linearizedPdf(chunks, info = {}) {
+  info.linearized = false;
+  if (!await hasQpdf()) {
+    yield* chunks;
+    return;
+  }
+
+  // qpdf a besoin du fichier complet : passage par un fichier temporaire
+  const directory = await mkdtemp(path.join(os.tmpdir(), 'pdf-'));
+  const input = path.join(directory, 'input.pdf');
+  const output = path.join(directory, 'output.pdf');
+
+  try {
+    await pipeline(Readable.from(chunks), createWriteStream(input));
+
+    let source = input;
+    try {
+      await run(QPDF_BIN, ['--linearize', '--object-streams=preserve', input, output], { timeout: 120000 });
+      source = output;
+    } catch (error) {
+      // Code 3 : terminé avec avertissements, le fichier produit est valide
+      if (error.code === 3) {
+        source = output;
+      } else {
+        console.warn('⚠️ Linéarisation PDF échouée, fichier stocké tel quel:', error.stderr || error.message);
+      }
+    }
+
+    info.linearized = source === output;
+    yield* createReadStream(source);
+  } finally {
+    await rm(directory, { recursive: true, force: true });
+  }
+}
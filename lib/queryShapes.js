@@ -0,0 +1,138 @@
+import { ensureIndexes } from '@/lib/indexes';
+import { textSearchQuery, regexSearchQuery, relevanceProjection, relevanceSort } from '@/lib/search';
+import { cursorSort, afterCursorQuery } from '@/lib/pagination';
+import { listSorts } from '@/lib/listing';
+import { facetPipeline } from '@/lib/facets';
+import { candidateQueries, listingQuery, rebuildQuery } from '@/lib/related';
+
+// Formes de requêtes émises par l'API, vérifiées avec explain() par
+// GET /api/admin/explain contre les index de lib/indexes.js. Les requêtes des
+// tâches de fond sont construites par les mêmes fonctions que le code qui les
+// émet, pour ne pas diverger.
+
+// Formes de requêtes (filtre + tri, ou pipeline) émises par route.js et lib/.
+// `allowCollscan` documente les parcours complets voulus.
+const sampleDate = new Date('2024-01-01T00:00:00Z');
+const sampleCursor = afterCursorQuery({ createdAt: sampleDate, id: '00000000-0000-0000-0000-000000000000' });
+const sampleVector = { _id: 'sample', vector: { baleine: 0.8, capitaine: 0.6 }, author: 'Victor Hugo', category: 'Fiction' };
+
+export const queryShapes = [
+  { name: 'GET /books', collection: 'books', filter: {}, sort: { createdAt: -1 }, limit: 12 },
+  { name: 'GET /books?category', collection: 'books', filter: { category: 'Fiction' }, sort: { createdAt: -1 }, limit: 12 },
+  { name: 'GET /books?author', collection: 'books', filter: { author: 'Victor Hugo' }, sort: { createdAt: -1 }, limit: 12 },
+  { name: 'GET /books?after', collection: 'books', filter: { $and: [{}, sampleCursor] }, sort: cursorSort, limit: 13 },
+  { name: 'GET /books?category&after', collection: 'books', filter: { $and: [{ category: 'Fiction' }, sampleCursor] }, sort: cursorSort, limit: 13 },
+  {
+    name: 'GET /books?after (livres sans date)',
+    collection: 'books',
+    filter: { $and: [{}, afterCursorQuery({ createdAt: null, id: '00000000-0000-0000-0000-000000000000' })] },
+    sort: cursorSort,
+    limit: 13,
+  },
+  {
+    name: 'GET /books?search',
+    collection: 'books',
+    filter: textSearchQuery('Harry'),
+    projection: relevanceProjection,
+    sort: relevanceSort,
+    limit: 12,
+  },
+  {
+    name: 'GET /books?search (partiel)',
+    collection: 'books',
+    filter: regexSearchQuery('Har'),
+    sort: { createdAt: -1 },
+    limit: 12,
+    allowCollscan: 'repli regex sur mots partiels, seulement si la recherche texte ne trouve rien',
+  },
+  { name: 'GET /books?sort=title', collection: 'books', filter: {}, sort: listSorts.title(1), limit: 10 },
+  { name: 'GET /books?sort=author&order=desc', collection: 'books', filter: {}, sort: listSorts.author(-1), limit: 10 },
+  { name: 'GET /books?sort=category', collection: 'books', filter: {}, sort: listSorts.category(1), limit: 10 },
+  { name: 'GET /books/export', collection: 'books', filter: {}, sort: cursorSort },
+  { name: 'GET/PUT/DELETE /books/:id', collection: 'books', filter: { id: 'sample' } },
+  { name: 'GET /books/:id?include=related', collection: 'books', filter: { id: { $in: ['sample-1', 'sample-2'] } } },
+  { name: 'GET /books?ids, POST /books/batch', collection: 'books', filter: { id: { $in: ['sample-1', 'sample-2', 'sample-3'] } } },
+  { name: 'Livres similaires (listes à revoir)', collection: 'books', ...listingQuery('sample') },
+  ...candidateQueries(sampleVector).map(({ name, ...query }) => ({
+    name: `Livres similaires (candidats par ${name})`,
+    collection: 'related_vectors',
+    ...query,
+  })),
+  { name: 'Livres similaires (df des termes)', collection: 'related_terms', filter: { _id: { $in: ['baleine', 'capitaine'] } } },
+  {
+    name: 'Livres similaires (recalcul complet)',
+    collection: 'books',
+    ...rebuildQuery,
+    allowCollscan: 'recalcul complet en arrière-plan (par lots, toutes les RELATED_REBUILD_MS ou par cron)',
+  },
+  { name: 'POST /admin/login', collection: 'admins', filter: { email: 'admin@library.com' } },
+  { name: 'Sessions admin révoquées', collection: 'admin_revoked_sessions', filter: { expiresAt: { $gt: sampleDate } } },
+  { name: 'coverSet par URL', collection: 'cover_derivatives', filter: { originals: '/uploads/covers/sample.jpg' } },
+  { name: 'textIndex par URL', collection: 'book_texts', filter: { originals: '/uploads/books/sample.pdf' } },
+  {
+    name: 'POST /chat (passages candidats)',
+    collection: 'book_passages',
+    filter: { textKey: 'sample', terms: { $in: ['valjean', 'cosette'] } },
+    projection: { _id: 0, n: 1, length: 1, 'tf.valjean': 1, 'tf.cosette': 1 },
+  },
+  { name: 'POST /chat (texte des passages)', collection: 'book_passages', filter: { textKey: 'sample', n: { $in: [3, 8] } } },
+  { name: 'GET /uploads/:id', collection: 'upload_parts', filter: { uploadId: 'sample' }, sort: { index: 1 } },
+  {
+    name: 'Lecture des facettes',
+    collection: 'catalog_facets',
+    filter: {},
+    allowCollscan: 'la collection de facettes est lue en entier (une entrée par catégorie / auteur)',
+  },
+  {
+    name: 'Recalcul des facettes (compteurs stockés)',
+    collection: 'catalog_facets',
+    filter: { field: { $ne: '_meta' } },
+    allowCollscan: 'comparaison avec les compteurs recalculés (une entrée par catégorie / auteur)',
+  },
+  ...['category', 'author'].map((field) => ({
+    name: `Recalcul des facettes (${field})`,
+    collection: 'books',
+    pipeline: facetPipeline(field),
+    allowCollscan: 'comptage complet en arrière-plan, toutes les FACET_REBUILD_MS ou après un import',
+  })),
+];
+
+// Étapes du plan gagnant (parcourt aussi queryPlan des plans SBE)
+function planStages(plan, stages = [], indexes = []) {
+  if (!plan || typeof plan !== 'object') return { stages, indexes };
+  if (plan.stage) stages.push(plan.stage);
+  if (plan.indexName) indexes.push(plan.indexName);
+  for (const child of [plan.queryPlan, plan.inputStage, ...(plan.inputStages || [])]) {
+    planStages(child, stages, indexes);
+  }
+  return { stages, indexes };
+}
+
+export async function explainQueryShapes(db) {
+  await ensureIndexes(db);
+
+  return Promise.all(queryShapes.map(async (shape) => {
+    const collection = db.collection(shape.collection);
+    let explain;
+    if (shape.pipeline) {
+      explain = await collection.aggregate(shape.pipeline).explain('queryPlanner');
+    } else {
+      let cursor = collection.find(shape.filter, { projection: shape.projection });
+      if (shape.sort) cursor = cursor.sort(shape.sort);
+      if (shape.limit) cursor = cursor.limit(shape.limit);
+      explain = await cursor.explain('queryPlanner');
+    }
+
+    // Agrégation : plan de la première étape ($cursor) s'il n'est pas en tête
+    const queryPlanner = explain.queryPlanner || explain.stages?.[0]?.$cursor?.queryPlanner;
+    const { stages, indexes } = planStages(queryPlanner.winningPlan);
+    return {
+      name: shape.name,
+      collection: shape.collection,
+      stages,
+      indexes,
+      collscan: stages.includes('COLLSCAN'),
+      allowCollscan: shape.allowCollscan || null,
+    };
+  }));
+}
@@ -0,0 +1,233 @@
+import { NextResponse } from 'next/server';
+import { corsHeaders } from '@/lib/cors';
+import { timed } from '@/lib/timing';
+
+// Contrôle d'admission des routes coûteuses (chat, uploads, recherche).
+// Chaque classe de routes a :
+// - un seau à jetons par client (IP) : `perMinute` jetons par minute, au plus
+//   `burst` d'avance ;
+// - un nombre maximal de requêtes simultanées, tous clients confondus, pour ne
+//   pas épuiser le pool MongoDB ni le quota OpenAI.
+// Une requête au-delà de ces limites attend au plus RATE_LIMIT_QUEUE_MS, puis
+// reçoit 429 avec Retry-After. Les lectures du catalogue ne sont pas limitées.
+//
+// L'état est local au process (une instance serverless applique ses propres
+// limites) et conservé entre les rechargements à chaud comme les autres caches.
+// Limites réglables par RATE_LIMIT_<CLASSE>_PER_MIN / _BURST / _CONCURRENCY ;
+// RATE_LIMIT=off désactive le contrôle.
+//
+// Client : request.ip (renseigné par Vercel), sinon l'adresse ajoutée à
+// X-Forwarded-For par le dernier des RATE_LIMIT_TRUSTED_HOPS proxys de
+// confiance (1 par défaut, 0 = en-têtes ignorés) : les sauts précédents sont
+// fournis par le client et ne servent pas de clé.
+
+const DISABLED = process.env.RATE_LIMIT === 'off';
+const QUEUE_MS = parseInt(process.env.RATE_LIMIT_QUEUE_MS ?? '2000');
+const MAX_BUCKETS = parseInt(process.env.RATE_LIMIT_MAX_CLIENTS) || 10000;
+const TRUSTED_HOPS = parseInt(process.env.RATE_LIMIT_TRUSTED_HOPS ?? '1');
+
+function limits(name, defaults) {
+  const env = (suffix) => parseFloat(process.env[`RATE_LIMIT_${name.toUpperCase()}_${suffix}`]);
+  return {
+    perMinute: env('PER_MIN') || defaults.perMinute,
+    burst: env('BURST') || defaults.burst,
+    concurrency: env('CONCURRENCY') || defaults.concurrency,
+  };
+}
+
+export const routeLimits = {
+  chat: limits('chat', { perMinute: 20, burst: 10, concurrency: 8 }),
+  upload: limits('upload', { perMinute: 30, burst: 10, concurrency: 3 }),
+  search: limits('search', { perMinute: 600, burst: 60, concurrency: 6 }),
+};
+
+const store = globalThis._rateLimitStore || (globalThis._rateLimitStore = {
+  buckets: new Map(), // `${classe}:${client}` -> { tokens, updatedAt }, du moins au plus récent
+  slots: new Map(),   // classe -> { active, waiting: [] }
+});
+
+const UPLOAD_PATHS = new Set(['/upload', '/upload-url', '/uploads', '/books/import']);
+
+// Classe de la requête, null pour une route non limitée
+export function routeClass(method, path, searchParams) {
+  if (method === 'POST' && path === '/chat') return 'chat';
+  if (method === 'POST' && (UPLOAD_PATHS.has(path) || /^\/uploads\/[^/]+\/complete$/.test(path))) return 'upload';
+  if (method === 'PUT' && /^\/uploads\/[^/]+\/parts\/\d+$/.test(path)) return 'upload';
+  if (method === 'GET' && ((path === '/books' && searchParams.get('search')) || path === '/books/export')) return 'search';
+  return null;
+}
+
+export function clientKey(request) {
+  if (request.ip) return request.ip;
+  if (TRUSTED_HOPS <= 0) return 'local';
+
+  const hops = (request.headers.get('x-forwarded-for') || '')
+    .split(',')
+    .map((hop) => hop.trim())
+    .filter(Boolean);
+  if (hops.length > 0) return hops[Math.max(hops.length - TRUSTED_HOPS, 0)];
+  return request.headers.get('x-real-ip') || 'local';
+}
+
+// ---------- Seau à jetons ----------
+
+// Réserve un jeton. Le seau peut passer en négatif : les requêtes en attente
+// y ont déjà pris leur jeton et seront servies dans l'ordre.
+// Renvoie { wait } (ms avant que le jeton soit disponible) ou { refusedFor }.
+function reserveToken(limit, key) {
+  const now = Date.now();
+  const perMs = limit.perMinute / 60000;
+
+  let bucket = store.buckets.get(key);
+  if (bucket) {
+    // Réinsertion : la Map reste ordonnée du client le moins récent au plus récent
+    store.buckets.delete(key);
+    bucket.tokens = Math.min(limit.burst, bucket.tokens + (now - bucket.updatedAt) * perMs);
+    bucket.updatedAt = now;
+  } else {
+    bucket = { tokens: limit.burst, updatedAt: now };
+  }
+  store.buckets.set(key, bucket);
+  if (store.buckets.size > MAX_BUCKETS) {
+    store.buckets.delete(store.buckets.keys().next().value);
+  }
+
+  const wait = bucket.tokens >= 1 ? 0 : (1 - bucket.tokens) / perMs;
+  if (wait > QUEUE_MS) return { refusedFor: wait };
+  bucket.tokens -= 1;
+  return { wait };
+}
+
+function refundToken(limit, key) {
+  const bucket = store.buckets.get(key);
+  if (bucket) bucket.tokens = Math.min(limit.burst, bucket.tokens + 1);
+}
+
+// ---------- Requêtes simultanées ----------
+
+function acquireSlot(name, limit, timeoutMs) {
+  if (!store.slots.has(name)) store.slots.set(name, { active: 0, waiting: [] });
+  const slots = store.slots.get(name);
+
+  if (slots.active < limit.concurrency) {
+    slots.active++;
+    return Promise.resolve(true);
+  }
+  if (timeoutMs <= 0) return Promise.resolve(false);
+
+  return new Promise((resolve) => {
+    const waiter = { resolve };
+    waiter.timer = setTimeout(() => {
+      slots.waiting.splice(slots.waiting.indexOf(waiter), 1);
+      resolve(false);
+    }, timeoutMs);
+    slots.waiting.push(waiter);
+  });
+}
+
+// La place libérée passe directement à la plus ancienne requête en attente
+function releaseSlot(name) {
+  const slots = store.slots.get(name);
+  const next = slots.waiting.shift();
+  if (next) {
+    clearTimeout(next.timer);
+    next.resolve(true);
+  } else {
+    slots.active--;
+  }
+}
+
+// ---------- Admission ----------
+
+const sleep = (ms) => new Promise((resolve) => setTimeout(resolve, ms));
+
+async function admit(name, client) {
+  const limit = routeLimits[name];
+  const key = `${name}:${client}`;
+
+  const token = reserveToken(limit, key);
+  if (token.refusedFor !== undefined) {
+    return { admitted: false, retryAfter: Math.ceil(token.refusedFor / 1000) };
+  }
+  if (token.wait > 0) await sleep(token.wait);
+
+  if (!await acquireSlot(name, limit, QUEUE_MS - token.wait)) {
+    refundToken(limit, key);
+    return { admitted: false, retryAfter: 1 };
+  }
+
+  let released = false;
+  return {
+    admitted: true,
+    release: () => {
+      if (!released) {
+        released = true;
+        releaseSlot(name);
+      }
+    },
+  };
+}
+
+// La place est rendue quand le corps a été entièrement envoyé (ou abandonné
+// par le client) : une réponse du chat occupe sa place pendant tout le flux
+function releaseWhenSent(response, release) {
+  if (!response.body) {
+    release();
+    return response;
+  }
+
+  const reader = response.body.getReader();
+  const body = new ReadableStream({
+    async pull(controller) {
+      try {
+        const { done, value } = await reader.read();
+        if (done) {
+          release();
+          controller.close();
+        } else {
+          controller.enqueue(value);
+        }
+      } catch (error) {
+        release();
+        controller.error(error);
+      }
+    },
+    cancel(reason) {
+      release();
+      return reader.cancel(reason);
+    },
+  });
+  return new Response(body, response);
+}
+
+function tooManyRequests(name, retryAfter) {
+  return NextResponse.json({
+    success: false,
+    error: 'Trop de requêtes, réessayez dans quelques instants'
+  }, {
+    status: 429,
+    headers: { ...corsHeaders, 'Retry-After': String(Math.max(retryAfter, 1)), 'X-RateLimit-Class': name }
+  });
+}
+
+// Enveloppe un handler de route : les requêtes d'une classe limitée passent
+// par l'admission (attente comptée dans l'étape `queue` de Server-Timing)
+export function withAdmission(handler) {
+  if (DISABLED) return handler;
+
+  return async (request, context) => {
+    const { pathname, searchParams } = new URL(request.url);
+    const name = routeClass(request.method, pathname.replace('/api', ''), searchParams);
+    if (!name) return handler(request, context);
+
+    const admission = await timed('queue', () => admit(name, clientKey(request)));
+    if (!admission.admitted) return tooManyRequests(name, admission.retryAfter);
+
+    try {
+      return releaseWhenSent(await handler(request, context), admission.release);
+    } catch (error) {
+      admission.release();
+      throw error;
+    }
+  };
+}
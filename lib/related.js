@@ -0,0 +1,448 @@
+import { tokenize } from '@/lib/bookText';
+import { bumpCatalogVersion } from '@/lib/httpCache';
+import { bookProjection } from '@/lib/listing';
+
+// Livres similaires précalculés : chaque livre porte `related`, ses plus
+// proches voisins [{ id, score }] (RELATED_KEEP conservés, RELATED_COUNT
+// servis), renvoyés avec le livre par GET /api/books/:id?include=related.
+//
+// Score entre deux livres : même auteur + même catégorie + similarité cosinus
+// TF-IDF du titre et de la description.
+//
+// Index maintenu en base, jamais reconstruit à partir d'un parcours de `books`
+// pendant une requête :
+// - related_vectors : vecteur TF-IDF normalisé de chaque livre, ses termes
+//   (index multiclé), son auteur et sa catégorie ;
+// - related_terms   : nombre de livres contenant chaque terme (df).
+//
+// Une écriture sur un livre est traitée en arrière-plan, après la réponse :
+// seul son vecteur est recalculé, puis comparé aux candidats partageant ses
+// termes, son auteur ou sa catégorie (requêtes indexées, plafonnées) ; sa
+// liste et celles de ces candidats sont mises à jour. Les tâches d'une même
+// base s'exécutent l'une après l'autre.
+//
+// Le recalcul complet (dérive des df, écritures faites hors API) lit le
+// catalogue par lots en rendant la main à la boucle d'événements entre deux
+// lots. Auteur et catégorie ne comptent que pour les RELATED_GROUP_CAP livres
+// les plus récents du groupe, chaque terme que pour ses RELATED_POSTING_CAP
+// livres les mieux pondérés : le coût reste linéaire en nombre de livres.
+// Lancé par le trafic toutes les RELATED_REBUILD_MS (RELATED_AUTO_REBUILD=false
+// pour le réserver à POST /api/admin/related/rebuild, ex. depuis un cron).
+
+const RELATED_COUNT = parseInt(process.env.RELATED_COUNT) || 10;
+const RELATED_KEEP = RELATED_COUNT * 2;
+const RELATED_REBUILD_MS = parseInt(process.env.RELATED_REBUILD_MS) || 6 * 60 * 60 * 1000;
+const AUTO_REBUILD = process.env.RELATED_AUTO_REBUILD !== 'false';
+const META_CHECK_MS = 60 * 1000;
+
+const GROUP_CAP = parseInt(process.env.RELATED_GROUP_CAP) || 100;
+const POSTING_CAP = parseInt(process.env.RELATED_POSTING_CAP) || 50;
+const QUERY_TERMS = 12;
+const TEXT_CANDIDATES = 200;
+const REBUILD_BATCH = 1000;
+
+const AUTHOR_WEIGHT = 1.5;
+const CATEGORY_WEIGHT = 1;
+const TEXT_WEIGHT = 2;
+
+const STATE_COLLECTION = 'catalog_state';
+const META_ID = 'related_books';
+const VECTORS = 'related_vectors';
+const TERMS = 'related_terms';
+
+const SIMILARITY_FIELDS = ['title', 'author', 'category', 'description'];
+const SOURCE_PROJECTION = { _id: 0, id: 1, title: 1, author: 1, category: 1, description: 1, createdAt: 1, related: 1 };
+const VECTOR_PROJECTION = { _id: 1, vector: 1, author: 1, category: 1 };
+
+// Par base : file des tâches et date de la dernière vérification du recalcul
+const jobs = globalThis._relatedBooksJobs || (globalThis._relatedBooksJobs = new Map());
+
+function dbJobs(db) {
+  if (!jobs.has(db.databaseName)) {
+    jobs.set(db.databaseName, { tail: Promise.resolve(), rebuildQueued: null, checkedAt: 0 });
+  }
+  return jobs.get(db.databaseName);
+}
+
+function enqueue(db, task) {
+  const current = dbJobs(db);
+  current.tail = current.tail.then(task);
+  return current.tail;
+}
+
+const yieldToLoop = () => new Promise((resolve) => setImmediate(resolve));
+
+// ---------- Similarité ----------
+
+function termFrequencies(book) {
+  const tf = new Map();
+  for (const term of tokenize(`${book.title || ''} ${book.description || ''}`)) {
+    tf.set(term, (tf.get(term) || 0) + 1);
+  }
+  return tf;
+}
+
+// Vecteur TF-IDF normalisé { terme: poids }
+function weigh(tf, dfOf, total) {
+  const vector = {};
+  let norm = 0;
+  for (const [term, count] of tf) {
+    const weight = (1 + Math.log(count)) * Math.log(total / Math.max(dfOf(term), 1));
+    if (weight > 0) {
+      vector[term] = weight;
+      norm += weight * weight;
+    }
+  }
+  norm = Math.sqrt(norm);
+  for (const term of Object.keys(vector)) vector[term] /= norm;
+  return vector;
+}
+
+const round = (score) => Math.round(score * 10000) / 10000;
+
+function groupScore(a, b) {
+  let score = 0;
+  if (a.author && a.author === b.author) score += AUTHOR_WEIGHT;
+  if (a.category && a.category === b.category) score += CATEGORY_WEIGHT;
+  return score;
+}
+
+function similarity(a, b) {
+  let text = 0;
+  for (const [term, weight] of Object.entries(a.vector)) {
+    if (b.vector[term]) text += weight * b.vector[term];
+  }
+  return round(groupScore(a, b) + TEXT_WEIGHT * text);
+}
+
+function byScore(a, b) {
+  return b.score - a.score || (a.id < b.id ? -1 : a.id > b.id ? 1 : 0);
+}
+
+function topTerms(vector) {
+  return Object.entries(vector)
+    .sort((a, b) => b[1] - a[1])
+    .slice(0, QUERY_TERMS)
+    .map(([term]) => term);
+}
+
+const sameList = (a, b) => JSON.stringify(a || null) === JSON.stringify(b);
+
+// ---------- Mise à jour incrémentale ----------
+
+// Requêtes des candidats de `doc` : vecteurs partageant ses termes les mieux
+// pondérés, son auteur ou sa catégorie, les plus récents d'abord (plafonnées).
+// Reprises par lib/queryShapes.js.
+export function candidateQueries(doc) {
+  const others = { _id: { $ne: doc._id } };
+  const terms = topTerms(doc.vector);
+  return [
+    terms.length > 0 && { name: 'terme', filter: { ...others, terms: { $in: terms } }, limit: TEXT_CANDIDATES },
+    doc.author && { name: 'auteur', filter: { ...others, author: doc.author }, limit: GROUP_CAP },
+    doc.category && { name: 'catégorie', filter: { ...others, category: doc.category }, limit: GROUP_CAP },
+  ].filter(Boolean).map((query) => ({ ...query, sort: { createdAt: -1 } }));
+}
+
+// Livres listant `id` comme similaire
+export function listingQuery(id) {
+  return { filter: { 'related.id': id }, limit: TEXT_CANDIDATES };
+}
+
+// Lecture complète du catalogue par le recalcul (parcours voulu)
+export const rebuildQuery = { filter: {}, projection: SOURCE_PROJECTION };
+
+async function candidateVectors(db, doc) {
+  const vectors = db.collection(VECTORS);
+  const groups = await Promise.all(candidateQueries(doc).map(({ filter, sort, limit }) =>
+    vectors.find(filter, { projection: VECTOR_PROJECTION }).sort(sort).limit(limit).toArray()
+  ));
+  return [...new Map(groups.flat().map((candidate) => [candidate._id, candidate])).values()];
+}
+
+// Met à jour df et le vecteur du livre ; renvoie le nouveau vecteur (null si supprimé)
+async function updateVector(db, id, book) {
+  const vectors = db.collection(VECTORS);
+  const terms = db.collection(TERMS);
+
+  // `terms` : tous les termes du texte, y compris ceux de poids nul (comptés dans df)
+  const previous = await vectors.findOne({ _id: id }, { projection: { terms: 1 } });
+  const oldTerms = new Set(previous?.terms || []);
+  const tf = book ? termFrequencies(book) : new Map();
+
+  const increments = [
+    ...[...tf.keys()].filter((term) => !oldTerms.has(term)).map((term) => [term, 1]),
+    ...[...oldTerms].filter((term) => !tf.has(term)).map((term) => [term, -1]),
+  ];
+  if (increments.length > 0) {
+    await terms.bulkWrite(increments.map(([term, inc]) => ({
+      updateOne: { filter: { _id: term }, update: { $inc: { df: inc } }, upsert: true },
+    })), { ordered: false });
+  }
+
+  if (!book) {
+    await vectors.deleteOne({ _id: id });
+    return null;
+  }
+
+  const total = await vectors.estimatedDocumentCount() + (previous ? 0 : 1);
+  const dfs = await terms.find({ _id: { $in: [...tf.keys()] } }).toArray();
+  const dfByTerm = new Map(dfs.map((doc) => [doc._id, doc.df]));
+  const doc = {
+    _id: id,
+    terms: [...tf.keys()],
+    vector: weigh(tf, (term) => dfByTerm.get(term), total),
+    author: book.author || null,
+    category: book.category || null,
+    createdAt: book.createdAt ? new Date(book.createdAt) : new Date(),
+  };
+  await vectors.replaceOne({ _id: id }, doc, { upsert: true });
+  return doc;
+}
+
+async function applyRelatedChange(db, before, after) {
+  const books = db.collection('books');
+  const id = (after || before).id;
+  const doc = await updateVector(db, id, after);
+
+  if (!doc) {
+    const { modifiedCount } = await books.updateMany({ 'related.id': id }, { $pull: { related: { id } } });
+    if (modifiedCount > 0) await bumpCatalogVersion(db);
+    return;
+  }
+
+  const candidates = await candidateVectors(db, doc);
+  const scores = new Map();
+  for (const candidate of candidates) {
+    const score = similarity(doc, candidate);
+    if (score > 0) scores.set(candidate._id, score);
+  }
+
+  // Livres à revoir : les candidats, et ceux qui listaient déjà ce livre
+  const { filter, limit } = listingQuery(id);
+  const listing = await books.find(filter, { projection: { _id: 0, id: 1 } }).limit(limit).toArray();
+  const affected = [...new Set([...scores.keys(), ...listing.map((book) => book.id)])];
+  const neighbours = await books.find({ id: { $in: affected } }, { projection: { _id: 0, id: 1, related: 1 } })
+    .toArray();
+
+  const relatedAt = new Date();
+  const updates = [];
+  for (const book of neighbours) {
+    // Livres jamais calculés : laissés au recalcul complet
+    if (!book.related) continue;
+    const score = scores.get(book.id);
+    const related = book.related.filter((entry) => entry.id !== id);
+    if (score) related.push({ id, score });
+    related.sort(byScore);
+    const kept = related.slice(0, RELATED_KEEP);
+    if (!sameList(book.related, kept)) {
+      updates.push({ updateOne: { filter: { id: book.id }, update: { $set: { related: kept, relatedAt } } } });
+    }
+  }
+
+  const own = [...scores].map(([other, score]) => ({ id: other, score })).sort(byScore).slice(0, RELATED_KEEP);
+  updates.push({ updateOne: { filter: { id }, update: { $set: { related: own, relatedAt } } } });
+  await books.bulkWrite(updates, { ordered: false });
+  // Les réponses déjà en cache (?include=related) doivent être revalidées
+  await bumpCatalogVersion(db);
+}
+
+// À appeler après chaque écriture sur `books` avec le document avant/après
+// (null pour une création / suppression). Traité en arrière-plan : la réponse
+// n'attend pas le calcul.
+export function queueRelatedChange(db, before, after) {
+  // Seuls l'auteur, la catégorie, le titre et la description comptent
+  const unchanged = before && after && after.related &&
+    SIMILARITY_FIELDS.every((field) => before[field] === after[field]);
+  if (unchanged) return Promise.resolve();
+
+  return enqueue(db, () => applyRelatedChange(db, before, after).catch((error) => {
+    // Listes potentiellement fausses : forcer un recalcul complet
+    console.error('❌ Mise à jour livres similaires échouée:', error);
+    rebuildRelatedInBackground(db);
+  }));
+}
+
+// ---------- Recalcul complet ----------
+
+// Les `cap` livres les plus récents de chaque valeur de `field`
+function recentGroups(entries, field) {
+  const groups = new Map();
+  for (let index = 0; index < entries.length; index++) {
+    const value = entries[index][field];
+    if (!value) continue;
+    if (!groups.has(value)) groups.set(value, []);
+    groups.get(value).push(index);
+  }
+  for (const [value, indexes] of groups) {
+    groups.set(value, indexes
+      .sort((a, b) => entries[b].createdAt - entries[a].createdAt)
+      .slice(0, GROUP_CAP));
+  }
+  return groups;
+}
+
+export async function rebuildRelated(db) {
+  const started = Date.now();
+  const builtAt = new Date();
+
+  // 1. Lecture par lots : fréquences de termes et df
+  const entries = [];
+  const df = new Map();
+  const cursor = db.collection('books').find(rebuildQuery.filter, { projection: rebuildQuery.projection, batchSize: REBUILD_BATCH });
+  for await (const book of cursor) {
+    const tf = termFrequencies(book);
+    tf.forEach((_, term) => df.set(term, (df.get(term) || 0) + 1));
+    entries.push({
+      id: book.id,
+      author: book.author || null,
+      category: book.category || null,
+      createdAt: book.createdAt ? new Date(book.createdAt) : new Date(0),
+      related: book.related,
+      tf,
+    });
+    if (entries.length % REBUILD_BATCH === 0) await yieldToLoop();
+  }
+
+  // 2. Vecteurs et listes inversées plafonnées (les POSTING_CAP poids les plus forts)
+  const postings = new Map();
+  for (let index = 0; index < entries.length; index++) {
+    const entry = entries[index];
+    entry.vector = weigh(entry.tf, (term) => df.get(term), entries.length);
+    for (const [term, weight] of Object.entries(entry.vector)) {
+      if (!postings.has(term)) postings.set(term, []);
+      postings.get(term).push([index, weight]);
+    }
+    if (index % REBUILD_BATCH === 0) await yieldToLoop();
+  }
+  for (const [term, list] of postings) {
+    if (list.length > POSTING_CAP) postings.set(term, list.sort((a, b) => b[1] - a[1]).slice(0, POSTING_CAP));
+  }
+  const byAuthor = recentGroups(entries, 'author');
+  const byCategory = recentGroups(entries, 'category');
+
+  // 3. Listes, écrites par lots
+  let changed = 0;
+  let updates = [];
+  let vectorWrites = [];
+  for (let index = 0; index < entries.length; index++) {
+    const entry = entries[index];
+    const scores = new Map();
+    const add = (other, score) => {
+      if (other !== index) scores.set(other, (scores.get(other) || 0) + score);
+    };
+    for (const [term, weight] of Object.entries(entry.vector)) {
+      for (const [other, otherWeight] of postings.get(term) || []) add(other, TEXT_WEIGHT * weight * otherWeight);
+    }
+    (byAuthor.get(entry.author) || []).forEach((other) => add(other, AUTHOR_WEIGHT));
+    (byCategory.get(entry.category) || []).forEach((other) => add(other, CATEGORY_WEIGHT));
+
+    const related = [...scores]
+      .map(([other, score]) => ({ id: entries[other].id, score: round(score) }))
+      .sort(byScore)
+      .slice(0, RELATED_KEEP);
+    if (!sameList(entry.related, related)) {
+      updates.push({ updateOne: { filter: { id: entry.id }, update: { $set: { related, relatedAt: builtAt } } } });
+      changed++;
+    }
+    vectorWrites.push({
+      replaceOne: {
+        filter: { _id: entry.id },
+        replacement: {
+          _id: entry.id,
+          terms: [...entry.tf.keys()],
+          vector: entry.vector,
+          author: entry.author,
+          category: entry.category,
+          createdAt: entry.createdAt,
+          builtAt,
+        },
+        upsert: true,
+      },
+    });
+
+    if (vectorWrites.length >= REBUILD_BATCH || index === entries.length - 1) {
+      if (updates.length > 0) await db.collection('books').bulkWrite(updates, { ordered: false });
+      await db.collection(VECTORS).bulkWrite(vectorWrites, { ordered: false });
+      updates = [];
+      vectorWrites = [];
+      await yieldToLoop();
+    }
+  }
+
+  // 4. df et vecteurs des livres disparus
+  const terms = [...df];
+  for (let i = 0; i < terms.length; i += REBUILD_BATCH) {
+    await db.collection(TERMS).bulkWrite(terms.slice(i, i + REBUILD_BATCH).map(([term, count]) => ({
+      replaceOne: { filter: { _id: term }, replacement: { _id: term, df: count, builtAt }, upsert: true },
+    })), { ordered: false });
+    await yieldToLoop();
+  }
+  await db.collection(TERMS).deleteMany({ builtAt: { $ne: builtAt } });
+  await db.collection(VECTORS).deleteMany({ builtAt: { $ne: builtAt } });
+
+  await db.collection(STATE_COLLECTION).updateOne(
+    { _id: META_ID },
+    { $set: { builtAt, books: entries.length } },
+    { upsert: true }
+  );
+  if (changed > 0) await bumpCatalogVersion(db);
+
+  const durationMs = Date.now() - started;
+  console.log(`🔗 Livres similaires recalculés (${entries.length} livres, ${changed} modifiés) en ${durationMs}ms`);
+  dbJobs(db).checkedAt = Date.now();
+  return { books: entries.length, changed, durationMs };
+}
+
+// Recalcul complet placé dans la file de la base (une seule fois à la fois)
+export function rebuildRelatedInBackground(db) {
+  const current = dbJobs(db);
+  if (!current.rebuildQueued) {
+    current.rebuildQueued = enqueue(db, () => {
+      current.rebuildQueued = null;
+      return rebuildRelated(db).catch((error) => console.error('❌ Recalcul livres similaires échoué:', error));
+    });
+  }
+  return current.rebuildQueued;
+}
+
+// Recalcul complet attendu par l'appelant (cron) : même file que les autres
+// tâches de la base, l'erreur éventuelle est renvoyée à l'appelant
+export async function rebuildRelatedNow(db) {
+  let failure = null;
+  const report = await enqueue(db, () => rebuildRelated(db).catch((error) => { failure = error; }));
+  if (failure) throw failure;
+  return report;
+}
+
+// Lance le recalcul complet s'il n'a jamais eu lieu ou date de plus de RELATED_REBUILD_MS
+async function scheduleRebuild(db) {
+  const current = dbJobs(db);
+  if (!AUTO_REBUILD || Date.now() - current.checkedAt < META_CHECK_MS) return;
+  current.checkedAt = Date.now();
+
+  const meta = await db.collection(STATE_COLLECTION).findOne({ _id: META_ID });
+  if (!meta || Date.now() - new Date(meta.builtAt).getTime() > RELATED_REBUILD_MS) {
+    rebuildRelatedInBackground(db);
+  }
+}
+
+// ---------- Lecture ----------
+
+// Livres similaires de `book` (forme summary), dans l'ordre de la liste.
+// Un livre sans liste (antérieur à l'index) en reçoit une en arrière-plan.
+export async function relatedBooks(db, book) {
+  await scheduleRebuild(db);
+
+  if (!book.related) {
+    queueRelatedChange(db, null, book);
+    return [];
+  }
+  const ids = book.related.slice(0, RELATED_COUNT).map((entry) => entry.id);
+  if (ids.length === 0) return [];
+
+  const docs = await db.collection('books')
+    .find({ id: { $in: ids } }, { projection: bookProjection('summary').projection })
+    .toArray();
+  const byId = new Map(docs.map((doc) => [doc.id, doc]));
+  return ids.filter((id) => byId.has(id)).map((id) => byId.get(id));
+}
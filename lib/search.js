@@ -0,0 +1,73 @@
+// Recherche plein texte du catalogue : index texte MongoDB pondéré et
+// insensible aux accents, avec repli sur une regex pour la saisie partielle.
+
+export const TEXT_INDEX_NAME = 'books_text_search';
+
+export const textIndexSpec = {
+  key: { title: 'text', author: 'text', description: 'text' },
+  options: {
+    name: TEXT_INDEX_NAME,
+    weights: { title: 10, author: 5, description: 1 },
+    default_language: 'french',
+    // Les livres ont un champ `language` libre ("French", ...) que MongoDB
+    // interpréterait comme langue de l'index : on utilise un autre champ.
+    language_override: 'searchLanguage',
+  },
+};
+
+const ensured = globalThis._searchIndexEnsured || (globalThis._searchIndexEnsured = new Set());
+
+// Crée l'index texte une fois par base et par process (createIndex est idempotent).
+// Retourne false si l'index n'est pas disponible : l'appelant passe en regex.
+export async function ensureSearchIndex(db) {
+  if (ensured.has(db.databaseName)) return true;
+  try {
+    await db.collection('books').createIndex(textIndexSpec.key, textIndexSpec.options);
+    ensured.add(db.databaseName);
+    return true;
+  } catch (error) {
+    console.error('❌ Index de recherche indisponible:', error.message);
+    return false;
+  }
+}
+
+const accentClasses = {
+  a: 'aàâäáãå', c: 'cç', e: 'eéèêë', i: 'iîïíì', n: 'nñ',
+  o: 'oôöóòõ', u: 'uùûüú', y: 'yÿý',
+};
+
+function escapeRegex(value) {
+  return value.replace(/[.*+?^${}()|[\]\\]/g, '\\$&');
+}
+
+export function stripAccents(value) {
+  return value.normalize('NFD').replace(/[\u0300-\u036f]/g, '');
+}
+
+// "miserables" -> "m[iîïíì]s[eéèêë]r[aàâäáãå]bl[eéèêë]s"
+export function accentInsensitivePattern(search) {
+  return Array.from(stripAccents(search.toLowerCase())).map((char) => {
+    const variants = accentClasses[char];
+    return variants ? `[${variants}]` : escapeRegex(char);
+  }).join('');
+}
+
+// Filtre indexé : utilise l'index texte, classement par pertinence
+export function textSearchQuery(search) {
+  return { $text: { $search: search, $diacriticSensitive: false } };
+}
+
+// Filtre de repli (saisie en cours, mots partiels) : sous-chaîne sans accents
+export function regexSearchQuery(search) {
+  const pattern = accentInsensitivePattern(search.trim());
+  return {
+    $or: [
+      { title: { $regex: pattern, $options: 'i' } },
+      { author: { $regex: pattern, $options: 'i' } },
+      { description: { $regex: pattern, $options: 'i' } },
+    ],
+  };
+}
+
+export const relevanceProjection = { score: { $meta: 'textScore' } };
+export const relevanceSort = { score: { $meta: 'textScore' }, createdAt: -1 };
@@ -0,0 +1,184 @@
+import { createHmac, randomBytes, timingSafeEqual } from 'crypto';
+import { NextResponse } from 'next/server';
+import { v4 as uuidv4 } from 'uuid';
+import { getDbConnection } from '@/lib/mongodb';
+import { timed } from '@/lib/timing';
+import { corsHeaders } from '@/lib/cors';
+
+// Sessions admin : POST /api/admin/login vérifie le mot de passe (bcrypt) une
+// seule fois et renvoie un jeton signé (HMAC-SHA256) de courte durée. Les
+// requêtes suivantes envoient `Authorization: Bearer <jeton>` ; la vérification
+// ne lit ni `admins` ni bcrypt : signature, expiration et liste de révocation.
+//
+// Jeton : base64url(JSON { sub, email, name, role, iat, exp, jti }).base64url(signature)
+//
+// - Secret : ADMIN_SESSION_SECRET, sinon un secret aléatoire conservé dans
+//   catalog_state (partagé par toutes les instances), lu une fois par process.
+// - Révocation (POST /api/admin/logout) : `admin_revoked_sessions`, expirée par
+//   index TTL avec le jeton ; copie locale relue dès qu'elle a plus de
+//   ADMIN_REVOCATION_REFRESH_MS, la vérification attendant la relecture (une
+//   révocation faite par une autre instance est vue au plus tard après ce
+//   délai ; si la relecture échoue, la vérification échoue aussi).
+// - ADMIN_AUTH_REQUIRED=true rend le jeton obligatoire sur les écritures ;
+//   sinon seul un jeton présent est vérifié (un jeton invalide donne 401).
+
+const SESSION_TTL_S = parseInt(process.env.ADMIN_SESSION_TTL_S) || 60 * 60;
+const REVOCATION_REFRESH_MS = parseInt(process.env.ADMIN_REVOCATION_REFRESH_MS) || 15000;
+const AUTH_REQUIRED = process.env.ADMIN_AUTH_REQUIRED === 'true';
+
+const STATE_COLLECTION = 'catalog_state';
+const SECRET_ID = 'admin_session_secret';
+const REVOKED = 'admin_revoked_sessions';
+
+// Par base : secret et liste de révocation
+const state = globalThis._adminSessionState || (globalThis._adminSessionState = new Map());
+
+function dbState(db) {
+  if (!state.has(db.databaseName)) {
+    state.set(db.databaseName, { secret: null, revoked: new Set(), revokedAt: 0, refreshing: null });
+  }
+  return state.get(db.databaseName);
+}
+
+async function sessionSecret(db) {
+  const current = dbState(db);
+  if (process.env.ADMIN_SESSION_SECRET) return process.env.ADMIN_SESSION_SECRET;
+  if (!current.secret) {
+    const states = db.collection(STATE_COLLECTION);
+    current.secret = states.findOneAndUpdate(
+      { _id: SECRET_ID },
+      { $setOnInsert: { secret: randomBytes(32).toString('base64url'), createdAt: new Date() } },
+      { upsert: true, returnDocument: 'after' }
+    ).catch((error) => {
+      // Deux instances créent le secret en même temps : garder celui écrit en premier
+      if (error.code !== 11000) throw error;
+      return states.findOne({ _id: SECRET_ID });
+    }).then((doc) => doc.secret).catch((error) => {
+      current.secret = null;
+      throw error;
+    });
+  }
+  return current.secret;
+}
+
+const sign = (secret, payload) => createHmac('sha256', secret).update(payload).digest('base64url');
+
+// Liste locale des jetons révoqués, jamais plus vieille que
+// REVOCATION_REFRESH_MS : au-delà, les appels attendent une même relecture
+async function revokedSessions(db) {
+  const current = dbState(db);
+  if (Date.now() - current.revokedAt > REVOCATION_REFRESH_MS) {
+    if (!current.refreshing) {
+      const readAt = Date.now();
+      current.refreshing = db.collection(REVOKED)
+        .find({ expiresAt: { $gt: new Date() } }, { projection: { _id: 1 } })
+        .toArray()
+        .then((docs) => {
+          current.revoked = new Set(docs.map((doc) => doc._id));
+          current.revokedAt = readAt;
+        })
+        .finally(() => { current.refreshing = null; });
+    }
+    await current.refreshing;
+  }
+  return current.revoked;
+}
+
+// ---------- Émission et vérification ----------
+
+export async function issueSession(db, admin) {
+  const now = Math.floor(Date.now() / 1000);
+  const session = {
+    sub: admin.id || admin._id.toString(),
+    email: admin.email,
+    name: admin.name,
+    role: admin.role || 'admin',
+    iat: now,
+    exp: now + SESSION_TTL_S,
+    jti: uuidv4(),
+  };
+  const payload = Buffer.from(JSON.stringify(session)).toString('base64url');
+  return {
+    token: `${payload}.${sign(await sessionSecret(db), payload)}`,
+    expiresAt: new Date(session.exp * 1000).toISOString(),
+  };
+}
+
+// Session portée par le jeton, ou null (signature, expiration, révocation)
+export async function verifySession(db, token) {
+  const [payload, signature, extra] = String(token || '').split('.');
+  if (!payload || !signature || extra !== undefined) return null;
+
+  const expected = Buffer.from(sign(await sessionSecret(db), payload));
+  const received = Buffer.from(signature);
+  if (expected.length !== received.length || !timingSafeEqual(expected, received)) return null;
+
+  let session;
+  try {
+    session = JSON.parse(Buffer.from(payload, 'base64url').toString());
+  } catch {
+    return null;
+  }
+  if (!session.exp || session.exp * 1000 <= Date.now()) return null;
+  if ((await revokedSessions(db)).has(session.jti)) return null;
+  return session;
+}
+
+export function bearerToken(request) {
+  const header = request.headers.get('authorization') || '';
+  return header.startsWith('Bearer ') ? header.slice(7).trim() : null;
+}
+
+export async function revokeSession(db, session) {
+  await db.collection(REVOKED).updateOne(
+    { _id: session.jti },
+    { $set: { expiresAt: new Date(session.exp * 1000), sub: session.sub, revokedAt: new Date() } },
+    { upsert: true }
+  );
+  dbState(db).revoked.add(session.jti);
+}
+
+// ---------- Écritures admin ----------
+
+const ADMIN_WRITE_PATHS = new Set(['/books', '/books/import', '/upload', '/upload-url', '/uploads', '/admin/related/rebuild']);
+
+// Routes réservées à l'administration (création, modification, suppression, uploads)
+export function isAdminWrite(method, path) {
+  if (method === 'PUT' || method === 'DELETE') return path.startsWith('/books/') || path.startsWith('/uploads/');
+  return method === 'POST' && (ADMIN_WRITE_PATHS.has(path) || path.startsWith('/uploads/'));
+}
+
+// { session } si la requête peut continuer (session null sans jeton, quand il
+// n'est pas obligatoire), { error } sinon. `getDb` n'est appelé que s'il y a
+// un jeton à vérifier.
+export async function adminSession(request, getDb) {
+  const token = bearerToken(request);
+  if (!token) {
+    return AUTH_REQUIRED ? { error: 'Authentification requise' } : { session: null };
+  }
+  const { db } = await getDb();
+  const session = await verifySession(db, token);
+  return session ? { session } : { error: 'Session invalide ou expirée' };
+}
+
+// Écritures admin : jeton de session vérifié sans bcrypt ni lecture de `admins`.
+// Renvoie la réponse 401 à envoyer, ou null.
+export async function adminAuthError(request, method, path) {
+  if (!isAdminWrite(method, path)) return null;
+
+  try {
+    const { error } = await timed('auth', () => adminSession(request, getDbConnection));
+    return error ? NextResponse.json({ success: false, error }, { status: 401, headers: corsHeaders }) : null;
+  } catch (error) {
+    console.error('❌ Vérification de session échouée:', error.message);
+    return NextResponse.json({ success: false, error: 'Erreur serveur' }, { status: 500, headers: corsHeaders });
+  }
+}
+
+// Enveloppe un handler de route dédiée : écritures admin authentifiées
+export function withAdminAuth(handler) {
+  return async (request, context) => {
+    const path = new URL(request.url).pathname.replace('/api', '');
+    return (await adminAuthError(request, request.method, path)) || handler(request, context);
+  };
+}
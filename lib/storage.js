@@ -0,0 +1,136 @@
+import { createWriteStream } from 'fs';
+import { mkdir, readFile, rename, stat, unlink } from 'fs/promises';
+import path from 'path';
+import { Readable } from 'stream';
+import { pipeline } from 'stream/promises';
+import { v4 as uuidv4 } from 'uuid';
+
+// Stockage des fichiers uploadés, alimenté en flux :
+// - 'blob'      : Vercel Blob (BLOB_READ_WRITE_TOKEN)
+// - 'local'     : public/uploads/<dossier>/ (développement)
+// - 'simulated' : rien n'est écrit, URL factice (ancien comportement sans Blob)
+
+export const uploadFolders = { cover: 'covers', book: 'books', audio: 'audio' };
+
+export const UPLOADS_ROOT = process.env.UPLOADS_DIR || path.join(process.cwd(), 'public', 'uploads');
+
+export function storageBackend() {
+  if (process.env.UPLOAD_STORAGE) return process.env.UPLOAD_STORAGE;
+  if (process.env.BLOB_READ_WRITE_TOKEN) return 'blob';
+  return process.env.NODE_ENV === 'production' ? 'simulated' : 'local';
+}
+
+// Écrit le flux `chunks` sous uploads/<dossier>/<filename> et renvoie l'URL.
+// Le fichier n'apparaît qu'une fois complet (écriture dans un .part puis rename).
+async function storeLocal(folder, filename, chunks) {
+  const directory = path.join(UPLOADS_ROOT, folder);
+  const target = path.join(directory, filename);
+  const partial = `${target}.${uuidv4()}.part`;
+
+  await mkdir(directory, { recursive: true });
+  try {
+    await pipeline(Readable.from(chunks), createWriteStream(partial));
+    await rename(partial, target);
+  } catch (error) {
+    await unlink(partial).catch(() => {});
+    throw error;
+  }
+
+  const url = `/uploads/${folder}/${filename}`;
+  return { url, downloadUrl: url, pathname: url };
+}
+
+// `immutable` : nom dérivé du contenu, réécriture sans effet et cache d'un an
+async function storeBlob(pathname, chunks, contentType, immutable) {
+  const { put } = await import('@vercel/blob');
+  const blob = await put(pathname, Readable.from(chunks), {
+    access: 'public',
+    contentType,
+    multipart: true,
+    ...(immutable ? { allowOverwrite: true, cacheControlMaxAge: 365 * 24 * 60 * 60 } : {}),
+  });
+  return { url: blob.url, downloadUrl: blob.downloadUrl, pathname: blob.pathname };
+}
+
+// Enregistre un fichier reçu en flux.
+// `chunks` : itérable asynchrone de Buffer, consommé une seule fois.
+export async function storeUpload({ type, filename, originalName, contentType, chunks, immutable = false }) {
+  const backend = storageBackend();
+  const folder = uploadFolders[type] || type;
+
+  if (backend === 'blob') {
+    return { ...await storeBlob(filename, chunks, contentType, immutable), storage: backend };
+  }
+
+  if (backend === 'local') {
+    return { ...await storeLocal(folder, filename, chunks), storage: backend };
+  }
+
+  // Simulé : consommer le flux pour appliquer quand même les validations
+  for await (const _ of chunks) { /* ignoré */ }
+  const url = `https://storage.bibliorhema.vercel.app/simulated/${type}/${uuidv4()}/${originalName}`;
+  return { url, downloadUrl: url, pathname: url, storage: backend, simulated: true };
+}
+
+// Origine des fichiers Vercel Blob : BLOB_PUBLIC_ORIGIN, sinon déduite du jeton
+// (vercel_blob_rw_<store>_<secret> -> https://<store>.public.blob.vercel-storage.com)
+export function blobOrigin() {
+  if (process.env.BLOB_PUBLIC_ORIGIN) return new URL(process.env.BLOB_PUBLIC_ORIGIN).origin;
+  const store = (process.env.BLOB_READ_WRITE_TOKEN || '').split('_')[3];
+  return store ? `https://${store.toLowerCase()}.public.blob.vercel-storage.com` : null;
+}
+
+function tooLarge() {
+  return new Error('Fichier trop volumineux');
+}
+
+// Lit le corps en comptant les octets : abandon dès que `maxBytes` est dépassé,
+// Content-Length absent ou non
+async function readLimited(response, maxBytes) {
+  if (parseInt(response.headers.get('content-length')) > maxBytes) {
+    await response.body?.cancel();
+    throw tooLarge();
+  }
+
+  const chunks = [];
+  let size = 0;
+  const reader = response.body.getReader();
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    size += value.length;
+    if (size > maxBytes) {
+      await reader.cancel();
+      throw tooLarge();
+    }
+    chunks.push(value);
+  }
+  return Buffer.concat(chunks, size);
+}
+
+// Relit un fichier publié, `maxBytes` au plus : fichier local sous /uploads/
+// ou fichier du store Blob configuré. null pour toute autre URL (simulée,
+// relative, autre hôte) : l'API ne lit jamais une URL arbitraire fournie par
+// un client.
+export async function readStoredUpload(url, maxBytes) {
+  if (url.startsWith('/uploads/')) {
+    const file = path.resolve(UPLOADS_ROOT, url.slice('/uploads/'.length));
+    if (!file.startsWith(path.resolve(UPLOADS_ROOT) + path.sep)) return null;
+    if ((await stat(file)).size > maxBytes) throw tooLarge();
+    return readFile(file);
+  }
+
+  let parsed;
+  try {
+    parsed = new URL(url);
+  } catch {
+    return null;
+  }
+  const origin = blobOrigin();
+  if (!origin || parsed.origin !== origin) return null;
+
+  // Pas de redirection : elle pourrait mener hors du store
+  const response = await fetch(parsed, { redirect: 'error' });
+  if (!response.ok) throw new Error(`HTTP ${response.status}`);
+  return readLimited(response, maxBytes);
+}
@@ -0,0 +1,66 @@
+import { AsyncLocalStorage } from 'async_hooks';
+
+// Chronométrage des étapes d'une requête API, exposé dans l'en-tête
+// Server-Timing (ex. `db;dur=0.4, count;dur=12.1, find;dur=8.7, total;dur=23.0`)
+// et, si REQUEST_LOG=json, dans une ligne de log JSON par requête.
+
+const storage = new AsyncLocalStorage();
+const LOG_JSON = process.env.REQUEST_LOG === 'json';
+
+class RequestTimer {
+  constructor() {
+    this.start = performance.now();
+    this.stages = new Map();
+  }
+
+  // Une même étape exécutée plusieurs fois est cumulée
+  add(name, duration) {
+    this.stages.set(name, (this.stages.get(name) || 0) + duration);
+  }
+
+  total() {
+    return performance.now() - this.start;
+  }
+
+  header(total) {
+    return [...this.stages, ['total', total]]
+      .map(([name, duration]) => `${name};dur=${duration.toFixed(1)}`)
+      .join(', ');
+  }
+}
+
+// Exécute `fn` et ajoute sa durée à l'étape `name` de la requête en cours
+export async function timed(name, fn) {
+  const timer = storage.getStore();
+  if (!timer) return fn();
+
+  const start = performance.now();
+  try {
+    return await fn();
+  } finally {
+    timer.add(name, performance.now() - start);
+  }
+}
+
+// Enveloppe un handler de route : chronomètre la requête et ajoute Server-Timing
+export function withTiming(method, handler) {
+  return (request, context) => storage.run(new RequestTimer(), async () => {
+    const timer = storage.getStore();
+    const response = await handler(request, context);
+    const total = timer.total();
+
+    response.headers.set('Server-Timing', timer.header(total));
+
+    if (LOG_JSON) {
+      console.log(JSON.stringify({
+        at: new Date().toISOString(),
+        method,
+        path: new URL(request.url).pathname,
+        status: response.status,
+        durationMs: Number(total.toFixed(1)),
+        stages: Object.fromEntries([...timer.stages].map(([name, duration]) => [name, Number(duration.toFixed(1))])),
+      }));
+    }
+    return response;
+  });
+}
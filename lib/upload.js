@@ -0,0 +1,135 @@
+// Règles de validation des fichiers uploadés (types, tailles, signatures),
+// appliquées au fil du flux plutôt qu'après réception complète.
+
+// Types de fichiers acceptés
+export const validTypes = {
+  book: [
+    'application/pdf',
+    'application/x-pdf',
+    'application/octet-stream'
+  ],
+  cover: [
+    'image/jpeg',
+    'image/jpg',
+    'image/png',
+    'image/webp'
+  ],
+  audio: [
+    'audio/mpeg',
+    'audio/mp3',
+    'audio/wav',
+    'audio/ogg'
+  ]
+};
+
+// Limites de taille
+export const sizeLimits = {
+  book: 50 * 1024 * 1024,    // 50MB
+  cover: 20 * 1024 * 1024,   // 20MB
+  audio: 30 * 1024 * 1024    // 30MB
+};
+
+export const defaultExtensions = { book: 'pdf', cover: 'jpg', audio: 'mp3' };
+
+// Signatures (magic bytes) attendues en tête de fichier pour chaque type
+const signatures = {
+  book: [(b) => b.subarray(0, 1024).includes('%PDF-')],
+  cover: [
+    (b) => b[0] === 0xff && b[1] === 0xd8 && b[2] === 0xff,
+    (b) => b.subarray(0, 8).equals(Buffer.from([0x89, 0x50, 0x4e, 0x47, 0x0d, 0x0a, 0x1a, 0x0a])),
+    (b) => b.subarray(0, 4).toString('latin1') === 'RIFF' && b.subarray(8, 12).toString('latin1') === 'WEBP',
+  ],
+  audio: [
+    (b) => b.subarray(0, 3).toString('latin1') === 'ID3',
+    (b) => b[0] === 0xff && (b[1] & 0xe0) === 0xe0,
+    (b) => b.subarray(0, 4).toString('latin1') === 'RIFF' && b.subarray(8, 12).toString('latin1') === 'WAVE',
+    (b) => b.subarray(0, 4).toString('latin1') === 'OggS',
+  ],
+};
+const SNIFF_BYTES = 1024;
+
+export class UploadError extends Error {
+  constructor(message, status = 400, details = {}) {
+    super(message);
+    this.name = 'UploadError';
+    this.status = status;
+    this.details = details;
+  }
+}
+
+export function uploadErrorBody(error) {
+  return { success: false, error: error.message, ...error.details };
+}
+
+// Vérifications possibles dès les en-têtes de la partie fichier
+export function checkDeclaredFile(type, { filename, contentType }) {
+  const allowedTypes = validTypes[type];
+  if (!allowedTypes) {
+    throw new UploadError(`Type "${type}" invalide`, 400, { valid_types: Object.keys(validTypes) });
+  }
+
+  // Accepter les PDF par extension même si le type MIME est différent
+  const isPdfFile = (filename || '').toLowerCase().endsWith('.pdf');
+  if (!allowedTypes.includes(contentType) && !(type === 'book' && isPdfFile)) {
+    throw new UploadError('Type de fichier non supporté', 400, {
+      received_type: contentType,
+      allowed_types: allowedTypes,
+      suggestion: type === 'book' ? 'Le fichier doit être un PDF (.pdf)' : 'Vérifiez le format du fichier'
+    });
+  }
+}
+
+export function tooLargeError(type, size) {
+  const maxSize = sizeLimits[type] || sizeLimits.book;
+  return new UploadError('Fichier trop volumineux', 413, {
+    max_size_mb: maxSize / (1024 * 1024),
+    file_size_mb: (size / (1024 * 1024)).toFixed(2)
+  });
+}
+
+// Relaie les chunks du fichier en vérifiant la signature sur les premiers
+// octets et la taille cumulée ; `stats.size` contient la taille finale.
+export async function* validatedChunks(type, chunks, stats = {}) {
+  const maxSize = sizeLimits[type] || sizeLimits.book;
+  let head = [];
+  let headSize = 0;
+  stats.size = 0;
+
+  const checkSignature = (bytes) => {
+    if (!signatures[type].some((matches) => matches(bytes))) {
+      throw new UploadError('Contenu du fichier invalide', 400, {
+        suggestion: `Le contenu ne correspond pas à un fichier de type ${type}`
+      });
+    }
+  };
+
+  for await (const chunk of chunks) {
+    stats.size += chunk.length;
+    if (stats.size > maxSize) {
+      throw tooLargeError(type, stats.size);
+    }
+
+    // Retenir le début du fichier jusqu'à pouvoir vérifier la signature
+    if (head) {
+      head.push(chunk);
+      headSize += chunk.length;
+      if (headSize < SNIFF_BYTES) continue;
+      const bytes = Buffer.concat(head);
+      head = null;
+      checkSignature(bytes);
+      yield bytes;
+      continue;
+    }
+
+    yield chunk;
+  }
+
+  if (head) {
+    const bytes = Buffer.concat(head);
+    if (bytes.length === 0) {
+      throw new UploadError('Aucun fichier fourni');
+    }
+    checkSignature(bytes);
+    yield bytes;
+  }
+}
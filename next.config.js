@@ -5,7 +5,7 @@ const nextConfig = {
   },
   experimental: {
     // Remove if not using Server Components
-    serverComponentsExternalPackages: ['mongodb'],
+    serverComponentsExternalPackages: ['mongodb', 'pdfjs-dist', 'sharp'],
   },
   webpack(config, { dev }) {
     if (dev) {
@@ -22,6 +22,14 @@ const nextConfig = {
     maxInactiveAge: 10000,
     pagesBufferLength: 2,
   },
+  // Fichiers uploadés servis par l'API (requêtes partielles, UPLOADS_DIR hors de public/)
+  async rewrites() {
+    return {
+      beforeFiles: [
+        { source: '/uploads/:folder(books|audio|covers)/:file', destination: '/api/files/:folder/:file' },
+      ],
+    };
+  },
   async headers() {
     return [
       {
@@ -0,0 +1,20 @@
+const crypto = require('crypto');
+
+// Écritures directes sur `books` (hors API) : les instances doivent le voir.
+// - nouvelle version du catalogue (ETag, caches de facettes des instances) ;
+// - facettes marquées à recalculer (prochaine lecture : calcul complet) ;
+// - livres similaires à recalculer (prochaine lecture d'un livre).
+// Même format que lib/httpCache.js, lib/facets.js et lib/related.js.
+async function markCatalogChanged(db) {
+  const version = `${Date.now().toString(36)}-${crypto.randomBytes(4).toString('hex')}`;
+  await db.collection('catalog_state').updateOne(
+    { _id: 'catalog_version' },
+    { $set: { version, updatedAt: new Date() } },
+    { upsert: true }
+  );
+  await db.collection('catalog_facets').deleteOne({ field: '_meta', value: null });
+  await db.collection('catalog_state').deleteOne({ _id: 'related_books' });
+  console.log(`🏷️  Version du catalogue: ${version}`);
+}
+
+module.exports = { markCatalogChanged };
@@ -1,5 +1,6 @@
 const { MongoClient } = require('mongodb');
 const { v4: uuidv4 } = require('uuid');
+const { markCatalogChanged } = require('./catalog-state');
 
 const uri = process.env.MONGO_URL || 'mongodb://localhost:27017';
 const dbName = process.env.DB_NAME || 'immersive_library';
@@ -171,6 +172,7 @@ async function seedDatabase() {
 
     console.log('📚 Insertion des livres d\'exemple...');
     await db.collection('books').insertMany(sampleBooks);
+    await markCatalogChanged(db);
 
     console.log(`✅ ${sampleBooks.length} livres ajoutés avec succès!`);
     console.log('\n📖 Livres disponibles:');
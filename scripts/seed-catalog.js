@@ -0,0 +1,88 @@
+const { MongoClient } = require('mongodb');
+const { v4: uuidv4 } = require('uuid');
+const { markCatalogChanged } = require('./catalog-state');
+
+// Génère un grand catalogue synthétique pour les benchmarks (recherche, pagination...).
+// Usage: node scripts/seed-catalog.js [nombre=100000] [--clean]
+// Les livres générés portent `synthetic: true` et sont supprimés par --clean.
+
+const uri = process.env.MONGODB_URI || process.env.MONGO_URL || 'mongodb://localhost:27017';
+const dbName = process.env.DB_NAME || 'immersive_library';
+
+const args = process.argv.slice(2);
+const clean = args.includes('--clean');
+const count = parseInt(args.find((arg) => !arg.startsWith('--'))) || 100000;
+const BATCH_SIZE = 5000;
+
+const categories = ['Fiction', 'Science-Fiction', 'Fantastique', 'Classique', 'Histoire', 'Philosophie', 'Romance', 'Conte', 'Poésie', 'Théâtre'];
+const firstNames = ['Jean', 'Marie', 'Émile', 'Hélène', 'François', 'Léa', 'Gérard', 'Chloé', 'Noël', 'Zoé', 'Harry', 'Amélie'];
+const lastNames = ['Dupont', 'Lefèvre', 'Moreau', 'Girard', 'Bérenger', 'Fontaine', 'Mercier', 'Rousseau', 'Chevalier', 'Besançon'];
+const titleWords = ['Mémoires', 'Voyage', 'Étoiles', 'Château', 'Rêves', 'Forêt', 'Océan', 'Misérables', 'Prince', 'Ombre', 'Lumière', 'Été', 'Hiver', 'Cœur', 'Sorcier'];
+const descriptionWords = ['histoire', 'aventure', 'amour', 'guerre', 'secret', 'famille', 'destin', 'liberté', 'mystère', 'société', 'enfance', 'vérité', 'magie', 'exil', 'révolution'];
+
+function pick(list, index) {
+  return list[index % list.length];
+}
+
+function syntheticBook(index, createdAt) {
+  return {
+    id: uuidv4(),
+    title: `${pick(titleWords, index)} ${pick(titleWords, Math.floor(index / 7))} ${index}`,
+    author: `${pick(firstNames, Math.floor(index / 3))} ${pick(lastNames, Math.floor(index / 11))}`,
+    category: pick(categories, index),
+    year: 1800 + (index % 225),
+    description: Array.from({ length: 24 }, (_, i) => pick(descriptionWords, index * 31 + i * 17)).join(' '),
+    coverImage: '',
+    pdfUrl: '',
+    synthetic: true,
+    createdAt,
+    updatedAt: createdAt,
+  };
+}
+
+async function seedCatalog() {
+  let client;
+
+  try {
+    console.log('🔌 Connexion à MongoDB...');
+    client = await MongoClient.connect(uri);
+    const db = client.db(dbName);
+
+    const { deletedCount } = await db.collection('books').deleteMany({ synthetic: true });
+    console.log(`🗑️  ${deletedCount} livres synthétiques supprimés`);
+
+    if (clean) {
+      await markCatalogChanged(db);
+      return;
+    }
+
+    console.log(`📚 Insertion de ${count} livres synthétiques...`);
+    const start = Date.now();
+    const baseTime = start - count * 1000;
+
+    for (let offset = 0; offset < count; offset += BATCH_SIZE) {
+      const batch = [];
+      for (let index = offset; index < Math.min(offset + BATCH_SIZE, count); index++) {
+        batch.push(syntheticBook(index, new Date(baseTime + index * 1000)));
+      }
+      await db.collection('books').insertMany(batch, { ordered: false });
+      process.stdout.write(`\r   ${Math.min(offset + BATCH_SIZE, count)}/${count}`);
+    }
+
+    await markCatalogChanged(db);
+
+    const seconds = (Date.now() - start) / 1000;
+    console.log(`\n✅ ${count} livres ajoutés en ${seconds.toFixed(1)}s (${Math.round(count / seconds)} livres/s)`);
+
+  } catch (error) {
+    console.error('❌ Erreur lors du seeding:', error);
+    process.exit(1);
+  } finally {
+    if (client) {
+      await client.close();
+      console.log('🔌 Connexion fermée');
+    }
+  }
+}
+
+seedCatalog();